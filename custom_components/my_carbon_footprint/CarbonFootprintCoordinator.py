@@ -1,36 +1,225 @@
 """The My Carbon Footprint integration."""
 
+import asyncio
 import logging
-from datetime import timedelta
+import math
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.storage import Store
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_HOMEASSISTANT_FINAL_WRITE,
+    UnitOfEnergy,
+)
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import STORAGE_DIR, Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+from homeassistant.util.unit_conversion import EnergyConverter
 
-from custom_components.my_carbon_footprint.models import CoordinatorData, EnergySensor
+from .accumulation import compensated_add
+from .const import (
+    CONF_BUDGETS,
+    CONF_CARBON_INTENSITY,
+    CONF_CO2E_FACTOR,
+    CONF_EXPORT_FORMAT,
+    CONF_INGEST_DIR,
+    CONF_INTENSITY_STALE_AFTER,
+    CONF_INTENSITY_TABLE,
+    CONF_MARKET_INTENSITY,
+    CONF_POWER_ENTITIES,
+    CONF_POWER_INTEGRATION,
+    CONF_PRICE_ENTITY,
+    CONF_SENSOR_ENTITIES,
+    CONF_SOURCE_MODE,
+    CONF_SPOOL_DIR,
+    CONF_STALE_AFTER,
+    CONF_TARIFF_TABLE,
+    CONF_TIMESERIES_MAX_SOURCES,
+    CONF_VIRTUAL_SOURCES,
+    DEFAULT_TIMESERIES_MAX_SOURCES,
+    DOMAIN,
+    EMISSION_LOCATION_CO2E,
+    EMISSION_MARKET_CO2,
+    EMISSION_MARKET_CO2E,
+    INTEGRATION_TRAPEZOIDAL,
+    SCAN_INTERVAL,
+    SIGNAL_ENERGY_ENTITIES_ADDED,
+    SOURCE_MODE_ENERGY_DASHBOARD,
+    SOURCE_MODE_ENTITIES,
+)
+from .intensity_history import IntensityHistory
+from .models import (
+    CoordinatorData,
+    Emissions,
+    EnergySensor,
+    Gap,
+    IntensityStats,
+    RemoteSite,
+)
+from .providers import (
+    ConstantIntensityProvider,
+    EntityIntensityProvider,
+    IntensityProvider,
+    PriceProvider,
+)
+from .storage import SnapshotStore
+from .timeseries import TimeSeries
 
-from .const import DOMAIN, SCAN_INTERVAL
+# Optional engines are imported where their feature is enabled, so they are
+# not paid for at every start (see tests/test_imports.py)
+if TYPE_CHECKING:
+    from .budgets import BudgetEngine
+    from .export import CarbonExporter
+    from .health import SourceHealth
+    from .intensity_table import TableIntensityProvider
+    from .power import PowerIntegrator
+    from .profiling import RefreshProfiler
+    from .spool import SpoolReader, SpoolWriter
+    from .statistics import VirtualSourceStatistics
 
 _LOGGER = logging.getLogger(__name__)
 STORAGE_VERSION = 1
 STORAGE_KEY = f"{DOMAIN}.coordinator_data"
+# Relative difference tolerated between the total and the sum of its parts
+CONSISTENCY_TOLERANCE = 1e-9
+# Seconds of carbon intensities kept to charge meters reporting sparsely
+INTENSITY_HISTORY_MAX_AGE = 86400
 
 
 class CarbonFootprintCoordinator(DataUpdateCoordinator[CoordinatorData]):
     """Class to manage fetching carbon footprint data."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        *,
+        store: SnapshotStore | None = None,
+    ):
         self.entry: ConfigEntry = entry
-        self.carbon_intensity_entity: str = entry.data["carbon_intensity_entity"]
-        self.energy_entities: list[str] = entry.data["energy_entities"]
+        self.carbon_intensity_entity: str | None = entry.data.get(CONF_CARBON_INTENSITY)
+        self.intensity_table: str | None = entry.data.get(CONF_INTENSITY_TABLE)
+        # Staleness thresholds of the sources, configured in minutes
+        stale_after: float | None = entry.data.get(CONF_STALE_AFTER)
+        intensity_stale_after: float | None = entry.data.get(CONF_INTENSITY_STALE_AFTER)
+        self.stale_after = stale_after * 60 if stale_after else None
+        self.intensity_stale_after = (
+            intensity_stale_after * 60 if intensity_stale_after else None
+        )
+        self.health: SourceHealth | None = None
+        # Whether the last refresh read the energy entities to record gaps,
+        # without publishing data
+        self._gap_refresh = False
+        # Sources of the carbon intensity, the first one with a value is used
+        self._intensity_providers: list[IntensityProvider] = []
+        if self.carbon_intensity_entity:
+            self._intensity_providers.append(
+                EntityIntensityProvider(
+                    hass,
+                    self.carbon_intensity_entity,
+                    max_age=self.intensity_stale_after,
+                )
+            )
+        self.source_mode: str = entry.data.get(CONF_SOURCE_MODE, SOURCE_MODE_ENTITIES)
+        # Replaced, never mutated, when the Energy dashboard preferences change
+        # Power entities are integrated into energy, and follow energy entities
+        self.power_entities: list[str] = entry.data.get(CONF_POWER_ENTITIES, [])
+        self.energy_entities: list[str] = [
+            *entry.data.get("energy_entities", []),
+            *self.power_entities,
+        ]
+        self._power: PowerIntegrator | None = None
+        # Virtual sources are only kept here, a sensor is created for the
+        # selected ones
+        self.virtual_sources: bool = entry.data.get(CONF_VIRTUAL_SOURCES, False)
+        self.sensor_entities: set[str] = set(entry.data.get(CONF_SENSOR_ENTITIES, []))
+        self._statistics: VirtualSourceStatistics | None = None
         self.hass: HomeAssistant = hass
         self._previous_energy_values: dict[str, float] = {}
+        # Refresh at which the previous value of each energy entity was first
+        # read, and the intensities since, to spread sparse meter deltas
+        self._energy_read_at: dict[str, float] = {}
+        self._intensity_history = IntensityHistory(INTENSITY_HISTORY_MAX_AGE)
         self._total_carbon: float = 0  # Running total of carbon footprint
         self._entity_carbon: dict[str, float] = {}  # Running totals per entity
+        # Rounding errors carried by the compensated running totals
+        self._total_carbon_error: float = 0
+        self._entity_carbon_error: dict[str, float] = {}
+        # Carbon of entities reset on their own, still part of the total
+        self._reset_carbon: float = 0
+        # Energy and carbon per entity, for average intensities
+        self._intensity_stats: dict[str, IntensityStats] = {}
+        # Guards state mutations, state dicts are replaced rather than mutated
+        self._state_lock = asyncio.Lock()
+        self.export_format: str | None = entry.data.get(CONF_EXPORT_FORMAT)
+        self._exporter: CarbonExporter | None = None
+        self.budget_configs: list[dict[str, Any]] | None = entry.data.get(CONF_BUDGETS)
+        self._budgets: BudgetEngine | None = None
+        # Set by the profile service for its next refreshes only
+        self._profiler: RefreshProfiler | None = None
+        # Recent energy and carbon per interval, kept in memory only
+        timeseries_max_sources: int = entry.data.get(
+            CONF_TIMESERIES_MAX_SOURCES, DEFAULT_TIMESERIES_MAX_SOURCES
+        )
+        self.timeseries: TimeSeries | None = (
+            TimeSeries(int(timeseries_max_sources)) if timeseries_max_sources else None
+        )
+        # Emission dimensions accounted alongside the location-based CO2
+        self.co2e_factor: float | None = entry.data.get(CONF_CO2E_FACTOR)
+        market_intensity: float | None = entry.data.get(CONF_MARKET_INTENSITY)
+        self._market_provider: IntensityProvider | None = (
+            ConstantIntensityProvider(market_intensity)
+            if market_intensity is not None
+            else None
+        )
+        dimensions = []
+        if self.co2e_factor:
+            dimensions.append(EMISSION_LOCATION_CO2E)
+        if self._market_provider:
+            dimensions.append(EMISSION_MARKET_CO2)
+            if self.co2e_factor:
+                dimensions.append(EMISSION_MARKET_CO2E)
+        self.emission_dimensions: tuple[str, ...] = tuple(dimensions)
+        self._total_emissions = Emissions.zero(len(dimensions))
+        self._entity_emissions: dict[str, Emissions] = {}
+        # Energy cost accounted alongside the carbon, from a price per kWh
+        # read like the intensity, from an entity or a tariff table
+        self.price_entity: str | None = entry.data.get(CONF_PRICE_ENTITY)
+        self.tariff_table: str | None = entry.data.get(CONF_TARIFF_TABLE)
+        self.pricing = bool(self.price_entity or self.tariff_table)
+        self._price_providers: list[PriceProvider] = []
+        if self.price_entity:
+            self._price_providers.append(
+                EntityIntensityProvider(hass, self.price_entity, kind="price")
+            )
+        self._total_cost: float = 0
+        self._total_cost_error: float = 0
+        self._entity_cost: dict[str, float] = {}
+        self._entity_cost_error: dict[str, float] = {}
+        # Deltas of this entry's totals are spooled for a central instance,
+        # which ingests the spools of its sites into its own totals
+        self.spool_dir: str | None = entry.data.get(CONF_SPOOL_DIR)
+        self.ingest_dir: str | None = entry.data.get(CONF_INGEST_DIR)
+        self._spool_writer: SpoolWriter | None = None
+        self._spool_reader: SpoolReader | None = None
+        self._remote_sites: dict[str, RemoteSite] = {}
 
-        # Initialize storage for persistent data
-        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # Initialize storage for persistent data, tools may provide their own
+        if store is None:
+            # The JSON store was shared by every entry, it can only be
+            # migrated to an entry when there is no other one
+            single_entry = len(hass.config_entries.async_entries(DOMAIN)) <= 1
+            store = SnapshotStore(
+                hass,
+                hass.config.path(STORAGE_DIR, f"{STORAGE_KEY}.{entry.entry_id}.bin"),
+                Store(hass, STORAGE_VERSION, STORAGE_KEY) if single_entry else None,
+            )
+        self._store = store
 
         super().__init__(
             hass,
@@ -47,73 +236,410 @@ class CarbonFootprintCoordinator(DataUpdateCoordinator[CoordinatorData]):
             self._total_carbon = stored_data.get("total_carbon", 0)
             self._entity_carbon = stored_data.get("entity_carbon", {})
             self._previous_energy_values = stored_data.get("previous_energy_values", {})
+            self._total_carbon_error = stored_data.get("total_carbon_error", 0)
+            self._entity_carbon_error = stored_data.get("entity_carbon_error", {})
+            self._intensity_stats = {
+                entity_id: IntensityStats(**stats)
+                for entity_id, stats in stored_data.get("intensity_stats", {}).items()
+            }
+            if "reset_carbon" in stored_data:
+                self._reset_carbon = stored_data["reset_carbon"]
+                self._check_consistency()
+            else:
+                # Stored before reset carbon was tracked, attribute the
+                # difference to past resets
+                self._reset_carbon = self._total_carbon - math.fsum(
+                    self._entity_carbon.values()
+                )
+            if stored_data.get("emission_dimensions") == list(self.emission_dimensions):
+                self._total_emissions = _load_emissions(stored_data["total_emissions"])
+                self._entity_emissions = {
+                    entity_id: _load_emissions(emissions)
+                    for entity_id, emissions in stored_data["entity_emissions"].items()
+                }
+            if "total_cost" in stored_data:
+                self._total_cost = stored_data["total_cost"]
+                self._total_cost_error = stored_data["total_cost_error"]
+                self._entity_cost = stored_data["entity_cost"]
+                self._entity_cost_error = stored_data["entity_cost_error"]
+            self._remote_sites = {
+                site: RemoteSite(**remote)
+                for site, remote in stored_data.get("remote_sites", {}).items()
+            }
 
-    async def _async_update_data(self) -> CoordinatorData | None:
-        """Fetch data from sensors."""
+        if self.stale_after or self.intensity_stale_after:
+            from .health import SourceHealth
+
+            self.health = SourceHealth(self.stale_after, self.intensity_stale_after)
+            if stored_data and "gaps" in stored_data:
+                self.health.restore(stored_data["gaps"])
+
+        if self.source_mode == SOURCE_MODE_ENERGY_DASHBOARD:
+            from .energy_dashboard import EnergyDashboardSource
+
+            source = EnergyDashboardSource(self.hass, self.async_set_energy_entities)
+            await source.async_setup()
+            self.entry.async_on_unload(source.close)
+
+        if self.virtual_sources and "recorder" in self.hass.config.components:
+            from .statistics import VirtualSourceStatistics
+
+            self._statistics = VirtualSourceStatistics(self.hass, self.entry.entry_id)
+
+        if self.power_entities:
+            from .power import PowerIntegrator
+
+            self._power = PowerIntegrator(
+                self.hass,
+                self.power_entities,
+                self.entry.data.get(CONF_POWER_INTEGRATION, INTEGRATION_TRAPEZOIDAL),
+            )
+            self.entry.async_on_unload(self._power.async_setup())
+
+        if self.intensity_table:
+            self._intensity_providers.append(
+                await self._async_load_table(
+                    self.intensity_table, "intensity", "carbon intensity"
+                )
+            )
+
+        if self.tariff_table:
+            self._price_providers.append(
+                await self._async_load_table(self.tariff_table, "price", "tariff")
+            )
+
+        if self.spool_dir:
+            from .spool import SpoolWriter
+
+            self._spool_writer = SpoolWriter(
+                self.hass,
+                self.hass.config.path(self.spool_dir),
+                self.entry.entry_id,
+                self.hass.config.location_name,
+            )
+            await self._spool_writer.async_setup()
+
+        if self.ingest_dir:
+            from .spool import SpoolReader
+
+            self._spool_reader = SpoolReader(
+                self.hass.config.path(self.ingest_dir), self.entry.entry_id
+            )
+            if stored_data and "spool" in stored_data:
+                self._spool_reader.restore(stored_data["spool"])
+
+        if self.budget_configs:
+            from .budgets import BudgetEngine
+
+            self._budgets = BudgetEngine(
+                self.hass, self.entry.entry_id, self.budget_configs
+            )
+            if stored_data and "budgets" in stored_data:
+                self._budgets.restore(stored_data["budgets"])
+
+        if self.export_format:
+            from .export import CarbonExporter
+
+            self._exporter = CarbonExporter(
+                self.hass,
+                self.hass.config.path(DOMAIN, "export"),
+                self.export_format,
+                f"carbon_{self.entry.entry_id}",
+            )
+            await self._exporter.async_setup()
+
+        # Config entries are not unloaded when Home Assistant stops, write the
+        # queued snapshot, buffered records and Parquet footers before the
+        # executor exits
+        self.entry.async_on_unload(
+            self.hass.bus.async_listen(
+                EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_write_pending
+            )
+        )
+
+    async def _async_load_table(
+        self, path: str, column: str, kind: str
+    ) -> "TableIntensityProvider":
+        """Load a table of values per kWh, relative to the configuration directory."""
+        from .intensity_table import TableIntensityProvider
+
+        provider = TableIntensityProvider(self.hass.config.path(path), column)
         try:
-            carbon_intensity = self._get_carbon_intensity()
-            if carbon_intensity is None:
-                return None
+            await self.hass.async_add_executor_job(provider.load)
+        except (OSError, ValueError, KeyError) as err:
+            raise ConfigEntryError(
+                f"Unable to load {kind} table {provider.path}: {err}"
+            ) from err
+        self.entry.async_on_unload(provider.close)
+        return provider
+
+    async def async_shutdown(self) -> None:
+        """Stop updating and write pending data."""
+        await super().async_shutdown()
+        await self._async_write_pending()
+
+    async def _async_write_pending(self, _event: Event | None = None) -> None:
+        """Write the queued snapshot and pending exported records."""
+        await self._store.async_flush()
+        if self._spool_writer:
+            await self._spool_writer.async_flush()
+        if self._exporter:
+            await self._exporter.async_close()
 
-            result = CoordinatorData(
-                carbon_intensity=carbon_intensity,
-                energy_sensors={},
-                total_carbon=self._total_carbon,
+    @callback
+    def async_set_energy_entities(self, entity_ids: list[str]) -> None:
+        """Replace the energy entities, from the next refresh on.
+
+        Updates don't await while holding the state lock, so this callback
+        always runs between them.
+        """
+        entity_ids = [*entity_ids, *self.power_entities]
+        added = [
+            entity_id
+            for entity_id in entity_ids
+            if entity_id not in self.energy_entities
+        ]
+        removed = set(self.energy_entities).difference(entity_ids)
+        if not added and not removed:
+            return
+
+        _LOGGER.debug("Energy entities added: %s, removed: %s", added, removed)
+        self.energy_entities = list(entity_ids)
+        if removed:
+            # Entities added back start from their next value, not a stale one
+            self._previous_energy_values = {
+                entity_id: value
+                for entity_id, value in self._previous_energy_values.items()
+                if entity_id not in removed
+            }
+            for entity_id in removed:
+                self._energy_read_at.pop(entity_id, None)
+                if self.health:
+                    self.health.degraded.pop(entity_id, None)
+        if added:
+            async_dispatcher_send(
+                self.hass,
+                SIGNAL_ENERGY_ENTITIES_ADDED.format(self.entry.entry_id),
+                added,
             )
 
-            current_update_carbon = 0
-            first_update_after_load = not self.data  # Check if this is the first run
+    def has_sensor(self, entity_id: str) -> bool:
+        """Return whether an energy entity gets its own sensor."""
+        return not self.virtual_sources or entity_id in self.sensor_entities
 
-            for energy_entity_id in self.energy_entities:
-                energy_value = self._get_energy_value(energy_entity_id)
-                if energy_value is None:
-                    continue
+    @property
+    def total_carbon(self) -> float:
+        """Return the running total carbon footprint."""
+        return self._total_carbon
 
-                prev_value = self._previous_energy_values.get(energy_entity_id)
+    @property
+    def entity_carbon(self) -> Mapping[str, float]:
+        """Return the running carbon footprint per energy entity."""
+        return self._entity_carbon
 
-                # Always update the previous value for the next cycle
-                self._previous_energy_values[energy_entity_id] = energy_value
+    @property
+    def total_cost(self) -> float:
+        """Return the running total energy cost."""
+        return self._total_cost
 
-                # If prev_value is None (first time seeing this sensor ever)
-                # or if it's the first update cycle after loading stored data,
-                # skip calculation and just report stored carbon.
-                if prev_value is None or first_update_after_load:
-                    result.energy_sensors[energy_entity_id] = EnergySensor(
-                        value=0,  # No consumption calculated yet
-                        carbon=self._entity_carbon.get(energy_entity_id, 0),
-                    )
-                    continue
+    @property
+    def entity_cost(self) -> Mapping[str, float]:
+        """Return the running energy cost per energy entity."""
+        return self._entity_cost
 
-                # Calculate consumption since last update (in kWh)
-                consumption = max(
-                    0, energy_value - prev_value
-                )  # Ensure non-negative value
+    @property
+    def total_emissions(self) -> Mapping[str, float]:
+        """Return the running total of each accounted emission dimension."""
+        return dict(
+            zip(self.emission_dimensions, self._total_emissions.values, strict=True)
+        )
 
-                # Calculate carbon footprint (carbon intensity is in g/kWh)
-                carbon = (consumption * carbon_intensity) / 1000  # Convert to kg of CO2
+    @property
+    def remote_sites(self) -> Mapping[str, RemoteSite]:
+        """Return the sites ingested from the spool, by site id."""
+        return self._remote_sites
 
-                # Update running totals
-                entity_total = self._entity_carbon.get(energy_entity_id, 0) + carbon
-                self._entity_carbon[energy_entity_id] = entity_total
-                current_update_carbon += carbon
+    def _check_consistency(self) -> bool:
+        """Check that the total is the sum of the entity, reset and site totals."""
+        parts = math.fsum(
+            [
+                *self._entity_carbon.values(),
+                self._reset_carbon,
+                *(site.carbon for site in self._remote_sites.values()),
+            ]
+        )
+        if math.isclose(
+            self._total_carbon, parts, rel_tol=CONSISTENCY_TOLERANCE, abs_tol=1e-12
+        ):
+            return True
 
-                result.energy_sensors[energy_entity_id] = EnergySensor(
-                    value=consumption,
-                    carbon=entity_total,
-                )
+        _LOGGER.warning(
+            "Total carbon footprint %s differs from the sum of its parts %s",
+            self._total_carbon,
+            parts,
+        )
+        return False
 
-            # Update total carbon footprint
-            self._total_carbon += current_update_carbon
-            result.total_carbon = self._total_carbon
+    def _snapshot(self) -> dict[str, Any]:
+        """Return the persisted state.
 
-            # Save data to persistent storage
-            await self._store.async_save(
-                {
-                    "total_carbon": self._total_carbon,
-                    "entity_carbon": self._entity_carbon,
-                    "previous_energy_values": self._previous_energy_values,
-                }
+        State dicts are replaced, never mutated, once published, so the
+        snapshot can be saved without copying while updates go on.
+        """
+        snapshot = {
+            "total_carbon": self._total_carbon,
+            "entity_carbon": self._entity_carbon,
+            "previous_energy_values": self._previous_energy_values,
+            "total_carbon_error": self._total_carbon_error,
+            "entity_carbon_error": self._entity_carbon_error,
+            "reset_carbon": self._reset_carbon,
+            "intensity_stats": self._intensity_stats,
+        }
+        if self.emission_dimensions:
+            snapshot["emission_dimensions"] = self.emission_dimensions
+            snapshot["total_emissions"] = self._total_emissions
+            snapshot["entity_emissions"] = self._entity_emissions
+        if self.pricing:
+            snapshot["total_cost"] = self._total_cost
+            snapshot["total_cost_error"] = self._total_cost_error
+            snapshot["entity_cost"] = self._entity_cost
+            snapshot["entity_cost_error"] = self._entity_cost_error
+        if self.health:
+            snapshot["gaps"] = self.health.gaps
+        if self._spool_reader:
+            snapshot["remote_sites"] = self._remote_sites
+            snapshot["spool"] = self._spool_reader.as_dict()
+        if self._budgets:
+            # Budgets are few and mutated in place, their state is copied
+            snapshot["budgets"] = self._budgets.as_dict()
+        return snapshot
+
+    async def async_reset_counter(self, energy_entity_id: str | None = None) -> None:
+        """Reset the counter of an energy entity, or all counters."""
+        async with self._state_lock:
+            if energy_entity_id:
+                # Reset only the specified entity
+                if energy_entity_id not in self._previous_energy_values:
+                    return
+                _LOGGER.debug("Resetting counter for %s", energy_entity_id)
+                previous_energy_values = dict(self._previous_energy_values)
+                previous_energy_values.pop(energy_entity_id)
+                self._previous_energy_values = previous_energy_values
+                if energy_entity_id in self._entity_carbon:
+                    # The total keeps the carbon of the entity
+                    self._reset_carbon += self._entity_carbon[energy_entity_id]
+                    self._entity_carbon = {**self._entity_carbon, energy_entity_id: 0}
+                    self._entity_carbon_error = {
+                        **self._entity_carbon_error,
+                        energy_entity_id: 0,
+                    }
+                if energy_entity_id in self._intensity_stats:
+                    intensity_stats = dict(self._intensity_stats)
+                    intensity_stats.pop(energy_entity_id)
+                    self._intensity_stats = intensity_stats
+                if energy_entity_id in self._entity_emissions:
+                    entity_emissions = dict(self._entity_emissions)
+                    entity_emissions.pop(energy_entity_id)
+                    self._entity_emissions = entity_emissions
+                if energy_entity_id in self._entity_cost:
+                    # Like the carbon, the total keeps the cost of the entity
+                    self._entity_cost = {**self._entity_cost, energy_entity_id: 0}
+                    self._entity_cost_error = {
+                        **self._entity_cost_error,
+                        energy_entity_id: 0,
+                    }
+                if self.health and energy_entity_id in self.health.gaps:
+                    gaps = dict(self.health.gaps)
+                    gaps.pop(energy_entity_id)
+                    self.health.gaps = gaps
+            else:
+                # Reset all counters
+                _LOGGER.debug("Resetting all counters")
+                self._previous_energy_values = {}
+                self._entity_carbon = {}
+                self._entity_carbon_error = {}
+                self._intensity_stats = {}
+                self._entity_emissions = {}
+                self._total_emissions = Emissions.zero(len(self.emission_dimensions))
+                self._total_carbon = 0
+                self._total_carbon_error = 0
+                self._reset_carbon = 0
+                self._entity_cost = {}
+                self._entity_cost_error = {}
+                self._total_cost = 0
+                self._total_cost_error = 0
+                # Ingested records are not ingested again, sites restart at 0
+                self._remote_sites = {}
+                if self.health:
+                    self.health.gaps = {}
+            snapshot = self._snapshot()
+
+        # Save the reset state to persistent storage
+        await self._store.async_save(snapshot)
+
+    @property
+    def profiling(self) -> bool:
+        """Return whether the next refreshes are profiled."""
+        return self._profiler is not None
+
+    async def async_profile(self, refreshes: int) -> str:
+        """Profile the next refreshes, return the file the profile goes to."""
+        from .profiling import RefreshProfiler
+
+        path = self.hass.config.path(
+            DOMAIN,
+            f"profile_{self.entry.entry_id}_{dt_util.utcnow():%Y%m%d%H%M%S}.prof",
+        )
+        self._profiler = await self.hass.async_add_executor_job(
+            RefreshProfiler, path, refreshes
+        )
+        return path
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data and sensors, profiled while a profile is requested."""
+        if (profiler := self._profiler) is None:
+            await super()._async_refresh(*args, **kwargs)
+            return
+
+        profiler.enable()
+        try:
+            await super()._async_refresh(*args, **kwargs)
+        finally:
+            profiler.disable()
+            if profiler.done:
+                self._profiler = None
+                await self.hass.async_add_executor_job(profiler.write)
+
+    async def _async_update_data(self) -> CoordinatorData | None:
+        """Fetch data from sensors."""
+        try:
+            # Tailing the spool does I/O, its records are accounted below
+            spool = (
+                await self.hass.async_add_executor_job(self._spool_reader.read)
+                if self._spool_reader
+                else None
             )
+            async with self._state_lock:
+                ingested = spool is not None and self._ingest(*spool)
+                result = self._update_state()
+                if result is None and not ingested:
+                    return None
+                snapshot = self._snapshot()
+
+            # Encoded and written by the store worker, the loop only queues it
+            self._store.async_schedule_save(snapshot)
+
+            if self._spool_writer:
+                self._spool_writer.async_update(
+                    dt_util.utcnow().timestamp(), self._total_carbon, self._total_cost
+                )
+
+            if result is None:
+                return None
+            result.sites = self._remote_sites
+
+            if self._exporter:
+                self._exporter.async_schedule_flush()
 
             _LOGGER.debug(f"Carbon footprint result: {result}")
 
@@ -122,28 +648,386 @@ class CarbonFootprintCoordinator(DataUpdateCoordinator[CoordinatorData]):
         except Exception as err:
             raise UpdateFailed(f"Error updating carbon footprint: {err}") from err
 
-    def _get_carbon_intensity(self) -> float | None:
-        """Get carbon intensity value from the entity."""
-        if not self.carbon_intensity_entity:
+    def _update_state(self) -> CoordinatorData | None:
+        """Add the consumption since the last update to the running totals."""
+        now = dt_util.utcnow()
+        timestamp = now.timestamp()
+        health = self.health
+        if (
+            health
+            and self.carbon_intensity_entity
+            and (state := self.hass.states.get(self.carbon_intensity_entity))
+        ):
+            health.check(
+                self.carbon_intensity_entity,
+                self.intensity_stale_after,
+                state.last_reported_timestamp,
+                timestamp,
+            )
+        carbon_intensity = self._get_carbon_intensity(now)
+        if carbon_intensity is None:
+            if health:
+                self._record_intensity_gaps(timestamp)
             return None
 
-        state = self.hass.states.get(self.carbon_intensity_entity)
-        if not state:
-            _LOGGER.error(
-                "Carbon intensity entity %s not found", self.carbon_intensity_entity
+        result = CoordinatorData(
+            carbon_intensity=carbon_intensity,
+            energy_sensors={},
+            total_carbon=self._total_carbon,
+        )
+
+        total_carbon = self._total_carbon
+        total_carbon_error = self._total_carbon_error
+        # Check if this is the first run
+        first_update_after_load = not self.data and not self._gap_refresh
+        self._gap_refresh = False
+        exporter = self._exporter
+        budgets = self._budgets
+        update_carbon: dict[str, float] = {}
+        timeseries = self.timeseries
+        gaps: list[tuple[str, Gap]] = []
+        history = self._intensity_history
+        previous_refresh = history.last_timestamp
+        history.add(timestamp, carbon_intensity)
+        energy_read_at = self._energy_read_at
+        power = self._power
+        update_energy_total = 0.0
+        update_carbon_total = 0.0
+        today = dt_util.as_local(now).date()
+        day_start = dt_util.start_of_local_day(today).timestamp()
+        week_start = dt_util.start_of_local_day(
+            today - timedelta(days=today.weekday())
+        ).timestamp()
+        # Copy on write, the published dicts may still be referenced by a save
+        previous_energy_values = dict(self._previous_energy_values)
+        entity_carbon = dict(self._entity_carbon)
+        entity_carbon_error = dict(self._entity_carbon_error)
+        intensity_stats = dict(self._intensity_stats)
+        entity_emissions = dict(self._entity_emissions)
+        total_emissions = self._total_emissions
+        # Intensities of the other dimensions, read once for all entities
+        dimensions = self.emission_dimensions
+        market_intensity = self._get_market_intensity(now) if dimensions else None
+        emission_intensities = (
+            self._emission_intensities(carbon_intensity, market_intensity)
+            if dimensions
+            else []
+        )
+        # Priced in the same pass, an unknown price books no cost
+        price = self._get_price(now) if self.pricing else None
+        entity_cost = dict(self._entity_cost)
+        entity_cost_error = dict(self._entity_cost_error)
+        total_cost = self._total_cost
+        total_cost_error = self._total_cost_error
+
+        for energy_entity_id in self.energy_entities:
+            reading = (
+                self._get_power_reading(energy_entity_id, timestamp)
+                if power and energy_entity_id in power.entity_ids
+                else self._get_energy_reading(energy_entity_id)
+            )
+            if reading is None:
+                continue
+            energy_value, energy_updated, energy_reported = reading
+            stale_since = (
+                health.check(
+                    energy_entity_id, self.stale_after, energy_reported, timestamp
+                )
+                if health
+                else None
             )
-            return None
 
-        try:
-            return float(state.state)
-        except (ValueError, TypeError):
-            _LOGGER.error(
-                "Unable to convert carbon intensity value to float: %s", state.state
+            prev_value = previous_energy_values.get(energy_entity_id)
+            read_at = energy_read_at.get(energy_entity_id)
+            if prev_value is None or energy_value != prev_value:
+                energy_read_at[energy_entity_id] = timestamp
+
+            # Always update the previous value for the next cycle
+            previous_energy_values[energy_entity_id] = energy_value
+
+            # If prev_value is None (first time seeing this sensor ever)
+            # or if it's the first update cycle after loading stored data,
+            # skip calculation and just report stored carbon.
+            if prev_value is None or first_update_after_load:
+                result.energy_sensors[energy_entity_id] = EnergySensor(
+                    value=0,  # No consumption calculated yet
+                    carbon=entity_carbon.get(energy_entity_id, 0),
+                    stats=intensity_stats.get(energy_entity_id),
+                    emissions=entity_emissions.get(energy_entity_id),
+                    cost=entity_cost.get(energy_entity_id),
+                )
+                continue
+
+            # Calculate consumption since last update (in kWh)
+            consumption = max(0, energy_value - prev_value)  # Ensure non-negative value
+            if stale_since is not None and consumption:
+                # Used while the meter was stale, when is unknown
+                gaps.append(
+                    (
+                        energy_entity_id,
+                        Gap(stale_since, min(energy_updated, timestamp), consumption),
+                    )
+                )
+                consumption = 0
+
+            entity_intensity = carbon_intensity
+            if (
+                consumption
+                and read_at is not None
+                and previous_refresh is not None
+                and read_at < previous_refresh
+            ):
+                # The meter kept its previous value over several refreshes,
+                # spread the delta over them until it reported the new one
+                average = history.average(read_at, min(energy_updated, timestamp))
+                if average is not None:
+                    entity_intensity = average
+
+            # Calculate carbon footprint (carbon intensity is in g/kWh)
+            carbon = (consumption * entity_intensity) / 1000  # Convert to kg of CO2
+
+            # Update running totals, compensating rounding errors so they
+            # don't build up over years of small additions
+            entity_total, entity_carbon_error[energy_entity_id] = compensated_add(
+                entity_carbon.get(energy_entity_id, 0),
+                entity_carbon_error.get(energy_entity_id, 0),
+                carbon,
             )
-            return None
+            entity_carbon[energy_entity_id] = entity_total
+            total_carbon, total_carbon_error = compensated_add(
+                total_carbon, total_carbon_error, carbon
+            )
+
+            if budgets and carbon:
+                update_carbon[energy_entity_id] = carbon
+
+            if timeseries:
+                timeseries.add(energy_entity_id, timestamp, consumption, carbon)
+                update_energy_total += consumption
+                update_carbon_total += carbon
+
+            if exporter and consumption:
+                exporter.add(
+                    now, energy_entity_id, consumption, entity_intensity, carbon
+                )
+
+            # Also rolls the day and week over when nothing was consumed
+            stats = intensity_stats.get(energy_entity_id, IntensityStats()).add(
+                day_start, week_start, consumption, carbon
+            )
+            intensity_stats[energy_entity_id] = stats
+
+            emissions = None
+            if dimensions:
+                deltas = [
+                    consumption * intensity / 1000
+                    for intensity in (
+                        emission_intensities
+                        if entity_intensity == carbon_intensity
+                        else self._emission_intensities(
+                            entity_intensity, market_intensity
+                        )
+                    )
+                ]
+                emissions = entity_emissions.get(
+                    energy_entity_id, Emissions.zero(len(dimensions))
+                ).add(deltas)
+                entity_emissions[energy_entity_id] = emissions
+                total_emissions = total_emissions.add(deltas)
+
+            if price is not None:
+                cost = consumption * price
+                entity_cost[energy_entity_id], entity_cost_error[energy_entity_id] = (
+                    compensated_add(
+                        entity_cost.get(energy_entity_id, 0),
+                        entity_cost_error.get(energy_entity_id, 0),
+                        cost,
+                    )
+                )
+                total_cost, total_cost_error = compensated_add(
+                    total_cost, total_cost_error, cost
+                )
+
+            result.energy_sensors[energy_entity_id] = EnergySensor(
+                value=consumption,
+                carbon=entity_total,
+                stats=stats,
+                emissions=emissions,
+                cost=entity_cost.get(energy_entity_id),
+            )
+
+        # Publish the new state and update total carbon footprint
+        self._previous_energy_values = previous_energy_values
+        self._entity_carbon = entity_carbon
+        self._entity_carbon_error = entity_carbon_error
+        self._intensity_stats = intensity_stats
+        self._total_carbon = total_carbon
+        self._total_carbon_error = total_carbon_error
+        result.total_carbon = self._total_carbon
+        if dimensions:
+            self._entity_emissions = entity_emissions
+            self._total_emissions = total_emissions
+            result.emissions = dict(
+                zip(dimensions, total_emissions.values, strict=True)
+            )
+
+        if self.pricing:
+            self._entity_cost = entity_cost
+            self._entity_cost_error = entity_cost_error
+            self._total_cost = total_cost
+            self._total_cost_error = total_cost_error
+            result.total_cost = total_cost
+
+        if gaps:
+            assert health is not None
+            health.add_gaps(gaps)
+
+        if timeseries:
+            timeseries.add_total(timestamp, update_energy_total, update_carbon_total)
+
+        if budgets:
+            budgets.async_update(now, update_carbon)
+
+        if self._statistics:
+            # Only iterated once an hour, when statistics are added
+            self._statistics.async_update(
+                now,
+                entity_carbon,
+                (
+                    entity_id
+                    for entity_id in self.energy_entities
+                    if not self.has_sensor(entity_id)
+                ),
+            )
+
+        return result
+
+    def _ingest(
+        self,
+        records: list[dict[str, Any]],
+        offsets: dict[str, int],
+        sequences: dict[str, int],
+    ) -> bool:
+        """Add the deltas of spooled records to the totals of their sites.
+
+        Return whether a record was accounted.
+        """
+        reader = self._spool_reader
+        assert reader is not None
+        remote_sites = dict(self._remote_sites)
+        total_carbon = self._total_carbon
+        total_carbon_error = self._total_carbon_error
+        total_cost = self._total_cost
+        total_cost_error = self._total_cost_error
+        accounted = False
+        for record in records:
+            site = record["site"]
+            # Read again by an overlapping refresh
+            if record["seq"] <= reader.sequences.get(site, 0):
+                continue
+            accounted = True
+            remote = remote_sites.get(site) or RemoteSite(record["name"])
+            remote_sites[site] = remote.add(
+                record["name"], record["carbon"], record["cost"]
+            )
+            total_carbon, total_carbon_error = compensated_add(
+                total_carbon, total_carbon_error, record["carbon"]
+            )
+            if self.pricing:
+                total_cost, total_cost_error = compensated_add(
+                    total_cost, total_cost_error, record["cost"]
+                )
+
+        reader.commit(offsets, sequences)
+        if accounted:
+            self._remote_sites = remote_sites
+            self._total_carbon = total_carbon
+            self._total_carbon_error = total_carbon_error
+            self._total_cost = total_cost
+            self._total_cost_error = total_cost_error
+        return accounted
 
-    def _get_energy_value(self, entity_id: str) -> float | None:
-        """Get energy consumption value from an entity."""
+    def _record_intensity_gaps(self, timestamp: float) -> None:
+        """Record the energy used since the last refresh as gaps.
+
+        Without a current carbon intensity, the energy can't be charged, the
+        previous values move on so it isn't charged later at another one.
+        """
+        assert self.health is not None
+        if not self.data and not self._gap_refresh:
+            # The stored values may predate a restart, as when charging
+            return
+
+        power = self._power
+        energy_read_at = self._energy_read_at
+        previous_energy_values = dict(self._previous_energy_values)
+        gaps: list[tuple[str, Gap]] = []
+        for energy_entity_id in self.energy_entities:
+            reading = (
+                self._get_power_reading(energy_entity_id, timestamp)
+                if power and energy_entity_id in power.entity_ids
+                else self._get_energy_reading(energy_entity_id)
+            )
+            if reading is None:
+                continue
+            energy_value, energy_updated, _energy_reported = reading
+
+            prev_value = previous_energy_values.get(energy_entity_id)
+            read_at = energy_read_at.get(energy_entity_id, timestamp)
+            if prev_value is None or energy_value != prev_value:
+                energy_read_at[energy_entity_id] = timestamp
+            previous_energy_values[energy_entity_id] = energy_value
+
+            if prev_value is not None and energy_value > prev_value:
+                gaps.append(
+                    (
+                        energy_entity_id,
+                        Gap(
+                            read_at,
+                            min(energy_updated, timestamp),
+                            energy_value - prev_value,
+                        ),
+                    )
+                )
+
+        self._previous_energy_values = previous_energy_values
+        self.health.add_gaps(gaps)
+        self._gap_refresh = True
+
+    def _get_carbon_intensity(self, now: datetime) -> float | None:
+        """Get the carbon intensity from the first provider that has one."""
+        for provider in self._intensity_providers:
+            if (carbon_intensity := provider.intensity(now)) is not None:
+                return carbon_intensity
+        return None
+
+    def _get_price(self, now: datetime) -> float | None:
+        """Get the energy price per kWh from the first provider that has one."""
+        for provider in self._price_providers:
+            if (price := provider.price(now)) is not None:
+                return price
+        return None
+
+    def _get_market_intensity(self, now: datetime) -> float | None:
+        """Get the market-based carbon intensity, if it is accounted."""
+        return self._market_provider.intensity(now) if self._market_provider else None
+
+    def _emission_intensities(
+        self, carbon_intensity: float, market_intensity: float | None
+    ) -> list[float]:
+        """Return the intensity of each emission dimension, in g/kWh."""
+        # An unknown market-based intensity books nothing for the interval
+        market_intensity = market_intensity or 0
+        co2e_factor = self.co2e_factor or 1
+        intensities = {
+            EMISSION_LOCATION_CO2E: carbon_intensity * co2e_factor,
+            EMISSION_MARKET_CO2: market_intensity,
+            EMISSION_MARKET_CO2E: market_intensity * co2e_factor,
+        }
+        return [intensities[dimension] for dimension in self.emission_dimensions]
+
+    def _get_energy_reading(self, entity_id: str) -> tuple[float, float, float] | None:
+        """Get the energy value of an entity, when it changed and last reported."""
         state = self.hass.states.get(entity_id)
         if not state:
             _LOGGER.error("Energy entity %s not found", entity_id)
@@ -154,7 +1038,28 @@ class CarbonFootprintCoordinator(DataUpdateCoordinator[CoordinatorData]):
             return None
 
         try:
-            return float(state.state)
+            value = float(state.state)
         except (ValueError, TypeError):
             _LOGGER.error("Unable to convert energy value to float: %s", state.state)
             return None
+
+        unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+        if unit != UnitOfEnergy.KILO_WATT_HOUR and unit in EnergyConverter.VALID_UNITS:
+            value = EnergyConverter.convert(value, unit, UnitOfEnergy.KILO_WATT_HOUR)
+        return value, state.last_updated_timestamp, state.last_reported_timestamp
+
+    def _get_power_reading(
+        self, entity_id: str, timestamp: float
+    ) -> tuple[float, float, float] | None:
+        """Get the energy integrated from a power entity up to timestamp."""
+        assert self._power is not None
+        energy = self._power.energy(entity_id, timestamp)
+        if energy is None:
+            _LOGGER.warning("Power entity %s has no valid state", entity_id)
+            return None
+        return energy, timestamp, timestamp
+
+
+def _load_emissions(data: Mapping[str, list[float]]) -> Emissions:
+    """Rebuild emissions persisted in a snapshot."""
+    return Emissions(tuple(data["values"]), tuple(data["errors"]))
@@ -2,19 +2,46 @@
 
 import logging
 
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall
-
-from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
-    CarbonFootprintCoordinator,
+from homeassistant.core import (
+    CoreState,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
 )
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.typing import ConfigType
 
+from . import websocket_api
+from .CarbonFootprintCoordinator import CarbonFootprintCoordinator
 from .const import DOMAIN
+from .organization import async_get_organization
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor"]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required("entry_id"): cv.string,
+        vol.Optional("refreshes", default=5): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+    }
+)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the My Carbon Footprint integration."""
+    websocket_api.async_setup(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up My Carbon Footprint from a config entry."""
@@ -24,38 +51,28 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     # Load stored data before refreshing
     await coordinator.async_setup()
-    await coordinator.async_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
+    organization = await async_get_organization(hass)
+    entry.async_on_unload(organization.async_add_site(entry, coordinator))
+
+    if hass.state is CoreState.running:
+        await coordinator.async_refresh()
+    else:
+        # Sensors start from the stored totals, the first computation waits
+        # until startup is over and the source entities had a chance to load
+        async def _async_first_refresh(hass: HomeAssistant) -> None:
+            await coordinator.async_refresh()
+
+        entry.async_on_unload(async_at_started(hass, _async_first_refresh))
 
     # Register services
     async def handle_reset_counter(call: ServiceCall) -> None:
         """Handle the reset counter service call."""
         energy_entity_id = call.data.get("energy_entity_id")
 
-        for entry_id, coordinator in hass.data[DOMAIN].items():
-            if energy_entity_id:
-                # Reset only the specified entity
-                if energy_entity_id in coordinator._previous_energy_values:
-                    _LOGGER.debug("Resetting counter for %s", energy_entity_id)
-                    coordinator._previous_energy_values.pop(energy_entity_id)
-                    if energy_entity_id in coordinator._entity_carbon:
-                        coordinator._entity_carbon[energy_entity_id] = 0
-            else:
-                # Reset all counters
-                _LOGGER.debug("Resetting all counters")
-                coordinator._previous_energy_values = {}
-                coordinator._entity_carbon = {}
-                coordinator._total_carbon = 0
-
-            # Save the reset state to persistent storage
-            await coordinator._store.async_save(
-                {
-                    "total_carbon": coordinator._total_carbon,
-                    "entity_carbon": coordinator._entity_carbon,
-                    "previous_energy_values": coordinator._previous_energy_values,
-                }
-            )
+        for coordinator in hass.data[DOMAIN].values():
+            await coordinator.async_reset_counter(energy_entity_id)
 
         # Force data update
         for coordinator in hass.data[DOMAIN].values():
@@ -63,6 +80,28 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     hass.services.async_register(DOMAIN, "reset_counter", handle_reset_counter)
 
+    async def handle_profile(call: ServiceCall) -> ServiceResponse:
+        """Handle the profile service call."""
+        coordinator = hass.data[DOMAIN].get(call.data["entry_id"])
+        if coordinator is None:
+            raise ServiceValidationError(
+                f"Config entry {call.data['entry_id']} not found"
+            )
+        # Profilers are process wide, one profile at a time
+        if any(other.profiling for other in hass.data[DOMAIN].values()):
+            raise ServiceValidationError("A profile is already running")
+
+        path = await coordinator.async_profile(call.data["refreshes"])
+        return {"path": path}
+
+    hass.services.async_register(
+        DOMAIN,
+        "profile",
+        handle_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
@@ -75,3 +114,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the totals of a deleted config entry from the organization."""
+    (await async_get_organization(hass)).async_remove_site(entry.entry_id)
@@ -0,0 +1,19 @@
+"""Compensated summation of running totals for the My Carbon Footprint integration."""
+
+
+def _two_sum(a: float, b: float) -> tuple[float, float]:
+    """Return the rounded sum of a and b and its exact rounding error."""
+    total = a + b
+    b_virtual = total - a
+    return total, (a - (total - b_virtual)) + (b - b_virtual)
+
+
+def compensated_add(total: float, error: float, value: float) -> tuple[float, float]:
+    """Add value to a running sum kept as a rounded total and its residual error.
+
+    Rounding errors of each addition are carried in the residual and folded
+    back, so total stays the best float approximation of the exact sum however
+    many small values are added to it.
+    """
+    total, addition_error = _two_sum(total, value)
+    return _two_sum(total, error + addition_error)
@@ -0,0 +1,219 @@
+"""Carbon budgets for the My Carbon Footprint integration."""
+
+import logging
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+EVENT_BUDGET_THRESHOLD = f"{DOMAIN}_budget_threshold"
+EVENT_BUDGET_PROJECTED_OVERRUN = f"{DOMAIN}_budget_projected_overrun"
+
+BUDGET_PERIODS = ("day", "week", "month", "year")
+# Fractions of the limit that fire an event when the used carbon crosses them
+DEFAULT_THRESHOLDS = [0.8, 1.0]
+# Seconds into a period before its average rate is projected
+PROJECTION_MIN_ELAPSED = 3600
+
+
+def _unique_names(budgets: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Check that budget names are unique."""
+    names = [budget["name"] for budget in budgets]
+    if len(names) != len(set(names)):
+        raise vol.Invalid("Budget names must be unique")
+    return budgets
+
+
+BUDGET_SCHEMA = vol.Schema(
+    {
+        vol.Required("name"): cv.string,
+        vol.Required("limit"): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)
+        ),
+        vol.Optional("period", default="month"): vol.In(BUDGET_PERIODS),
+        # Energy entities counted against the budget, all of them if omitted
+        vol.Optional("entities"): vol.All(cv.ensure_list, [cv.entity_id]),
+        vol.Optional("thresholds", default=DEFAULT_THRESHOLDS): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(float), vol.Range(min=0))]
+        ),
+    }
+)
+
+BUDGETS_SCHEMA = vol.All(cv.ensure_list, [BUDGET_SCHEMA], _unique_names)
+
+
+def period_bounds(now: datetime, period: str) -> tuple[datetime, datetime]:
+    """Return the local start and end of the period containing now."""
+    today = dt_util.as_local(now).date()
+    if period == "day":
+        start = today
+        end = start + timedelta(days=1)
+    elif period == "week":
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    elif period == "month":
+        start = today.replace(day=1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    else:
+        start = today.replace(month=1, day=1)
+        end = date(start.year + 1, 1, 1)
+    return dt_util.start_of_local_day(start), dt_util.start_of_local_day(end)
+
+
+class CarbonBudget:
+    """Carbon used against a limit over the current period."""
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """Initialize the budget."""
+        self.name: str = config["name"]
+        self.limit: float = config["limit"]
+        self.period: str = config["period"]
+        self.entities: list[str] | None = config.get("entities")
+        self.thresholds: list[float] = sorted(config["thresholds"])
+        self.period_start: datetime | None = None
+        self.period_end: datetime | None = None
+        self.used: float = 0
+        # Number of thresholds crossed in the current period
+        self.crossed: int = 0
+        self.projected_overrun: bool = False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the persisted state of the budget."""
+        return {
+            "period_start": self.period_start.isoformat()
+            if self.period_start
+            else None,
+            "used": self.used,
+            "crossed": self.crossed,
+            "projected_overrun": self.projected_overrun,
+        }
+
+    def restore(self, data: Mapping[str, Any]) -> None:
+        """Restore the state persisted by as_dict."""
+        if not (period_start := dt_util.parse_datetime(data["period_start"] or "")):
+            return
+        self.period_start, self.period_end = period_bounds(period_start, self.period)
+        self.used = data["used"]
+        self.crossed = data["crossed"]
+        self.projected_overrun = data["projected_overrun"]
+
+    def roll(self, now: datetime) -> None:
+        """Start a new period once the current one is over."""
+        if self.period_end is not None and now < self.period_end:
+            return
+        self.period_start, self.period_end = period_bounds(now, self.period)
+        self.used = 0
+        self.crossed = 0
+        self.projected_overrun = False
+
+
+class BudgetEngine:
+    """Check carbon budgets incrementally on each coordinator update.
+
+    Events are only fired when a threshold is crossed, at most once per
+    budget and period, or when the average rate since the start of the period
+    projects the used carbon over the limit by its end. The projection fires
+    again only after it went back under the limit, a short spike barely moves
+    the average.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, entry_id: str, configs: list[dict[str, Any]]
+    ) -> None:
+        """Initialize the budgets of an entry."""
+        self.hass = hass
+        self.entry_id = entry_id
+        self.budgets = [CarbonBudget(config) for config in BUDGETS_SCHEMA(configs)]
+        # Budgets of each energy entity, budgets without entities count all
+        self._entity_budgets: dict[str, list[CarbonBudget]] = {}
+        self._total_budgets: list[CarbonBudget] = []
+        for budget in self.budgets:
+            if budget.entities is None:
+                self._total_budgets.append(budget)
+            for entity_id in budget.entities or ():
+                self._entity_budgets.setdefault(entity_id, []).append(budget)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the persisted state of the budgets."""
+        return {budget.name: budget.as_dict() for budget in self.budgets}
+
+    def restore(self, data: Mapping[str, Any]) -> None:
+        """Restore the state persisted by as_dict."""
+        for budget in self.budgets:
+            if budget.name in data:
+                budget.restore(data[budget.name])
+
+    @callback
+    def async_update(self, now: datetime, carbon: Mapping[str, float]) -> None:
+        """Add the carbon of an update, in kg per energy entity, to the budgets."""
+        added: dict[str, float] = {}
+        for entity_id, entity_carbon in carbon.items():
+            for budget in self._entity_budgets.get(entity_id, ()):
+                added[budget.name] = added.get(budget.name, 0) + entity_carbon
+        update_carbon = sum(carbon.values())
+        for budget in self._total_budgets:
+            added[budget.name] = update_carbon
+
+        for budget in self.budgets:
+            budget.roll(now)
+            budget.used += added.get(budget.name, 0)
+            self._check_thresholds(budget)
+            self._check_projection(now, budget)
+
+    def _check_thresholds(self, budget: CarbonBudget) -> None:
+        """Fire an event for each threshold the used carbon crossed."""
+        while (
+            budget.crossed < len(budget.thresholds)
+            and budget.used >= budget.thresholds[budget.crossed] * budget.limit
+        ):
+            threshold = budget.thresholds[budget.crossed]
+            budget.crossed += 1
+            _LOGGER.debug("Budget %s crossed %s of its limit", budget.name, threshold)
+            self.hass.bus.async_fire(
+                EVENT_BUDGET_THRESHOLD,
+                {**self._event_data(budget), "threshold": threshold},
+            )
+
+    def _check_projection(self, now: datetime, budget: CarbonBudget) -> None:
+        """Fire an event if the average rate of the period overruns the budget."""
+        if budget.used >= budget.limit:
+            return
+
+        assert budget.period_start is not None and budget.period_end is not None
+        elapsed = (now - budget.period_start).total_seconds()
+        if elapsed < PROJECTION_MIN_ELAPSED:
+            return
+        remaining = (budget.period_end - now).total_seconds()
+        projected = budget.used + budget.used / elapsed * remaining
+        if projected <= budget.limit:
+            # Armed again for the next overrun
+            budget.projected_overrun = False
+            return
+        if budget.projected_overrun:
+            return
+
+        budget.projected_overrun = True
+        self.hass.bus.async_fire(
+            EVENT_BUDGET_PROJECTED_OVERRUN,
+            {**self._event_data(budget), "projected": projected},
+        )
+
+    def _event_data(self, budget: CarbonBudget) -> dict[str, Any]:
+        """Return the data shared by the events of a budget."""
+        assert budget.period_start is not None
+        return {
+            "entry_id": self.entry_id,
+            "budget": budget.name,
+            "period": budget.period,
+            "period_start": budget.period_start.isoformat(),
+            "used": budget.used,
+            "limit": budget.limit,
+        }
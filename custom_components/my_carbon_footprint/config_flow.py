@@ -7,29 +7,84 @@ from homeassistant import config_entries
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import selector
 
-from .const import CONF_CARBON_INTENSITY, CONF_ENERGY_ENTITIES, DOMAIN
+from .const import (
+    CONF_BUDGETS,
+    CONF_CARBON_INTENSITY,
+    CONF_CO2E_FACTOR,
+    CONF_ENERGY_ENTITIES,
+    CONF_EXPORT_FORMAT,
+    CONF_INGEST_DIR,
+    CONF_INTENSITY_STALE_AFTER,
+    CONF_INTENSITY_TABLE,
+    CONF_MARKET_INTENSITY,
+    CONF_POWER_ENTITIES,
+    CONF_POWER_INTEGRATION,
+    CONF_PRICE_ENTITY,
+    CONF_SENSOR_ENTITIES,
+    CONF_SOURCE_MODE,
+    CONF_SPOOL_DIR,
+    CONF_STALE_AFTER,
+    CONF_TARIFF_TABLE,
+    CONF_TIMESERIES_MAX_SOURCES,
+    CONF_VIRTUAL_SOURCES,
+    DEFAULT_TIMESERIES_MAX_SOURCES,
+    DOMAIN,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_PARQUET,
+    INTEGRATION_METHODS,
+    INTEGRATION_TRAPEZOIDAL,
+    SOURCE_MODE_ENERGY_DASHBOARD,
+    SOURCE_MODE_ENTITIES,
+)
 
 
 def validate_input(hass: HomeAssistant, user_input: dict[str, Any]) -> dict[str, str]:
     """Validate the user input."""
     errors = {}
-    carbon_intensity_entity = user_input[CONF_CARBON_INTENSITY]
-    energy_entities = user_input[CONF_ENERGY_ENTITIES]
+    carbon_intensity_entity = user_input.get(CONF_CARBON_INTENSITY)
+    energy_entities = user_input.get(CONF_ENERGY_ENTITIES, [])
+    if user_input.get(CONF_SOURCE_MODE) == SOURCE_MODE_ENERGY_DASHBOARD:
+        # Read from the Energy dashboard preferences instead
+        energy_entities = []
 
     # Check if entities exist
-    if not hass.states.get(carbon_intensity_entity):
-        errors[CONF_CARBON_INTENSITY] = "entity_not_found"
+    if carbon_intensity_entity:
+        if not hass.states.get(carbon_intensity_entity):
+            errors[CONF_CARBON_INTENSITY] = "entity_not_found"
+    elif not user_input.get(CONF_INTENSITY_TABLE):
+        errors["base"] = "no_intensity_source"
 
     for entity_id in energy_entities:
         if not hass.states.get(entity_id):
             errors[CONF_ENERGY_ENTITIES] = "entity_not_found"
             break
 
+    if (price_entity := user_input.get(CONF_PRICE_ENTITY)) and not hass.states.get(
+        price_entity
+    ):
+        errors[CONF_PRICE_ENTITY] = "entity_not_found"
+
+    for entity_id in user_input.get(CONF_POWER_ENTITIES, []):
+        if not hass.states.get(entity_id):
+            errors[CONF_POWER_ENTITIES] = "entity_not_found"
+            break
+
+    if user_input.get(CONF_BUDGETS):
+        from .budgets import BUDGETS_SCHEMA
+
+        try:
+            BUDGETS_SCHEMA(user_input[CONF_BUDGETS])
+        except vol.Invalid:
+            errors[CONF_BUDGETS] = "invalid_budgets"
+
     return errors
 
 
-def get_schema(defaults: dict[str, Any]) -> vol.Schema:
-    """Get the schema with the given defaults."""
+def get_schema(defaults: dict[str, Any], *, initial_setup: bool = True) -> vol.Schema:
+    """Get the schema with the given defaults.
+
+    Settings only read when the entry is set up are left out of the options.
+    """
     carbon_intensity_selector = selector.EntitySelector(
         selector.EntitySelectorConfig(
             domain=["sensor"],
@@ -44,19 +99,153 @@ def get_schema(defaults: dict[str, Any]) -> vol.Schema:
         )
     )
 
-    return vol.Schema(
-        {
-            vol.Required(
-                CONF_CARBON_INTENSITY,
-                default=defaults.get(CONF_CARBON_INTENSITY, ""),
-            ): carbon_intensity_selector,
-            vol.Required(
-                CONF_ENERGY_ENTITIES,
-                default=defaults.get(CONF_ENERGY_ENTITIES, []),
-            ): energy_entities_selector,
-        }
+    export_format_selector = selector.SelectSelector(
+        selector.SelectSelectorConfig(
+            options=[EXPORT_FORMAT_CSV, EXPORT_FORMAT_PARQUET],
+            translation_key=CONF_EXPORT_FORMAT,
+        )
     )
 
+    schema = {
+        # Optional when the intensity is read from a table
+        vol.Optional(
+            CONF_CARBON_INTENSITY,
+            description={"suggested_value": defaults.get(CONF_CARBON_INTENSITY)},
+        ): carbon_intensity_selector,
+        vol.Required(
+            CONF_ENERGY_ENTITIES,
+            default=defaults.get(CONF_ENERGY_ENTITIES, []),
+        ): energy_entities_selector,
+        # The only intensity source of entries without a sensor
+        vol.Optional(
+            CONF_INTENSITY_TABLE,
+            description={"suggested_value": defaults.get(CONF_INTENSITY_TABLE)},
+        ): selector.TextSelector(),
+    }
+    if initial_setup:
+        schema[
+            vol.Optional(
+                CONF_SOURCE_MODE,
+                default=defaults.get(CONF_SOURCE_MODE, SOURCE_MODE_ENTITIES),
+            )
+        ] = selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=[SOURCE_MODE_ENTITIES, SOURCE_MODE_ENERGY_DASHBOARD],
+                translation_key=CONF_SOURCE_MODE,
+            )
+        )
+        schema[
+            vol.Optional(
+                CONF_POWER_ENTITIES,
+                description={"suggested_value": defaults.get(CONF_POWER_ENTITIES)},
+            )
+        ] = selector.EntitySelector(
+            selector.EntitySelectorConfig(
+                domain=["sensor"], device_class=["power"], multiple=True
+            )
+        )
+        schema[
+            vol.Optional(
+                CONF_POWER_INTEGRATION,
+                default=defaults.get(CONF_POWER_INTEGRATION, INTEGRATION_TRAPEZOIDAL),
+            )
+        ] = selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=INTEGRATION_METHODS,
+                translation_key=CONF_POWER_INTEGRATION,
+            )
+        )
+        schema[
+            vol.Optional(
+                CONF_VIRTUAL_SOURCES,
+                default=defaults.get(CONF_VIRTUAL_SOURCES, False),
+            )
+        ] = selector.BooleanSelector()
+        schema[
+            vol.Optional(
+                CONF_SENSOR_ENTITIES,
+                description={"suggested_value": defaults.get(CONF_SENSOR_ENTITIES)},
+            )
+        ] = energy_entities_selector
+        schema[
+            vol.Optional(
+                CONF_MARKET_INTENSITY,
+                description={"suggested_value": defaults.get(CONF_MARKET_INTENSITY)},
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0,
+                step="any",
+                unit_of_measurement="g CO2/kWh",
+                mode=selector.NumberSelectorMode.BOX,
+            )
+        )
+        schema[
+            vol.Optional(
+                CONF_CO2E_FACTOR,
+                description={"suggested_value": defaults.get(CONF_CO2E_FACTOR)},
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=1, step="any", mode=selector.NumberSelectorMode.BOX
+            )
+        )
+        schema[
+            vol.Optional(
+                CONF_PRICE_ENTITY,
+                description={"suggested_value": defaults.get(CONF_PRICE_ENTITY)},
+            )
+        ] = selector.EntitySelector(
+            selector.EntitySelectorConfig(domain=["sensor", "input_number"])
+        )
+        schema[
+            vol.Optional(
+                CONF_TARIFF_TABLE,
+                description={"suggested_value": defaults.get(CONF_TARIFF_TABLE)},
+            )
+        ] = selector.TextSelector()
+        for key in (CONF_STALE_AFTER, CONF_INTENSITY_STALE_AFTER):
+            schema[
+                vol.Optional(key, description={"suggested_value": defaults.get(key)})
+            ] = selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=1,
+                    step=1,
+                    unit_of_measurement="min",
+                    mode=selector.NumberSelectorMode.BOX,
+                )
+            )
+        for key in (CONF_SPOOL_DIR, CONF_INGEST_DIR):
+            schema[
+                vol.Optional(key, description={"suggested_value": defaults.get(key)})
+            ] = selector.TextSelector()
+        schema[
+            vol.Optional(
+                CONF_EXPORT_FORMAT,
+                description={"suggested_value": defaults.get(CONF_EXPORT_FORMAT)},
+            )
+        ] = export_format_selector
+        schema[
+            vol.Optional(
+                CONF_TIMESERIES_MAX_SOURCES,
+                default=defaults.get(
+                    CONF_TIMESERIES_MAX_SOURCES, DEFAULT_TIMESERIES_MAX_SOURCES
+                ),
+            )
+        ] = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0, step=1, mode=selector.NumberSelectorMode.BOX
+            )
+        )
+        schema[
+            vol.Optional(
+                CONF_BUDGETS,
+                description={"suggested_value": defaults.get(CONF_BUDGETS)},
+            )
+        ] = selector.ObjectSelector()
+
+    return vol.Schema(schema)
+
 
 class CarbonFootprintConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for My Carbon Footprint."""
@@ -104,6 +293,7 @@ class CarbonFootprintOptionsFlow(config_entries.OptionsFlow):
                 CONF_CARBON_INTENSITY, ""
             ),
             CONF_ENERGY_ENTITIES: self.config_entry.data.get(CONF_ENERGY_ENTITIES, []),
+            CONF_INTENSITY_TABLE: self.config_entry.data.get(CONF_INTENSITY_TABLE),
         }
 
         if user_input is not None:
@@ -116,6 +306,6 @@ class CarbonFootprintOptionsFlow(config_entries.OptionsFlow):
 
         return self.async_show_form(
             step_id="init",
-            data_schema=get_schema(defaults),
+            data_schema=get_schema(defaults, initial_setup=False),
             errors=errors,
         )
@@ -6,10 +6,57 @@ NAME = "My Carbon Footprint"
 # Config flow
 CONF_CARBON_INTENSITY = "carbon_intensity_entity"
 CONF_ENERGY_ENTITIES = "energy_entities"
+CONF_SOURCE_MODE = "source_mode"
+CONF_INTENSITY_TABLE = "intensity_table"
+CONF_EXPORT_FORMAT = "export_format"
+CONF_BUDGETS = "budgets"
+CONF_TIMESERIES_MAX_SOURCES = "timeseries_max_sources"
+CONF_VIRTUAL_SOURCES = "virtual_sources"
+CONF_SENSOR_ENTITIES = "sensor_entities"
+CONF_POWER_ENTITIES = "power_entities"
+CONF_POWER_INTEGRATION = "power_integration"
+CONF_MARKET_INTENSITY = "market_carbon_intensity"
+CONF_CO2E_FACTOR = "co2e_factor"
+CONF_STALE_AFTER = "stale_after"
+CONF_INTENSITY_STALE_AFTER = "intensity_stale_after"
+CONF_PRICE_ENTITY = "price_entity"
+CONF_TARIFF_TABLE = "tariff_table"
+CONF_SPOOL_DIR = "spool_dir"
+CONF_INGEST_DIR = "ingest_dir"
+
+# Emission dimensions accounted besides the location-based CO2 footprint
+EMISSION_LOCATION_CO2E = "location_co2e"
+EMISSION_MARKET_CO2 = "market_co2"
+EMISSION_MARKET_CO2E = "market_co2e"
+
+# Source modes, energy entities are either selected or read from the Energy
+# dashboard preferences
+SOURCE_MODE_ENTITIES = "entities"
+SOURCE_MODE_ENERGY_DASHBOARD = "energy_dashboard"
+
+# Health of the sources, degraded while one of them is stale
+HEALTH_OK = "ok"
+HEALTH_DEGRADED = "degraded"
+
+# Integration methods of power sources into energy
+INTEGRATION_TRAPEZOIDAL = "trapezoidal"
+INTEGRATION_LEFT = "left"
+INTEGRATION_METHODS = [INTEGRATION_TRAPEZOIDAL, INTEGRATION_LEFT]
+
+# Export formats
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_PARQUET = "parquet"
+
+# Key of the organization totals in hass.data, shared by every entry
+DATA_ORGANIZATION = f"{DOMAIN}_organization"
+
+# Dispatcher signals, formatted with the entry id
+SIGNAL_ENERGY_ENTITIES_ADDED = f"{DOMAIN}_energy_entities_added_{{}}"
 
 # Default values
 DEFAULT_NAME = "Carbon Footprint"
 SCAN_INTERVAL = 60  # seconds
+DEFAULT_TIMESERIES_MAX_SOURCES = 100
 
 # Icons
 ICON_CARBON = "mdi:molecule-co2"
@@ -0,0 +1,72 @@
+"""Energy dashboard source for the My Carbon Footprint integration."""
+
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.components.energy.data import EnergyManager, async_get_manager
+from homeassistant.core import HomeAssistant, valid_entity_id
+
+from .const import DOMAIN
+
+# Sources following the preferences, notified by a single listener of the
+# energy manager, which can't remove listeners
+DATA_ENERGY_DASHBOARD_SOURCES = f"{DOMAIN}_energy_dashboard_sources"
+
+
+def grid_import_entities(preferences: Any) -> list[str]:
+    """Return the grid import meters of the Energy dashboard preferences.
+
+    Only energy imported from the grid is charged at the grid intensity:
+    solar production, battery discharge and exports to the grid are left
+    out, and grid energy stored in a battery is already counted on import.
+    Meters only known as external statistics have no state to read.
+    """
+    if not preferences:
+        return []
+    return [
+        flow["stat_energy_from"]
+        for source in preferences["energy_sources"]
+        if source["type"] == "grid"
+        for flow in source["flow_from"]
+        if valid_entity_id(flow["stat_energy_from"])
+    ]
+
+
+def _async_get_sources(
+    hass: HomeAssistant, manager: EnergyManager
+) -> set["EnergyDashboardSource"]:
+    """Return the live sources, listening to the manager with the first one."""
+    if (sources := hass.data.get(DATA_ENERGY_DASHBOARD_SOURCES)) is not None:
+        return sources
+
+    sources = hass.data[DATA_ENERGY_DASHBOARD_SOURCES] = set()
+
+    async def _async_preferences_updated() -> None:
+        """Apply preferences changed in the Energy panel to the live sources."""
+        entity_ids = grid_import_entities(manager.data)
+        for source in list(sources):
+            source.update_entities(entity_ids)
+
+    manager.async_listen_updates(_async_preferences_updated)
+    return sources
+
+
+class EnergyDashboardSource:
+    """Energy entities kept in sync with the Energy dashboard preferences."""
+
+    def __init__(
+        self, hass: HomeAssistant, update_entities: Callable[[list[str]], None]
+    ) -> None:
+        """Initialize the source."""
+        self.hass = hass
+        self.update_entities = update_entities
+
+    async def async_setup(self) -> None:
+        """Apply the current preferences and follow their changes."""
+        manager = await async_get_manager(self.hass)
+        _async_get_sources(self.hass, manager).add(self)
+        self.update_entities(grid_import_entities(manager.data))
+
+    def close(self) -> None:
+        """Stop applying preference changes, the source is no longer referenced."""
+        self.hass.data.get(DATA_ENERGY_DASHBOARD_SOURCES, set()).discard(self)
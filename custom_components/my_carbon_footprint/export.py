@@ -0,0 +1,187 @@
+"""Export of per-interval carbon records for the My Carbon Footprint integration."""
+
+import asyncio
+import csv
+import importlib
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import EXPORT_FORMAT_CSV, EXPORT_FORMAT_PARQUET
+
+_LOGGER = logging.getLogger(__name__)
+
+# Records kept in memory before a write is scheduled
+EXPORT_BUFFER_SIZE = 10_000
+# Maximum time records wait in the buffer, in seconds
+EXPORT_FLUSH_INTERVAL = 300
+
+EXPORT_FIELDS = ("timestamp", "entity_id", "energy_kwh", "intensity", "carbon_kg")
+
+
+class ExportRecord(NamedTuple):
+    """Carbon footprint of an energy entity over one coordinator interval."""
+
+    timestamp: datetime
+    entity_id: str
+    energy_kwh: float
+    intensity: float
+    carbon_kg: float
+
+
+class CarbonExporter:
+    """Buffer carbon records and write them to daily files in the executor.
+
+    Records are appended on the event loop and handed over in batches to a
+    worker thread, which owns the open files. Writes are serialized so files
+    receive the batches in order.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, directory: str, file_format: str, prefix: str
+    ) -> None:
+        """Initialize the exporter."""
+        self.hass = hass
+        self.directory = directory
+        self.file_format = file_format
+        self.prefix = prefix
+        self._buffer: list[ExportRecord] = []
+        self._last_flush = time.monotonic()
+        self._write_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+        # Only used from the executor, under the write lock
+        self._pyarrow: Any = None
+        self._parquet: Any = None
+        self._parquet_writer: Any = None
+        self._parquet_day_path: str | None = None
+
+    async def async_setup(self) -> None:
+        """Load the optional columnar writer, falling back to CSV without it."""
+        if self.file_format != EXPORT_FORMAT_PARQUET:
+            return
+
+        try:
+            self._parquet = await self.hass.async_add_import_executor_job(
+                importlib.import_module, "pyarrow.parquet"
+            )
+            self._pyarrow = importlib.import_module("pyarrow")
+        except ImportError:
+            _LOGGER.error("pyarrow is not installed, exporting carbon data as CSV")
+            self.file_format = EXPORT_FORMAT_CSV
+
+    @callback
+    def add(
+        self,
+        timestamp: datetime,
+        entity_id: str,
+        energy_kwh: float,
+        intensity: float,
+        carbon_kg: float,
+    ) -> None:
+        """Buffer a record."""
+        self._buffer.append(
+            ExportRecord(timestamp, entity_id, energy_kwh, intensity, carbon_kg)
+        )
+
+    @callback
+    def async_schedule_flush(self) -> None:
+        """Write the buffer in the background once it is large or old enough."""
+        if not self._buffer or (self._flush_task and not self._flush_task.done()):
+            return
+
+        if (
+            len(self._buffer) < EXPORT_BUFFER_SIZE
+            and time.monotonic() - self._last_flush < EXPORT_FLUSH_INTERVAL
+        ):
+            return
+
+        # A tracked task, Home Assistant waits for it at stop instead of
+        # cancelling it while records are being written
+        self._flush_task = self.hass.async_create_task(
+            self.async_flush(), f"{self.prefix} carbon export"
+        )
+
+    async def async_flush(self) -> None:
+        """Write all buffered records."""
+        async with self._write_lock:
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if records:
+                await self.hass.async_add_executor_job(self._write, records)
+
+    async def async_close(self) -> None:
+        """Write pending records and close the open files."""
+        await self.async_flush()
+        async with self._write_lock:
+            await self.hass.async_add_executor_job(self._close_parquet)
+
+    def _path(self, day: str) -> str:
+        """Return the file path of a given day."""
+        return os.path.join(self.directory, f"{self.prefix}_{day}.{self.file_format}")
+
+    def _write(self, records: list[ExportRecord]) -> None:
+        """Write records to the file of their day, rotating at midnight UTC."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        start = 0
+        for index in range(1, len(records) + 1):
+            if (
+                index < len(records)
+                and records[index].timestamp.date() == records[start].timestamp.date()
+            ):
+                continue
+            path = self._path(records[start].timestamp.date().isoformat())
+            if self.file_format == EXPORT_FORMAT_PARQUET:
+                self._write_parquet(path, records[start:index])
+            else:
+                self._write_csv(path, records[start:index])
+            start = index
+
+    def _write_csv(self, path: str, records: list[ExportRecord]) -> None:
+        """Append records to a CSV file."""
+        new_file = not os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            if new_file:
+                writer.writerow(EXPORT_FIELDS)
+            writer.writerows(
+                (record.timestamp.isoformat(), *record[1:]) for record in records
+            )
+
+    def _write_parquet(self, path: str, records: list[ExportRecord]) -> None:
+        """Append records as a row group of the open Parquet file."""
+        if path != self._parquet_day_path:
+            self._close_parquet()
+
+        table = self._pyarrow.Table.from_pydict(
+            {
+                field: [record[index] for record in records]
+                for index, field in enumerate(EXPORT_FIELDS)
+            }
+        )
+        if self._parquet_writer is None:
+            # A file closed by a previous run can't be appended to
+            file_path = self._next_free_path(path) if os.path.exists(path) else path
+            self._parquet_writer = self._parquet.ParquetWriter(file_path, table.schema)
+            self._parquet_day_path = path
+        self._parquet_writer.write_table(table)
+
+    def _close_parquet(self) -> None:
+        """Close the open Parquet file, writing its footer."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+            self._parquet_day_path = None
+
+    @staticmethod
+    def _next_free_path(path: str) -> str:
+        """Return the first numbered variant of path that doesn't exist."""
+        base, extension = os.path.splitext(path)
+        part = 1
+        while os.path.exists(f"{base}.{part}{extension}"):
+            part += 1
+        return f"{base}.{part}{extension}"
@@ -0,0 +1,88 @@
+"""Health of the sources of the My Carbon Footprint integration.
+
+A source is stale once its entity has not reported for longer than its
+threshold. Energy consumed while a source is stale is not charged, as the
+intensity it would be charged at doesn't match when it was used. It is
+recorded as a gap over the interval instead, to be backfilled later.
+"""
+
+import logging
+from collections.abc import Iterable, Mapping
+
+from .const import HEALTH_DEGRADED, HEALTH_OK
+from .models import Gap
+
+_LOGGER = logging.getLogger(__name__)
+
+# Gaps kept per source, the oldest are dropped first
+MAX_GAPS_PER_SOURCE = 100
+
+
+class SourceHealth:
+    """Track stale sources and the gaps they leave, in constant time per source."""
+
+    def __init__(
+        self, stale_after: float | None, intensity_stale_after: float | None
+    ) -> None:
+        """Initialize the tracker, thresholds are in seconds."""
+        self.stale_after = stale_after
+        self.intensity_stale_after = intensity_stale_after
+        # Last report of each stale entity, before it went stale
+        self.degraded: dict[str, float] = {}
+        # Replaced, never mutated, as it is part of the saved snapshot
+        self.gaps: Mapping[str, tuple[Gap, ...]] = {}
+
+    @property
+    def status(self) -> str:
+        """Return whether any source is stale."""
+        return HEALTH_DEGRADED if self.degraded else HEALTH_OK
+
+    def check(
+        self, entity_id: str, threshold: float | None, reported: float, now: float
+    ) -> float | None:
+        """Track whether an entity reported within threshold seconds of now.
+
+        Return the last report before it went stale while it is stale, and on
+        the refresh it reports again, None otherwise.
+        """
+        if threshold is None:
+            return None
+
+        if now - reported > threshold:
+            if entity_id not in self.degraded:
+                _LOGGER.warning(
+                    "%s has not reported for %d seconds", entity_id, now - reported
+                )
+                self.degraded[entity_id] = reported
+            return self.degraded[entity_id]
+
+        if (since := self.degraded.pop(entity_id, None)) is not None:
+            _LOGGER.info("%s reports again", entity_id)
+        return since
+
+    def add_gaps(self, gaps: Iterable[tuple[str, Gap]]) -> None:
+        """Record the gaps of a refresh, extending the last one of each source."""
+        all_gaps = dict(self.gaps)
+        for entity_id, gap in gaps:
+            entity_gaps = all_gaps.get(entity_id, ())
+            if entity_gaps and entity_gaps[-1].end >= gap.start:
+                last = entity_gaps[-1]
+                entity_gaps = (
+                    *entity_gaps[:-1],
+                    Gap(last.start, max(last.end, gap.end), last.energy + gap.energy),
+                )
+            else:
+                entity_gaps = (*entity_gaps[-MAX_GAPS_PER_SOURCE + 1 :], gap)
+            all_gaps[entity_id] = entity_gaps
+        self.gaps = all_gaps
+
+    def gap_energy(self) -> float:
+        """Return the energy of all gaps, in kWh."""
+        return sum(gap.energy for gaps in self.gaps.values() for gap in gaps)
+
+    def restore(self, data: Mapping[str, list[Mapping[str, float]]]) -> None:
+        """Restore the gaps persisted in a snapshot."""
+        self.gaps = {
+            entity_id: tuple(Gap(**gap) for gap in gaps)
+            for entity_id, gaps in data.items()
+        }
@@ -0,0 +1,49 @@
+"""Recent carbon intensities for the My Carbon Footprint integration."""
+
+import math
+from collections import deque
+
+
+class IntensityHistory:
+    """Carbon intensities read at recent refreshes.
+
+    Like the consumption of a refresh, the intensity read at a refresh
+    applies to the time since the previous one.
+    """
+
+    def __init__(self, max_age: float) -> None:
+        """Initialize an empty history keeping max_age seconds."""
+        self.max_age = max_age
+        self._samples: deque[tuple[float, float]] = deque()
+
+    @property
+    def last_timestamp(self) -> float | None:
+        """Return the time of the latest refresh, if any."""
+        return self._samples[-1][0] if self._samples else None
+
+    def add(self, timestamp: float, intensity: float) -> None:
+        """Add the intensity read at a refresh."""
+        samples = self._samples
+        samples.append((timestamp, intensity))
+        # The oldest sample left applies to everything before it
+        while len(samples) > 1 and samples[1][0] <= timestamp - self.max_age:
+            samples.popleft()
+
+    def average(self, start: float, end: float) -> float | None:
+        """Return the time-weighted average intensity between start and end."""
+        samples = self._samples
+        if not samples or end <= start:
+            return None
+
+        total = 0.0
+        # The latest intensity applies until the next refresh
+        upper = math.inf
+        for index in range(len(samples) - 1, -1, -1):
+            lower = samples[index - 1][0] if index else -math.inf
+            overlap = min(end, upper) - max(start, lower)
+            if overlap > 0:
+                total += samples[index][1] * overlap
+            if lower <= start:
+                break
+            upper = lower
+        return total / (end - start)
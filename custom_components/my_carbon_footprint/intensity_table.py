@@ -0,0 +1,187 @@
+"""Carbon intensity tables for the My Carbon Footprint integration.
+
+A table is either a time series, with ``timestamp`` and ``intensity``
+columns, each intensity holding until the next timestamp, or recurring
+factors, with ``intensity`` and ``month`` (1-12) and/or ``hour`` (0-23)
+columns. Tables are read from CSV files, JSON files holding a list of rows,
+or, for large time series, binary files which are memory-mapped instead of
+being loaded. Tariff tables have the same layout, with a ``price`` column.
+"""
+
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .providers import IntensityProvider
+
+TABLE_MAGIC = b"MCFI"
+TABLE_FORMAT_VERSION = 1
+# Magic bytes, format version and row count, followed by the timestamps and
+# then the intensities as little-endian doubles
+_HEADER = struct.Struct("<4sH2xQ")
+_DOUBLE_SIZE = 8
+
+
+def _parse_timestamp(value: Any) -> float:
+    """Return the epoch timestamp of a number or an ISO 8601 string."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid timestamp {value!r}")
+    if parsed.tzinfo is None:
+        # Times without an offset are local times
+        parsed = parsed.replace(tzinfo=dt_util.get_default_time_zone())
+    return parsed.timestamp()
+
+
+def _optional_int(value: Any) -> int | None:
+    """Return value as an int, or None if it is empty."""
+    return None if value in (None, "") else int(value)
+
+
+def read_table(
+    path: str, column: str = "intensity"
+) -> tuple[list[tuple[float, float]], dict[tuple[int | None, int | None], float]]:
+    """Read the sorted time series and recurring factors of a CSV or JSON table."""
+    with open(path, encoding="utf-8") as file:
+        if path.endswith(".json"):
+            rows = json.load(file)
+            if not isinstance(rows, list):
+                raise ValueError("A JSON table must be a list of rows")
+        else:
+            rows = list(csv.DictReader(file))
+
+    series = []
+    factors = {}
+    for row in rows:
+        intensity = float(row[column])
+        if "timestamp" in row:
+            series.append((_parse_timestamp(row["timestamp"]), intensity))
+        else:
+            key = (_optional_int(row.get("month")), _optional_int(row.get("hour")))
+            factors[key] = intensity
+    series.sort()
+    return series, factors
+
+
+def write_binary_table(path: str, series: Iterable[tuple[float, float]]) -> None:
+    """Write a time series of timestamps and intensities as a binary table."""
+    rows = sorted(series)
+    timestamps = array("d", (timestamp for timestamp, _intensity in rows))
+    intensities = array("d", (intensity for _timestamp, intensity in rows))
+    if sys.byteorder != "little":
+        timestamps.byteswap()
+        intensities.byteswap()
+
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(TABLE_MAGIC, TABLE_FORMAT_VERSION, len(rows)))
+        timestamps.tofile(file)
+        intensities.tofile(file)
+
+
+class TableIntensityProvider(IntensityProvider):
+    """Carbon intensity looked up in a local table."""
+
+    def __init__(self, path: str, column: str = "intensity") -> None:
+        """Initialize the provider, the table is read by load."""
+        self.path = path
+        self.column = column
+        self._timestamps: Sequence[float] = ()
+        self._intensities: Sequence[float] = ()
+        self._factors: dict[tuple[int | None, int | None], float] = {}
+        self._mmap: mmap.mmap | None = None
+
+    def load(self) -> None:
+        """Read or map the table, this does I/O."""
+        if self.path.endswith(".bin"):
+            self._map_binary()
+            return
+
+        series, self._factors = read_table(self.path, self.column)
+        if series:
+            self._timestamps = array("d", (timestamp for timestamp, _ in series))
+            self._intensities = array("d", (intensity for _, intensity in series))
+
+    def _map_binary(self) -> None:
+        """Map a binary time series, pages are only read when looked up."""
+        if sys.byteorder != "little":
+            raise ValueError("Binary carbon intensity tables need a little-endian host")
+
+        with open(self.path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < _HEADER.size:
+                raise ValueError("Truncated carbon intensity table")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = _HEADER.unpack_from(self._mmap)
+        if magic != TABLE_MAGIC:
+            self.close()
+            raise ValueError("Not a carbon intensity table")
+        if version > TABLE_FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported carbon intensity table version {version}")
+        if len(self._mmap) < _HEADER.size + 2 * count * _DOUBLE_SIZE:
+            self.close()
+            raise ValueError("Truncated carbon intensity table")
+
+        view = memoryview(self._mmap)
+        middle = _HEADER.size + count * _DOUBLE_SIZE
+        self._timestamps = view[_HEADER.size : middle].cast("d")
+        self._intensities = view[middle : middle + count * _DOUBLE_SIZE].cast("d")
+
+    def intensity(self, now: datetime) -> float | None:
+        """Return the intensity of the table at now."""
+        if self._timestamps:
+            return self._series_intensity(now.timestamp())
+
+        local = dt_util.as_local(now)
+        for key in (
+            (local.month, local.hour),
+            (None, local.hour),
+            (local.month, None),
+            (None, None),
+        ):
+            if key in self._factors:
+                return self._factors[key]
+        return None
+
+    def _series_intensity(self, timestamp: float) -> float | None:
+        """Return the intensity of the last row at or before timestamp."""
+        timestamps = self._timestamps
+        index = bisect_right(timestamps, timestamp) - 1
+        if index < 0:
+            return None
+        # The last row holds for as long as the interval before it
+        if (
+            index == len(timestamps) - 1
+            and index
+            and timestamp - timestamps[index]
+            > timestamps[index] - timestamps[index - 1]
+        ):
+            return None
+        return self._intensities[index]
+
+    def close(self) -> None:
+        """Unmap a binary table."""
+        if self._mmap is None:
+            return
+        if isinstance(self._timestamps, memoryview):
+            self._timestamps.release()
+        if isinstance(self._intensities, memoryview):
+            self._intensities.release()
+        self._timestamps = self._intensities = ()
+        self._mmap.close()
+        self._mmap = None
@@ -1,10 +1,133 @@
-from dataclasses import dataclass
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from .accumulation import compensated_add
+
+
+@dataclass(frozen=True, slots=True)
+class IntensityStats:
+    """Energy and carbon of an energy entity over the day, week and lifetime.
+
+    Periods are identified by the timestamp of their local start, the sums
+    of a period start from zero when the next one begins. The lifetime sums
+    grow forever, they are compensated running totals whose residual
+    rounding errors are kept alongside.
+    """
+
+    day_start: float = 0
+    day_energy: float = 0
+    day_carbon: float = 0
+    week_start: float = 0
+    week_energy: float = 0
+    week_carbon: float = 0
+    energy: float = 0
+    carbon: float = 0
+    energy_error: float = 0
+    carbon_error: float = 0
+
+    def add(
+        self, day_start: float, week_start: float, energy: float, carbon: float
+    ) -> "IntensityStats":
+        """Return the stats with energy in kWh and carbon in kg added."""
+        same_day = day_start == self.day_start
+        same_week = week_start == self.week_start
+        total_energy, energy_error = compensated_add(
+            self.energy, self.energy_error, energy
+        )
+        total_carbon, carbon_error = compensated_add(
+            self.carbon, self.carbon_error, carbon
+        )
+        return IntensityStats(
+            day_start=day_start,
+            day_energy=(self.day_energy if same_day else 0) + energy,
+            day_carbon=(self.day_carbon if same_day else 0) + carbon,
+            week_start=week_start,
+            week_energy=(self.week_energy if same_week else 0) + energy,
+            week_carbon=(self.week_carbon if same_week else 0) + carbon,
+            energy=total_energy,
+            carbon=total_carbon,
+            energy_error=energy_error,
+            carbon_error=carbon_error,
+        )
+
+    @staticmethod
+    def average_intensity(energy: float, carbon: float) -> float | None:
+        """Return the average carbon intensity in g/kWh, if any energy was used."""
+        return carbon * 1000 / energy if energy else None
+
+
+@dataclass(frozen=True, slots=True)
+class Emissions:
+    """Running emissions in kg, one per accounted dimension, in a fixed order.
+
+    Each value is a compensated running total, its residual rounding error is
+    kept at the same index of errors.
+    """
+
+    values: tuple[float, ...] = ()
+    errors: tuple[float, ...] = ()
+
+    @classmethod
+    def zero(cls, size: int) -> "Emissions":
+        """Return emissions of size dimensions, all zero."""
+        return cls((0.0,) * size, (0.0,) * size)
+
+    def add(self, deltas: Sequence[float]) -> "Emissions":
+        """Return the emissions with deltas in kg added."""
+        totals = [
+            compensated_add(value, error, delta)
+            for value, error, delta in zip(
+                self.values, self.errors, deltas, strict=True
+            )
+        ]
+        return Emissions(
+            tuple(total for total, _error in totals),
+            tuple(error for _total, error in totals),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Gap:
+    """Energy of a source left uncharged over an interval, for a later backfill.
+
+    Start and end are timestamps, the energy is in kWh.
+    """
+
+    start: float
+    end: float
+    energy: float
+
+
+@dataclass(frozen=True, slots=True)
+class RemoteSite:
+    """Carbon in kg and cost ingested from the spool of another instance.
+
+    Both are compensated running totals of the ingested deltas.
+    """
+
+    name: str
+    carbon: float = 0
+    carbon_error: float = 0
+    cost: float = 0
+    cost_error: float = 0
+
+    def add(self, name: str, carbon: float, cost: float) -> "RemoteSite":
+        """Return the site with the deltas of a record added."""
+        return RemoteSite(
+            name,
+            *compensated_add(self.carbon, self.carbon_error, carbon),
+            *compensated_add(self.cost, self.cost_error, cost),
+        )
 
 
 @dataclass
 class EnergySensor:
     value: float
     carbon: float
+    stats: IntensityStats | None = None
+    emissions: Emissions | None = None
+    # Running energy cost, in the currency of Home Assistant
+    cost: float | None = None
 
 
 @dataclass
@@ -12,3 +135,25 @@ class CoordinatorData:
     carbon_intensity: float
     energy_sensors: dict[str, EnergySensor]
     total_carbon: float
+    # Total emissions of the other accounted dimensions, by dimension
+    emissions: dict[str, float] = field(default_factory=dict)
+    total_cost: float | None = None
+    # Sites ingested from a spool, by site id
+    sites: dict[str, RemoteSite] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class SiteTotals:
+    """Totals of a config entry when it last updated, in kg and in currency."""
+
+    title: str
+    total_carbon: float = 0
+    total_cost: float = 0
+
+
+@dataclass
+class OrganizationData:
+    total_carbon: float
+    total_cost: float
+    # Totals of each site, by config entry id
+    sites: dict[str, SiteTotals] = field(default_factory=dict)
@@ -0,0 +1,163 @@
+"""Organization-wide totals of the My Carbon Footprint integration."""
+
+import math
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.singleton import singleton
+from homeassistant.helpers.storage import Store
+
+from .accumulation import compensated_add
+from .CarbonFootprintCoordinator import CarbonFootprintCoordinator
+from .const import DATA_ORGANIZATION, DOMAIN
+from .models import OrganizationData, SiteTotals
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.organization"
+# Seconds the totals wait to be saved, sites update them at every refresh
+SAVE_DELAY = 60
+
+
+@singleton(DATA_ORGANIZATION)
+async def async_get_organization(hass: HomeAssistant) -> "Organization":
+    """Return the organization, loaded with the first site."""
+    organization = Organization(hass)
+    await organization.async_load()
+    return organization
+
+
+class Organization:
+    """Roll the totals of every config entry up into an organization total.
+
+    Each entry update changes the totals by its own change, instead of
+    summing every entry again. The totals of each site are persisted, so
+    sites that are not loaded still count after a restart.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the organization, without sites."""
+        self.hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._coordinators: dict[str, CarbonFootprintCoordinator] = {}
+        self._total_carbon: float = 0
+        self._total_carbon_error: float = 0
+        self._total_cost: float = 0
+        self._total_cost_error: float = 0
+        # Replaced, never mutated, it is shared with the published data
+        self._sites: dict[str, SiteTotals] = {}
+        self.data = OrganizationData(0, 0)
+
+    async def async_load(self) -> None:
+        """Restore the totals of the sites when they were last saved."""
+        if not (stored := await self._store.async_load()):
+            return
+        self._sites = {
+            entry_id: SiteTotals(
+                site["title"], site["total_carbon"], site["total_cost"]
+            )
+            for entry_id, site in stored["sites"].items()
+        }
+        self._total_carbon = math.fsum(
+            site.total_carbon for site in self._sites.values()
+        )
+        self._total_cost = math.fsum(site.total_cost for site in self._sites.values())
+        self.data = OrganizationData(self._total_carbon, self._total_cost, self._sites)
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Listen for changes of the totals, return the callback to stop."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Stop listening."""
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_set_updated_data(self, data: OrganizationData) -> None:
+        """Publish new totals to the listeners, and save them."""
+        self.data = data
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the totals of the sites to save."""
+        return {
+            "sites": {
+                entry_id: {
+                    "title": site.title,
+                    "total_carbon": site.total_carbon,
+                    "total_cost": site.total_cost,
+                }
+                for entry_id, site in self._sites.items()
+            }
+        }
+
+    @callback
+    def async_add_site(
+        self, entry: ConfigEntry, coordinator: CarbonFootprintCoordinator
+    ) -> CALLBACK_TYPE:
+        """Follow the updates of an entry, return the callback to stop."""
+        self._coordinators[entry.entry_id] = coordinator
+        self._async_site_updated(entry.entry_id, entry.title)
+        remove_listener = coordinator.async_add_listener(
+            partial(self._async_site_updated, entry.entry_id, entry.title)
+        )
+
+        @callback
+        def async_stop() -> None:
+            """Stop following the entry, its last totals are kept."""
+            remove_listener()
+            self._coordinators.pop(entry.entry_id, None)
+
+        return async_stop
+
+    @callback
+    def async_remove_site(self, entry_id: str) -> None:
+        """Remove the totals of a deleted entry from the organization."""
+        if (site := self._sites.get(entry_id)) is None:
+            return
+        self._add(entry_id, -site.total_carbon, -site.total_cost, None)
+
+    @callback
+    def _async_site_updated(self, entry_id: str, title: str) -> None:
+        """Apply the change of the totals of an entry."""
+        coordinator = self._coordinators[entry_id]
+        site = self._sites.get(entry_id) or SiteTotals(title)
+        carbon = coordinator.total_carbon - site.total_carbon
+        cost = coordinator.total_cost - site.total_cost
+        if carbon or cost or site.title != title or entry_id not in self._sites:
+            self._add(
+                entry_id,
+                carbon,
+                cost,
+                SiteTotals(title, coordinator.total_carbon, coordinator.total_cost),
+            )
+
+    def _add(
+        self, entry_id: str, carbon: float, cost: float, site: SiteTotals | None
+    ) -> None:
+        """Add the change of a site to the totals and publish them."""
+        self._total_carbon, self._total_carbon_error = compensated_add(
+            self._total_carbon, self._total_carbon_error, carbon
+        )
+        self._total_cost, self._total_cost_error = compensated_add(
+            self._total_cost, self._total_cost_error, cost
+        )
+        sites = dict(self._sites)
+        if site is None:
+            sites.pop(entry_id)
+        else:
+            sites[entry_id] = site
+        self._sites = sites
+        self.async_set_updated_data(
+            OrganizationData(self._total_carbon, self._total_cost, sites)
+        )
@@ -0,0 +1,110 @@
+"""Power sources for the My Carbon Footprint integration."""
+
+import logging
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    UnitOfPower,
+)
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    EventStateChangedData,
+    HomeAssistant,
+    State,
+    callback,
+)
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.util.unit_conversion import PowerConverter
+
+from .const import INTEGRATION_TRAPEZOIDAL
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _power_kw(state: State | None) -> float | None:
+    """Return the power of a state in kW, or None if it has none."""
+    if state is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+        return None
+    try:
+        power = float(state.state)
+    except ValueError:
+        _LOGGER.error("Unable to convert power value to float: %s", state.state)
+        return None
+
+    unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT, UnitOfPower.WATT)
+    if unit not in PowerConverter.VALID_UNITS:
+        _LOGGER.error("Power entity %s has unsupported unit %s", state.entity_id, unit)
+        return None
+    return PowerConverter.convert(power, unit, UnitOfPower.KILO_WATT)
+
+
+class PowerIntegrator:
+    """Energy of power entities, integrated from each of their state changes.
+
+    Energy is integrated as power changes, without a helper entity writing
+    states, and read by the coordinator as a cumulative kWh counter on each
+    refresh. Power is held at its last value until the next change, and not
+    integrated while the entity has no valid state.
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_ids: list[str], method: str) -> None:
+        """Initialize the integrator."""
+        self.hass = hass
+        self.entity_ids = frozenset(entity_ids)
+        self._trapezoidal = method == INTEGRATION_TRAPEZOIDAL
+        # Time and power, in kW, integrated up to
+        self._last: dict[str, tuple[float, float]] = {}
+        # Energy integrated per entity, in kWh
+        self._energy: dict[str, float] = {}
+
+    @callback
+    def async_setup(self) -> CALLBACK_TYPE:
+        """Start integrating, return a callback to stop."""
+        for entity_id in self.entity_ids:
+            state = self.hass.states.get(entity_id)
+            if state is not None:
+                self._add(entity_id, state.last_updated_timestamp, _power_kw(state))
+        return async_track_state_change_event(
+            self.hass, self.entity_ids, self._async_state_changed
+        )
+
+    @callback
+    def _async_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        """Integrate the power up to a state change."""
+        if (state := event.data["new_state"]) is not None:
+            self._add(state.entity_id, state.last_updated_timestamp, _power_kw(state))
+
+    def _add(self, entity_id: str, timestamp: float, power: float | None) -> None:
+        """Integrate up to timestamp, where the power becomes power."""
+        last = self._last.get(entity_id)
+        if last is not None and timestamp > last[0]:
+            last_timestamp, last_power = last
+            if power is not None and self._trapezoidal:
+                average = (last_power + power) / 2
+            else:
+                average = last_power
+            self._energy[entity_id] = (
+                self._energy.get(entity_id, 0)
+                + average * (timestamp - last_timestamp) / 3600
+            )
+        elif last is not None:
+            # Changed again at the same time, keep the latest power
+            timestamp = last[0]
+
+        if power is None:
+            self._last.pop(entity_id, None)
+        else:
+            self._last[entity_id] = (timestamp, power)
+
+    def energy(self, entity_id: str, timestamp: float) -> float | None:
+        """Return the energy integrated up to timestamp, in kWh.
+
+        None is returned while the entity has no valid power.
+        """
+        if (last := self._last.get(entity_id)) is None:
+            return None
+        self._add(entity_id, timestamp, last[1])
+        return self._energy.get(entity_id, 0)
@@ -0,0 +1,65 @@
+"""Profiling of coordinator refreshes for the My Carbon Footprint integration.
+
+Imported when a profile is requested, the profilers are never loaded
+otherwise. yappi, when installed, profiles coroutines by wall time across
+their awaits; cProfile, the fallback, profiles the event loop thread, so the
+tasks that run while a refresh awaits are part of its profile. Both write a
+pstats file, readable by pstats, snakeviz or flameprof.
+"""
+
+import logging
+import os
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RefreshProfiler:
+    """Profile a number of refreshes, enabled around each of them."""
+
+    def __init__(self, path: str, refreshes: int) -> None:
+        """Initialize the profiler, this imports it and may do I/O."""
+        self.path = path
+        self.remaining = refreshes
+        self._yappi: Any = None
+        self._profile: Any = None
+        try:
+            import yappi
+        except ImportError:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+        else:
+            self._yappi = yappi
+            yappi.clear_stats()
+            yappi.set_clock_type("wall")
+
+    @property
+    def done(self) -> bool:
+        """Return whether every requested refresh was profiled."""
+        return self.remaining <= 0
+
+    def enable(self) -> None:
+        """Start profiling a refresh."""
+        if self._yappi:
+            self._yappi.start()
+        else:
+            self._profile.enable()
+
+    def disable(self) -> None:
+        """Stop profiling a refresh."""
+        if self._yappi:
+            self._yappi.stop()
+        else:
+            self._profile.disable()
+        self.remaining -= 1
+
+    def write(self) -> None:
+        """Write the pstats file, this does I/O."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self._yappi:
+            self._yappi.get_func_stats().save(self.path, type="pstat")
+            self._yappi.clear_stats()
+        else:
+            self._profile.dump_stats(self.path)
+        _LOGGER.info("Wrote the refresh profile to %s", self.path)
@@ -0,0 +1,90 @@
+"""Carbon intensity and price providers for the My Carbon Footprint integration."""
+
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IntensityProvider(ABC):
+    """Source of a value per kWh at a given time.
+
+    That is the carbon intensity, in g CO2/kWh, or, read through price, the
+    energy price per kWh.
+    """
+
+    @abstractmethod
+    def intensity(self, now: datetime) -> float | None:
+        """Return the carbon intensity at now, or None if it is unknown."""
+
+    def price(self, now: datetime) -> float | None:
+        """Return the energy price per kWh at now, or None if it is unknown."""
+        return self.intensity(now)
+
+    def close(self) -> None:
+        """Release the resources held by the provider."""
+
+
+class EntityIntensityProvider(IntensityProvider):
+    """Carbon intensity read from the state of a Home Assistant entity.
+
+    Also reads other values per kWh, such as the energy price, named by kind
+    in the logs.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entity_id: str,
+        *,
+        max_age: float | None = None,
+        kind: str = "carbon intensity",
+    ) -> None:
+        """Initialize the provider, states older than max_age seconds are stale."""
+        self.hass = hass
+        self.entity_id = entity_id
+        self.max_age = max_age
+        self.kind = kind
+
+    def intensity(self, now: datetime) -> float | None:
+        """Return the current state of the entity."""
+        state = self.hass.states.get(self.entity_id)
+        if not state:
+            _LOGGER.error(
+                "%s entity %s not found", self.kind.capitalize(), self.entity_id
+            )
+            return None
+
+        if (
+            self.max_age is not None
+            and now.timestamp() - state.last_reported_timestamp > self.max_age
+        ):
+            # Reported as degraded by the health of the sources
+            return None
+
+        try:
+            return float(state.state)
+        except (ValueError, TypeError):
+            _LOGGER.error(
+                "Unable to convert %s value to float: %s", self.kind, state.state
+            )
+            return None
+
+
+# Providers of the energy price, the same values per kWh
+PriceProvider = IntensityProvider
+
+
+class ConstantIntensityProvider(IntensityProvider):
+    """Fixed carbon intensity, such as the emission factor of a supply contract."""
+
+    def __init__(self, intensity: float) -> None:
+        """Initialize the provider."""
+        self._intensity = intensity
+
+    def intensity(self, now: datetime) -> float | None:
+        """Return the fixed intensity."""
+        return self._intensity
@@ -1,24 +1,58 @@
 """Sensor platform for My Carbon Footprint integration."""
 
-import contextlib
+from abc import abstractmethod
+from collections.abc import Mapping
+from types import MappingProxyType
 from typing import Any, cast
 
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+from .CarbonFootprintCoordinator import CarbonFootprintCoordinator
+from .const import (
+    DOMAIN,
+    EMISSION_LOCATION_CO2E,
+    EMISSION_MARKET_CO2,
+    EMISSION_MARKET_CO2E,
+    HEALTH_DEGRADED,
+    HEALTH_OK,
+    ICON_CARBON,
+    NAME,
+    SIGNAL_ENERGY_ENTITIES_ADDED,
+)
+from .models import EnergySensor, IntensityStats
+
+# Name and unit of the total sensor of each emission dimension
+EMISSION_SENSORS: dict[str, tuple[str, str]] = {
+    EMISSION_LOCATION_CO2E: ("Total Carbon Footprint CO2e", "kg CO2e"),
+    EMISSION_MARKET_CO2: ("Total Carbon Footprint Market-Based", "kg CO2"),
+    EMISSION_MARKET_CO2E: ("Total Carbon Footprint Market-Based CO2e", "kg CO2e"),
+}
 
-from custom_components.my_carbon_footprint.models import EnergySensor
+# Returned when the coordinator has no data yet, so no dict is allocated per write
+_NO_ATTRIBUTES: Mapping[str, Any] = MappingProxyType({})
 
-from . import CarbonFootprintCoordinator
-from .const import DOMAIN, ICON_CARBON, NAME
+
+def _device_info(entry: ConfigEntry) -> DeviceInfo:
+    """Build the device info shared by all sensors of an entry."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name=NAME,
+        manufacturer="Home Assistant Community",
+        model="Carbon Footprint Calculator",
+        sw_version="0.1.0",
+    )
 
 
 async def async_setup_entry(
@@ -27,22 +61,66 @@ async def async_setup_entry(
     """Set up the carbon footprint sensors."""
     coordinator = cast(CarbonFootprintCoordinator, hass.data[DOMAIN][entry.entry_id])
 
-    entities = []
+    entities: list[CarbonFootprintBaseSensor] = []
 
     # Add total carbon footprint sensor
     entities.append(CarbonFootprintSensor(coordinator, entry))
 
-    # Add individual energy carbon footprint sensors
-    for entity_id in coordinator.energy_entities:
-        entities.append(EnergyCarbonFootprintSensor(coordinator, entry, entity_id))
+    # Add a total sensor for each other accounted emission dimension
+    for dimension in coordinator.emission_dimensions:
+        entities.append(EmissionsSensor(coordinator, entry, dimension))
 
-    async_add_entities(entities)
+    # Add the total energy cost sensor, the cost of each source is an attribute
+    if coordinator.pricing:
+        entities.append(EnergyCostSensor(coordinator, entry))
+
+    # Add individual energy carbon footprint sensors, virtual sources are only
+    # served by the coordinator
+    for entity_id in coordinator.energy_entities:
+        if coordinator.has_sensor(entity_id):
+            entities.append(EnergyCarbonFootprintSensor(coordinator, entry, entity_id))
+
+    # Seed every sensor from the totals the coordinator loaded from its store,
+    # instead of one restore state lookup per entity
+    for entity in entities:
+        entity.restore_from_store()
+
+    if coordinator.health:
+        async_add_entities([*entities, CarbonFootprintHealthSensor(coordinator, entry)])
+    else:
+        async_add_entities(entities)
+
+    # Energy entities added to the Energy dashboard get their sensor without
+    # a reload, sensors of removed ones are kept with their last value
+    known_entity_ids = set(coordinator.energy_entities)
+
+    @callback
+    def async_add_energy_sensors(entity_ids: list[str]) -> None:
+        """Add the sensors of new energy entities."""
+        new_entities = []
+        for entity_id in entity_ids:
+            if entity_id in known_entity_ids or not coordinator.has_sensor(entity_id):
+                continue
+            known_entity_ids.add(entity_id)
+            entity = EnergyCarbonFootprintSensor(coordinator, entry, entity_id)
+            entity.restore_from_store()
+            new_entities.append(entity)
+        if new_entities:
+            async_add_entities(new_entities)
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_ENERGY_ENTITIES_ADDED.format(entry.entry_id),
+            async_add_energy_sensors,
+        )
+    )
 
 
-class CarbonFootprintSensor(
-    CoordinatorEntity[CarbonFootprintCoordinator], RestoreEntity, SensorEntity
+class CarbonFootprintBaseSensor(
+    CoordinatorEntity[CarbonFootprintCoordinator], SensorEntity
 ):
-    """Sensor for total carbon footprint."""
+    """Base class for the carbon footprint sensors of an entry."""
 
     _attr_device_class = None
     _attr_state_class = SensorStateClass.TOTAL_INCREASING
@@ -51,35 +129,59 @@ class CarbonFootprintSensor(
     _attr_icon = ICON_CARBON
 
     def __init__(
-        self, coordinator: CarbonFootprintCoordinator, entry: ConfigEntry
+        self,
+        coordinator: CarbonFootprintCoordinator,
+        entry: ConfigEntry,
+        unique_id: str,
+        name: str,
     ) -> None:
         """Initialize the sensor."""
         super().__init__(coordinator)
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_total_carbon"
-        self._attr_name = "Total Carbon Footprint"
-        self.coordinator = coordinator
-        # Initialize native_value from restored state if available
+        self._entry: ConfigEntry = entry
+        self.coordinator: CarbonFootprintCoordinator = coordinator
+        self._attr_unique_id = unique_id
+        self._attr_name = name
+        self._attr_device_info = _device_info(entry)
+        # Seeded from the coordinator store, then kept from coordinator updates
         self._attr_native_value: float | None = None
 
-    async def async_added_to_hass(self) -> None:
-        """Handle entity which will be added."""
-        await super().async_added_to_hass()
-        last_state = await self.async_get_last_state()
-        if last_state and last_state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
-            with contextlib.suppress(ValueError, TypeError):
-                self._attr_native_value = float(last_state.state)
+    def restore_from_store(self) -> None:
+        """Initialize the value from the totals persisted by the coordinator."""
+        self._attr_native_value = self._stored_value()
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device info."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name=NAME,
-            manufacturer="Home Assistant Community",
-            model="Carbon Footprint Calculator",
-            sw_version="0.1.0",
+    @abstractmethod
+    def _stored_value(self) -> float | None:
+        """Return the persisted total for this sensor."""
+
+
+class CarbonFootprintSensor(CarbonFootprintBaseSensor):
+    """Sensor for total carbon footprint."""
+
+    # Already kept by the coordinator, recording it would only bloat history
+    _unrecorded_attributes = frozenset({"carbon_sparkline"})
+
+    def __init__(
+        self, coordinator: CarbonFootprintCoordinator, entry: ConfigEntry
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator,
+            entry,
+            f"{entry.entry_id}_total_carbon",
+            "Total Carbon Footprint",
         )
+        # Updated in place, only the intensity and entity count change
+        self._attributes: dict[str, Any] = {
+            "carbon_intensity": 0,
+            "energy_sensors": len(coordinator.energy_entities),
+        }
+        if coordinator.timeseries:
+            # Hourly carbon over the last day, oldest first
+            self._attributes["carbon_sparkline"] = []
+
+    def _stored_value(self) -> float | None:
+        """Return the persisted total carbon footprint."""
+        return self.coordinator.total_carbon
 
     @property
     def native_value(self) -> float | None:
@@ -94,27 +196,86 @@ class CarbonFootprintSensor(
         return self._attr_native_value
 
     @property
-    def extra_state_attributes(self) -> dict[str, Any]:
+    def extra_state_attributes(self) -> Mapping[str, Any]:
         """Return additional attributes."""
         if not self.coordinator.data:
-            return {}
+            return _NO_ATTRIBUTES
 
-        return {
-            "carbon_intensity": self.coordinator.data.carbon_intensity,
-            "energy_sensors": len(self.coordinator.energy_entities),
-        }
+        self._attributes["carbon_intensity"] = self.coordinator.data.carbon_intensity
+        self._attributes["energy_sensors"] = len(self.coordinator.energy_entities)
+        if timeseries := self.coordinator.timeseries:
+            self._attributes["carbon_sparkline"] = timeseries.sparkline(
+                None, dt_util.utcnow().timestamp()
+            )
+        return self._attributes
 
 
-class EnergyCarbonFootprintSensor(
-    CoordinatorEntity[CarbonFootprintCoordinator], RestoreEntity, SensorEntity
-):
+class EmissionsSensor(CarbonFootprintBaseSensor):
+    """Sensor for the total of an emission dimension, such as market-based CO2."""
+
+    def __init__(
+        self,
+        coordinator: CarbonFootprintCoordinator,
+        entry: ConfigEntry,
+        dimension: str,
+    ) -> None:
+        """Initialize the sensor."""
+        name, unit = EMISSION_SENSORS[dimension]
+        super().__init__(
+            coordinator, entry, f"{entry.entry_id}_total_{dimension}", name
+        )
+        self._dimension: str = dimension
+        self._attr_native_unit_of_measurement = unit
+
+    def _stored_value(self) -> float | None:
+        """Return the persisted total of the emission dimension."""
+        return self.coordinator.total_emissions.get(self._dimension)
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the emissions value."""
+        if self.coordinator.last_update_success and self.coordinator.data:
+            self._attr_native_value = self.coordinator.data.emissions.get(
+                self._dimension, self._attr_native_value
+            )
+        return self._attr_native_value
+
+
+class EnergyCostSensor(CarbonFootprintBaseSensor):
+    """Sensor for the total energy cost, priced in the same pass as the carbon."""
+
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_state_class = SensorStateClass.TOTAL
+    _attr_icon = "mdi:cash"
+
+    def __init__(
+        self, coordinator: CarbonFootprintCoordinator, entry: ConfigEntry
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry, f"{entry.entry_id}_total_cost", "Total Energy Cost"
+        )
+        self._attr_native_unit_of_measurement = coordinator.hass.config.currency
+
+    def _stored_value(self) -> float | None:
+        """Return the persisted total energy cost."""
+        return self.coordinator.total_cost
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the energy cost value."""
+        if self.coordinator.last_update_success and self.coordinator.data:
+            total_cost = self.coordinator.data.total_cost
+            if total_cost is not None:
+                self._attr_native_value = total_cost
+        return self._attr_native_value
+
+
+class EnergyCarbonFootprintSensor(CarbonFootprintBaseSensor):
     """Sensor for individual energy source carbon footprint."""
 
-    _attr_device_class = None
-    _attr_state_class = SensorStateClass.TOTAL_INCREASING
-    _attr_native_unit_of_measurement = "kg CO2"
-    _attr_has_entity_name = True
-    _attr_icon = ICON_CARBON
+    # Already kept by the coordinator, recording it would only bloat history
+    _unrecorded_attributes = frozenset({"carbon_sparkline"})
 
     def __init__(
         self,
@@ -123,38 +284,36 @@ class EnergyCarbonFootprintSensor(
         energy_entity_id: str,
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._entry: ConfigEntry = entry
-        self._energy_entity_id: str = energy_entity_id
-        self.coordinator: CarbonFootprintCoordinator = coordinator
-
         # Extract the entity name from the entity_id
         # (e.g., sensor.living_room_energy becomes living_room_energy)
         entity_name = energy_entity_id.split(".")[-1]
 
-        self._attr_unique_id = f"{entry.entry_id}_{entity_name}_carbon"
-        self._attr_name = f"{entity_name.replace('_', ' ').title()} Carbon Footprint"
-        # Initialize native_value from restored state if available
-        self._attr_native_value: float | None = None
-
-    async def async_added_to_hass(self) -> None:
-        """Handle entity which will be added."""
-        await super().async_added_to_hass()
-        last_state = await self.async_get_last_state()
-        if last_state and last_state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
-            with contextlib.suppress(ValueError, TypeError):
-                self._attr_native_value = float(last_state.state)
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device info."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name=NAME,
-            manufacturer="Home Assistant Community",
-            model="Carbon Footprint Calculator",
-            sw_version="0.1.0",
+        super().__init__(
+            coordinator,
+            entry,
+            f"{entry.entry_id}_{entity_name}_carbon",
+            f"{entity_name.replace('_', ' ').title()} Carbon Footprint",
         )
+        self._energy_entity_id: str = energy_entity_id
+        # Updated in place on every state write instead of building a new dict
+        self._attributes: dict[str, Any] = {
+            "energy_consumption": 0,
+            "carbon_intensity": 0,
+            "source_entity": energy_entity_id,
+            # Intensity the entity actually consumed at, in g/kWh
+            "average_carbon_intensity_day": None,
+            "average_carbon_intensity_week": None,
+            "average_carbon_intensity": None,
+        }
+        if coordinator.pricing:
+            self._attributes["cost"] = None
+        if coordinator.timeseries:
+            # Hourly carbon over the last day, oldest first
+            self._attributes["carbon_sparkline"] = []
+
+    def _stored_value(self) -> float | None:
+        """Return the persisted carbon footprint of the energy source."""
+        return self.coordinator.entity_carbon.get(self._energy_entity_id)
 
     @property
     def native_value(self) -> float | None:
@@ -178,21 +337,84 @@ class EnergyCarbonFootprintSensor(
         return self._attr_native_value
 
     @property
-    def extra_state_attributes(self) -> dict[str, Any]:
+    def extra_state_attributes(self) -> Mapping[str, Any]:
         """Return additional attributes."""
-        if not self.coordinator.data or not self.coordinator.data.energy_sensors:
-            return {
-                "energy_consumption": 0,
-                "carbon_intensity": 0,
-                "source_entity": self._energy_entity_id,
-            }
-
-        energy_data = self.coordinator.data.energy_sensors.get(
-            self._energy_entity_id, EnergySensor(value=0, carbon=0)
+        attributes = self._attributes
+        data = self.coordinator.data
+        if not data or not data.energy_sensors:
+            attributes["energy_consumption"] = 0
+            attributes["carbon_intensity"] = 0
+            self._set_average_intensities(None)
+            return attributes
+
+        energy_data = data.energy_sensors.get(self._energy_entity_id)
+        attributes["energy_consumption"] = energy_data.value if energy_data else 0
+        attributes["carbon_intensity"] = data.carbon_intensity
+        self._set_average_intensities(energy_data.stats if energy_data else None)
+        if "cost" in attributes:
+            attributes["cost"] = energy_data.cost if energy_data else None
+        if timeseries := self.coordinator.timeseries:
+            attributes["carbon_sparkline"] = timeseries.sparkline(
+                self._energy_entity_id, dt_util.utcnow().timestamp()
+            )
+        return attributes
+
+    def _set_average_intensities(self, stats: IntensityStats | None) -> None:
+        """Update the average intensity attributes from the entity stats."""
+        attributes = self._attributes
+        if stats is None:
+            attributes["average_carbon_intensity_day"] = None
+            attributes["average_carbon_intensity_week"] = None
+            attributes["average_carbon_intensity"] = None
+            return
+
+        average = IntensityStats.average_intensity
+        attributes["average_carbon_intensity_day"] = average(
+            stats.day_energy, stats.day_carbon
+        )
+        attributes["average_carbon_intensity_week"] = average(
+            stats.week_energy, stats.week_carbon
         )
+        attributes["average_carbon_intensity"] = average(stats.energy, stats.carbon)
+
+
+class CarbonFootprintHealthSensor(
+    CoordinatorEntity[CarbonFootprintCoordinator], SensorEntity
+):
+    """Sensor for the health of the sources, degraded while one is stale."""
+
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
+    _attr_icon = "mdi:heart-pulse"
+
+    def __init__(
+        self, coordinator: CarbonFootprintCoordinator, entry: ConfigEntry
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        assert coordinator.health is not None
+        self._health = coordinator.health
+        self._attr_unique_id = f"{entry.entry_id}_health"
+        self._attr_name = "Health"
+        self._attr_options = [HEALTH_OK, HEALTH_DEGRADED]
+        self._attr_device_info = _device_info(entry)
+
+    @property
+    def available(self) -> bool:
+        """Return True, the health is known even when updates fail."""
+        return True
 
+    @property
+    def native_value(self) -> str:
+        """Return whether any source is stale."""
+        return self._health.status
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any]:
+        """Return the stale sources and the energy left to backfill."""
         return {
-            "energy_consumption": energy_data.value,
-            "carbon_intensity": self.coordinator.data.carbon_intensity,
-            "source_entity": self._energy_entity_id,
+            "stale_sources": sorted(self._health.degraded),
+            "gaps": sum(len(gaps) for gaps in self._health.gaps.values()),
+            "gap_energy": self._health.gap_energy(),
         }
@@ -0,0 +1,272 @@
+"""Spool of carbon footprint deltas shared between Home Assistant instances.
+
+Edge instances append a compact record of what their totals changed by to
+segment files in a spool directory, synced to the central instance by any
+means (shared volume, rsync, MQTT bridge dumping files). The central
+instance tails the segments from where it stopped, and skips records it
+already ingested, so replayed or duplicated files are counted once.
+
+Each line of a segment is a JSON record::
+
+    {"site": ..., "name": ..., "seq": 12, "time": ..., "carbon": 0.1,
+     "cost": 0.02, "total_carbon": 3.5, "total_cost": 0.7}
+
+seq increases by one per record of a site, carbon and cost are the deltas
+since the previous record, in kg and in currency, and the totals are where
+they brought the site, for the writer to resume from after a restart.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from collections.abc import Mapping
+from typing import Any
+
+import orjson
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+SPOOL_SUFFIX = ".jsonl"
+# Seconds between records of a site
+SPOOL_INTERVAL = 300
+# Bytes after which a new segment is started, and segments a writer keeps
+SPOOL_SEGMENT_SIZE = 1 << 20
+SPOOL_MAX_SEGMENTS = 8
+
+
+def _segment_site(file_name: str) -> str:
+    """Return the site of a segment, named <site>.<first seq>.jsonl."""
+    return file_name.rsplit(".", 2)[0]
+
+
+class SpoolWriter:
+    """Append the deltas of the totals of a site to its spool segments.
+
+    Records are written by a worker in the executor, in order, at most
+    one per interval, and only when the totals changed.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        directory: str,
+        site: str,
+        name: str,
+        interval: float = SPOOL_INTERVAL,
+    ) -> None:
+        """Initialize the writer, async_setup resumes from the segments."""
+        self.hass = hass
+        self.directory = directory
+        self.site = site
+        self.name = name
+        self.interval = interval
+        self.sequence = 0
+        self.total_carbon: float = 0
+        self.total_cost: float = 0
+        self._segment: str | None = None
+        self._last_write: float | None = None
+        self._queue: deque[bytes] = deque()
+        self._writer: asyncio.Task[None] | None = None
+
+    async def async_setup(self) -> None:
+        """Resume the sequence and totals from the last record written."""
+        await self.hass.async_add_executor_job(self._resume)
+
+    def _segments(self) -> list[str]:
+        """Return the segments of the site, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name
+            for name in names
+            if name.endswith(SPOOL_SUFFIX) and _segment_site(name) == self.site
+        )
+
+    def _resume(self) -> None:
+        """Read the last record of the last segment."""
+        if not (segments := self._segments()):
+            return
+        self._segment = segments[-1]
+        with open(os.path.join(self.directory, self._segment), "rb") as file:
+            lines = file.read().splitlines()
+        for line in reversed(lines):
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # Cut short by a crash, the next record starts on a new line
+                continue
+            self.sequence = record["seq"]
+            self.total_carbon = record["total_carbon"]
+            self.total_cost = record["total_cost"]
+            return
+
+    @callback
+    def async_update(
+        self, timestamp: float, total_carbon: float, total_cost: float
+    ) -> None:
+        """Queue a record of the change of the totals, once per interval."""
+        if self._last_write is not None and timestamp - self._last_write < (
+            self.interval
+        ):
+            return
+        carbon = total_carbon - self.total_carbon
+        cost = total_cost - self.total_cost
+        if not carbon and not cost:
+            return
+
+        self._last_write = timestamp
+        self.sequence += 1
+        self.total_carbon = total_carbon
+        self.total_cost = total_cost
+        self._queue.append(
+            orjson.dumps(
+                {
+                    "site": self.site,
+                    "name": self.name,
+                    "seq": self.sequence,
+                    "time": timestamp,
+                    "carbon": carbon,
+                    "cost": cost,
+                    "total_carbon": total_carbon,
+                    "total_cost": total_cost,
+                }
+            )
+            + b"\n"
+        )
+        if self._writer is None or self._writer.done():
+            self._writer = self.hass.async_create_task(
+                self._async_write_queue(), "my_carbon_footprint spool writer"
+            )
+
+    async def async_flush(self) -> None:
+        """Wait until every queued record is written."""
+        if self._writer:
+            await asyncio.shield(self._writer)
+
+    async def _async_write_queue(self) -> None:
+        """Write queued records until the queue is empty."""
+        while self._queue:
+            records = b"".join(self._queue)
+            first_sequence = self.sequence - len(self._queue) + 1
+            self._queue.clear()
+            try:
+                await self.hass.async_add_executor_job(
+                    self._append, records, first_sequence
+                )
+            except OSError as err:
+                _LOGGER.error("Error writing carbon footprint spool: %s", err)
+
+    def _append(self, records: bytes, first_sequence: int) -> None:
+        """Append records to the current segment, starting a new one if full."""
+        os.makedirs(self.directory, exist_ok=True)
+        segment = self._segment and os.path.join(self.directory, self._segment)
+        if (
+            not segment
+            or not os.path.exists(segment)
+            or os.path.getsize(segment) >= SPOOL_SEGMENT_SIZE
+        ):
+            self._segment = f"{self.site}.{first_sequence:010d}{SPOOL_SUFFIX}"
+            # The new segment is one of the kept ones
+            for old in self._segments()[: 1 - SPOOL_MAX_SEGMENTS]:
+                os.remove(os.path.join(self.directory, old))
+        with open(os.path.join(self.directory, self._segment), "ab") as file:
+            file.write(records)
+
+
+class SpoolReader:
+    """Tail the segments of a spool directory.
+
+    The offset read up to in each segment and the last sequence ingested
+    of each site are only advanced by commit, once the records are
+    accounted, so records read but not accounted are read again.
+    """
+
+    def __init__(self, directory: str, ignore_site: str | None = None) -> None:
+        """Initialize the reader, from the start of every segment."""
+        self.directory = directory
+        # Sites written by this instance, which are not ingested back
+        self.ignore_site = ignore_site
+        # Replaced, never mutated, they are part of the coordinator snapshot
+        self.offsets: Mapping[str, int] = {}
+        self.sequences: Mapping[str, int] = {}
+
+    def restore(self, data: Mapping[str, Any]) -> None:
+        """Restore the offsets and sequences of a snapshot."""
+        self.offsets = data["offsets"]
+        self.sequences = data["sequences"]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the offsets and sequences to persist."""
+        return {"offsets": self.offsets, "sequences": self.sequences}
+
+    def read(
+        self,
+    ) -> tuple[list[dict[str, Any]], dict[str, int], dict[str, int]]:
+        """Return the new records, and the offsets and sequences after them.
+
+        This does I/O. Only complete lines are read, a record being written
+        is read once its line ends.
+        """
+        try:
+            names = sorted(
+                name
+                for name in os.listdir(self.directory)
+                if name.endswith(SPOOL_SUFFIX)
+                and _segment_site(name) != self.ignore_site
+            )
+        except FileNotFoundError:
+            return [], {}, dict(self.sequences)
+
+        records: list[dict[str, Any]] = []
+        # Segments removed by their writer are forgotten
+        offsets: dict[str, int] = {}
+        sequences = dict(self.sequences)
+        for name in names:
+            offset = self.offsets.get(name, 0)
+            path = os.path.join(self.directory, name)
+            if os.path.getsize(path) < offset:
+                # Rewritten, ingested records are skipped by their sequence
+                offset = 0
+            with open(path, "rb") as file:
+                file.seek(offset)
+                chunk = file.read()
+            end = chunk.rfind(b"\n") + 1
+            offsets[name] = offset + end
+            for line in chunk[:end].splitlines():
+                try:
+                    record = orjson.loads(line)
+                    site = record["site"]
+                    sequence = record["seq"]
+                except (orjson.JSONDecodeError, KeyError, TypeError):
+                    _LOGGER.warning("Skipping invalid spool record in %s", name)
+                    continue
+                last = sequences.get(site, 0)
+                if sequence <= last:
+                    continue
+                if sequence > last + 1:
+                    _LOGGER.warning(
+                        "Spool records %s to %s of %s are missing",
+                        last + 1,
+                        sequence - 1,
+                        site,
+                    )
+                sequences[site] = sequence
+                records.append(record)
+        return records, offsets, sequences
+
+    def commit(self, offsets: dict[str, int], sequences: dict[str, int]) -> None:
+        """Advance past records read, once they are accounted."""
+        self.offsets = offsets
+        # A read overlapping this one may have been committed first
+        self.sequences = {
+            **self.sequences,
+            **{
+                site: sequence
+                for site, sequence in sequences.items()
+                if sequence > self.sequences.get(site, 0)
+            },
+        }
@@ -0,0 +1,74 @@
+"""Long-term statistics of virtual sources for the My Carbon Footprint integration."""
+
+from collections.abc import Iterable, Mapping
+from datetime import datetime
+
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+
+
+class VirtualSourceStatistics:
+    """Hourly carbon statistics of energy entities without a sensor.
+
+    The running total of each source when an hour ends is added as an
+    external statistic, the recorder derives the hourly change from its sum.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the statistics of an entry."""
+        self.hass = hass
+        self.entry_id = entry_id
+        self._hour_start: datetime | None = None
+        self._metadata: dict[str, StatisticMetaData] = {}
+
+    def statistic_id(self, entity_id: str) -> str:
+        """Return the statistic id of the carbon of an energy entity."""
+        object_id = entity_id.split(".")[-1]
+        return f"{DOMAIN}:{slugify(self.entry_id)}_{object_id}_carbon"
+
+    @callback
+    def async_update(
+        self,
+        now: datetime,
+        entity_carbon: Mapping[str, float],
+        entity_ids: Iterable[str],
+    ) -> None:
+        """Add the totals of the hour that ended, on the first update after it."""
+        hour_start = now.replace(minute=0, second=0, microsecond=0)
+        start = self._hour_start
+        self._hour_start = hour_start
+        if start is None or hour_start <= start:
+            return
+
+        for entity_id in entity_ids:
+            if (carbon := entity_carbon.get(entity_id)) is None:
+                continue
+            async_add_external_statistics(
+                self.hass,
+                self._get_metadata(entity_id),
+                [StatisticData(start=start, state=carbon, sum=carbon)],
+            )
+
+    def _get_metadata(self, entity_id: str) -> StatisticMetaData:
+        """Return the statistic metadata of an energy entity."""
+        if (metadata := self._metadata.get(entity_id)) is None:
+            metadata = self._metadata[entity_id] = StatisticMetaData(
+                mean_type=StatisticMeanType.NONE,
+                has_sum=True,
+                name=f"{entity_id.split('.')[-1].replace('_', ' ').title()} "
+                "Carbon Footprint",
+                source=DOMAIN,
+                statistic_id=self.statistic_id(entity_id),
+                unit_of_measurement="kg CO2",
+            )
+        return metadata
@@ -0,0 +1,144 @@
+"""Persistence of coordinator snapshots for the My Carbon Footprint integration."""
+
+import asyncio
+import logging
+import os
+import struct
+from collections import deque
+from typing import Any
+
+import orjson
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util.file import write_utf8_file
+
+_LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"MCFP"
+SNAPSHOT_FORMAT_VERSION = 1
+# Magic bytes and format version, followed by the JSON encoded snapshot
+_HEADER = struct.Struct("<4sH")
+
+# Snapshots waiting for the writer. Each holds the complete state, so a newer
+# snapshot supersedes the oldest waiting one once the queue is full.
+SNAPSHOT_QUEUE_SIZE = 1
+
+
+def encode_snapshot(data: dict[str, Any]) -> bytes:
+    """Encode a snapshot behind a versioned header."""
+    return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION) + orjson.dumps(data)
+
+
+def decode_snapshot(payload: bytes) -> dict[str, Any]:
+    """Decode a snapshot written by encode_snapshot."""
+    if len(payload) < _HEADER.size:
+        raise ValueError("Truncated carbon footprint snapshot")
+
+    magic, version = _HEADER.unpack_from(payload)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not a carbon footprint snapshot")
+    if version > SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported carbon footprint snapshot version {version}")
+
+    return orjson.loads(memoryview(payload)[_HEADER.size :])
+
+
+class SnapshotStore:
+    """Write coordinator snapshots to a binary file from a worker.
+
+    The event loop only queues a reference to the snapshot, encoding and
+    writing run in the executor, one snapshot at a time and in order.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        path: str,
+        legacy_store: Store | None = None,
+    ) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self.path = path
+        # JSON store used by previous versions, migrated on first load
+        self._legacy_store = legacy_store
+        self._queue: deque[tuple[dict[str, Any], list[asyncio.Future[None]]]] = deque()
+        self._writer: asyncio.Task[None] | None = None
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Load the last snapshot, decoding it in the executor."""
+        data = await self.hass.async_add_executor_job(self._load, self.path)
+        if data is not None:
+            return data
+
+        if self._legacy_store is None:
+            return None
+
+        data = await self._legacy_store.async_load()
+        if data is not None:
+            await self.async_save(data)
+            await self._legacy_store.async_remove()
+        return data
+
+    @callback
+    def async_schedule_save(self, data: dict[str, Any]) -> None:
+        """Queue a snapshot to be written, without waiting for it."""
+        self._enqueue(data, None)
+
+    async def async_save(self, data: dict[str, Any]) -> None:
+        """Queue a snapshot and wait until it is written."""
+        future: asyncio.Future[None] = self.hass.loop.create_future()
+        self._enqueue(data, future)
+        await future
+
+    async def async_flush(self) -> None:
+        """Wait until every queued snapshot is written."""
+        if self._writer:
+            await asyncio.shield(self._writer)
+
+    @callback
+    def _enqueue(
+        self, data: dict[str, Any], future: asyncio.Future[None] | None
+    ) -> None:
+        """Queue a snapshot, dropping the oldest waiting one if the queue is full."""
+        waiters = [future] if future else []
+        if len(self._queue) >= SNAPSHOT_QUEUE_SIZE:
+            # Waiters of a superseded snapshot are released by the newer write
+            _superseded, superseded_waiters = self._queue.popleft()
+            waiters = superseded_waiters + waiters
+        self._queue.append((data, waiters))
+
+        if self._writer is None or self._writer.done():
+            # A tracked task, Home Assistant waits for it at stop
+            self._writer = self.hass.async_create_task(
+                self._async_write_queue(), "my_carbon_footprint snapshot writer"
+            )
+
+    async def _async_write_queue(self) -> None:
+        """Write queued snapshots until the queue is empty."""
+        while self._queue:
+            data, waiters = self._queue.popleft()
+            try:
+                await self.hass.async_add_executor_job(self._write, data)
+            except Exception as err:
+                _LOGGER.error("Error saving carbon footprint snapshot: %s", err)
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(err)
+            else:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+
+    def _load(self, path: str) -> dict[str, Any] | None:
+        """Read and decode a snapshot file."""
+        try:
+            with open(path, "rb") as file:
+                payload = file.read()
+        except FileNotFoundError:
+            return None
+        return decode_snapshot(payload)
+
+    def _write(self, data: dict[str, Any]) -> None:
+        """Encode a snapshot and replace the snapshot file with it."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_utf8_file(self.path, encode_snapshot(data), private=True, mode="wb")
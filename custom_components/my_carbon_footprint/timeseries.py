@@ -0,0 +1,173 @@
+"""In-memory time series for the My Carbon Footprint integration."""
+
+import logging
+from array import array
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# Interval in seconds and number of intervals kept, by resolution
+RESOLUTIONS: dict[str, tuple[int, int]] = {
+    "1m": (60, 60),
+    "15m": (900, 96),
+    "1h": (3600, 168),
+}
+# Resolution and number of intervals of the sparkline attributes
+SPARKLINE_RESOLUTION = "1h"
+SPARKLINE_INTERVALS = 24
+
+
+class RingSeries:
+    """Energy and carbon of each interval over a fixed window.
+
+    Intervals are numbered from the epoch and stored at their number modulo
+    the window size, so an interval reuses the slot of the one it replaces
+    in the window.
+    """
+
+    __slots__ = ("_carbon", "_energy", "_last", "interval", "size")
+
+    def __init__(self, interval: int, size: int) -> None:
+        """Initialize an empty series."""
+        self.interval = interval
+        self.size = size
+        self._energy = array("d", bytes(8 * size))
+        self._carbon = array("d", bytes(8 * size))
+        # Number of the latest interval added to
+        self._last: int | None = None
+
+    def add(self, timestamp: float, energy: float, carbon: float) -> None:
+        """Add energy in kWh and carbon in kg to the interval of timestamp."""
+        number = int(timestamp // self.interval)
+        last = self._last
+        if last is None:
+            self._last = number
+        elif number > last:
+            # Clear the slots of the intervals skipped since the last one
+            for skipped in range(max(last + 1, number - self.size + 1), number + 1):
+                slot = skipped % self.size
+                self._energy[slot] = 0
+                self._carbon[slot] = 0
+            self._last = number
+        elif number < last:
+            # Added late, after the clock went back, to the latest interval
+            number = last
+
+        slot = number % self.size
+        self._energy[slot] += energy
+        self._carbon[slot] += carbon
+
+    def window(
+        self, timestamp: float, count: int | None = None
+    ) -> tuple[float, list[float], list[float]]:
+        """Return the start, energy and carbon of the intervals up to timestamp.
+
+        The last count intervals, all of them by default, are returned oldest
+        first, intervals without data count as zero.
+        """
+        size = self.size
+        count = size if count is None else min(count, size)
+        number = int(timestamp // self.interval)
+        first = number - count + 1
+        energy = [0.0] * count
+        carbon = [0.0] * count
+        if (last := self._last) is not None:
+            for stored in range(max(first, last - size + 1), min(last, number) + 1):
+                slot = stored % size
+                energy[stored - first] = self._energy[slot]
+                carbon[stored - first] = self._carbon[slot]
+        return first * self.interval, energy, carbon
+
+
+def _new_series() -> dict[str, RingSeries]:
+    """Return empty series at each resolution."""
+    return {
+        resolution: RingSeries(interval, size)
+        for resolution, (interval, size) in RESOLUTIONS.items()
+    }
+
+
+class TimeSeries:
+    """Recent energy and carbon per source and in total, at each resolution.
+
+    Series are downsampled as values are added, and memory is bounded: each
+    resolution keeps a fixed number of intervals, and sources beyond
+    max_sources are only counted in the total.
+    """
+
+    def __init__(self, max_sources: int) -> None:
+        """Initialize the time series."""
+        self.max_sources = max_sources
+        self.total = _new_series()
+        self._sources: dict[str, dict[str, RingSeries]] = {}
+        self._capped = False
+        # Sparkline of each source, or the total, and the interval it ends before
+        self._sparklines: dict[str | None, tuple[int, list[float]]] = {}
+
+    def add(
+        self, entity_id: str, timestamp: float, energy: float, carbon: float
+    ) -> None:
+        """Add the energy and carbon of a source."""
+        series = self._sources.get(entity_id)
+        if series is None:
+            if len(self._sources) >= self.max_sources:
+                if not self._capped:
+                    self._capped = True
+                    _LOGGER.warning(
+                        "Time series are kept for %s sources at most, %s is only "
+                        "counted in the total",
+                        self.max_sources,
+                        entity_id,
+                    )
+                return
+            series = self._sources[entity_id] = _new_series()
+        for ring in series.values():
+            ring.add(timestamp, energy, carbon)
+
+    def add_total(self, timestamp: float, energy: float, carbon: float) -> None:
+        """Add the energy and carbon of all sources."""
+        for ring in self.total.values():
+            ring.add(timestamp, energy, carbon)
+
+    def query(
+        self,
+        entity_id: str | None,
+        timestamp: float,
+        resolutions: list[str] | None = None,
+    ) -> dict[str, Any] | None:
+        """Return the series of a source, or the total, up to timestamp."""
+        series = self.total if entity_id is None else self._sources.get(entity_id)
+        if series is None:
+            return None
+
+        result = {}
+        for resolution in resolutions or RESOLUTIONS:
+            ring = series[resolution]
+            start, energy, carbon = ring.window(timestamp)
+            result[resolution] = {
+                "start": start,
+                "interval": ring.interval,
+                "energy": energy,
+                "carbon": carbon,
+            }
+        return result
+
+    def sparkline(self, entity_id: str | None, timestamp: float) -> list[float]:
+        """Return the hourly carbon of a source, or the total, over the last day.
+
+        Only closed intervals are included, so the sparkline is built once
+        per interval and the same list is returned until the next one.
+        """
+        series = self.total if entity_id is None else self._sources.get(entity_id)
+        if series is None:
+            return []
+        ring = series[SPARKLINE_RESOLUTION]
+        number = int(timestamp // ring.interval)
+        if (cached := self._sparklines.get(entity_id)) and cached[0] == number:
+            return cached[1]
+        _start, _energy, carbon = ring.window(
+            (number - 1) * ring.interval, SPARKLINE_INTERVALS
+        )
+        sparkline = [round(value, 4) for value in carbon]
+        self._sparklines[entity_id] = (number, sparkline)
+        return sparkline
@@ -0,0 +1,263 @@
+"""Websocket API for the My Carbon Footprint integration."""
+
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .CarbonFootprintCoordinator import CarbonFootprintCoordinator
+from .const import DATA_ORGANIZATION, DOMAIN
+from .models import CoordinatorData, OrganizationData
+from .organization import Organization
+from .timeseries import RESOLUTIONS, TimeSeries
+
+
+@callback
+def async_setup(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, ws_timeseries)
+    websocket_api.async_register_command(hass, ws_summary)
+    websocket_api.async_register_command(hass, ws_subscribe_summary)
+    websocket_api.async_register_command(hass, ws_gaps)
+    websocket_api.async_register_command(hass, ws_organization)
+
+
+def _get_coordinator(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> CarbonFootprintCoordinator | None:
+    """Return the coordinator of the requested entry, or send an error."""
+    coordinator = hass.data.get(DOMAIN, {}).get(msg["entry_id"])
+    if coordinator is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry not found"
+        )
+    return coordinator
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/timeseries",
+        vol.Required("entry_id"): str,
+        # The total of the entry if omitted
+        vol.Optional("entity_id"): cv.entity_id,
+        vol.Optional("resolutions"): [vol.In(RESOLUTIONS)],
+    }
+)
+@callback
+def ws_timeseries(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Return the recent energy and carbon of a source, without reading history."""
+    if (coordinator := _get_coordinator(hass, connection, msg)) is None:
+        return
+    if coordinator.timeseries is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_SUPPORTED, "Time series are disabled"
+        )
+        return
+
+    series = coordinator.timeseries.query(
+        msg.get("entity_id"), dt_util.utcnow().timestamp(), msg.get("resolutions")
+    )
+    if series is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "No time series for this source"
+        )
+        return
+    connection.send_result(msg["id"], series)
+
+
+def _summary(
+    data: CoordinatorData | None,
+    timeseries: TimeSeries | None,
+    periods: list[str],
+    timestamp: float,
+) -> dict[str, Any]:
+    """Return the totals, the sources and the requested total period buckets.
+
+    Each source is the energy of the last interval, in kWh, its carbon
+    footprint, in kg, and its cost, None when costs aren't tracked. Sites
+    ingested from a spool are their name, carbon and cost.
+    """
+    summary: dict[str, Any] = {
+        "carbon_intensity": data.carbon_intensity if data else None,
+        "total_carbon": data.total_carbon if data else None,
+        "total_cost": data.total_cost if data else None,
+        "emissions": data.emissions if data else {},
+        "sources": {
+            entity_id: [sensor.value, sensor.carbon, sensor.cost]
+            for entity_id, sensor in data.energy_sensors.items()
+        }
+        if data
+        else {},
+    }
+    if data and data.sites:
+        summary["sites"] = {
+            site: [remote.name, remote.carbon, remote.cost]
+            for site, remote in data.sites.items()
+        }
+    if periods and timeseries:
+        summary["periods"] = timeseries.query(None, timestamp, periods)
+    return summary
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/summary",
+        vol.Required("entry_id"): str,
+        # Resolutions of the total period buckets to include
+        vol.Optional("periods", default=[]): [vol.In(RESOLUTIONS)],
+    }
+)
+@callback
+def ws_summary(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Return the whole state of an entry in a single message."""
+    if (coordinator := _get_coordinator(hass, connection, msg)) is None:
+        return
+    connection.send_result(
+        msg["id"],
+        _summary(
+            coordinator.data,
+            coordinator.timeseries,
+            msg["periods"],
+            dt_util.utcnow().timestamp(),
+        ),
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe_summary",
+        vol.Required("entry_id"): str,
+        vol.Optional("periods", default=[]): [vol.In(RESOLUTIONS)],
+    }
+)
+@callback
+def ws_subscribe_summary(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Send the state of an entry, then what changed after each refresh.
+
+    Changes only hold the totals that changed, the sources and sites whose
+    values changed, and the current bucket of each requested period.
+    """
+    if (coordinator := _get_coordinator(hass, connection, msg)) is None:
+        return
+
+    periods: list[str] = msg["periods"]
+    sent = _summary(
+        coordinator.data,
+        coordinator.timeseries,
+        periods,
+        dt_util.utcnow().timestamp(),
+    )
+
+    @callback
+    def async_send_changes() -> None:
+        """Send what changed since the last message."""
+        nonlocal sent
+        current = _summary(coordinator.data, None, [], 0)
+        changes: dict[str, Any] = {
+            key: value
+            for key in ("carbon_intensity", "total_carbon", "total_cost", "emissions")
+            if (value := current[key]) != sent[key]
+        }
+        sources = {
+            entity_id: values
+            for entity_id, values in current["sources"].items()
+            if sent["sources"].get(entity_id) != values
+        }
+        if sources:
+            changes["sources"] = sources
+        sites = {
+            site: values
+            for site, values in current.get("sites", {}).items()
+            if sent.get("sites", {}).get(site) != values
+        }
+        if sites:
+            changes["sites"] = sites
+        if periods and (timeseries := coordinator.timeseries):
+            timestamp = dt_util.utcnow().timestamp()
+            changes["periods"] = {}
+            for resolution in periods:
+                start, energy, carbon = timeseries.total[resolution].window(
+                    timestamp, 1
+                )
+                changes["periods"][resolution] = {
+                    "start": start,
+                    "energy": energy[0],
+                    "carbon": carbon[0],
+                }
+        sent = current
+        if changes:
+            connection.send_message(websocket_api.event_message(msg["id"], changes))
+
+    connection.subscriptions[msg["id"]] = coordinator.async_add_listener(
+        async_send_changes
+    )
+    connection.send_result(msg["id"])
+    connection.send_message(websocket_api.event_message(msg["id"], sent))
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/gaps",
+        vol.Required("entry_id"): str,
+    }
+)
+@callback
+def ws_gaps(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Return the energy left uncharged while sources were stale, per source."""
+    if (coordinator := _get_coordinator(hass, connection, msg)) is None:
+        return
+    if coordinator.health is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_SUPPORTED, "Source health is disabled"
+        )
+        return
+
+    connection.send_result(
+        msg["id"],
+        {
+            entity_id: [[gap.start, gap.end, gap.energy] for gap in gaps]
+            for entity_id, gaps in coordinator.health.gaps.items()
+        },
+    )
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/organization"})
+@callback
+def ws_organization(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Return the totals of every entry together, and of each entry."""
+    data: OrganizationData | None = (
+        organization.data
+        # Still loading while it is an event
+        if isinstance(organization := hass.data.get(DATA_ORGANIZATION), Organization)
+        else None
+    )
+    connection.send_result(
+        msg["id"],
+        {
+            "total_carbon": data.total_carbon if data else 0,
+            "total_cost": data.total_cost if data else 0,
+            "sites": {
+                entry_id: {
+                    "title": site.title,
+                    "total_carbon": site.total_carbon,
+                    "total_cost": site.total_cost,
+                }
+                for entry_id, site in data.sites.items()
+            }
+            if data
+            else {},
+        },
+    )
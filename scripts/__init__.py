@@ -0,0 +1 @@
+"""Development tools for the My Carbon Footprint integration."""
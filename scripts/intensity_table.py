@@ -0,0 +1,33 @@
+"""Convert a carbon intensity time series to the binary table format.
+
+Binary tables are memory-mapped by the integration instead of being loaded,
+which suits multi-year hourly series:
+
+    python -m scripts.intensity_table intensity.csv intensity.bin
+"""
+
+import argparse
+
+from custom_components.my_carbon_footprint.intensity_table import (
+    read_table,
+    write_binary_table,
+)
+
+
+def main() -> None:
+    """Convert a CSV or JSON time series to a binary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="CSV or JSON time series")
+    parser.add_argument("destination", help="binary table to write")
+    args = parser.parse_args()
+
+    series, _factors = read_table(args.source)
+    if not series:
+        parser.error(f"{args.source} has no timestamp column")
+
+    write_binary_table(args.destination, series)
+    print(f"Wrote {len(series)} rows to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Offline replay of recorded state streams through the carbon footprint coordinator.
+
+Feeds recorded energy and carbon intensity state changes to a
+CarbonFootprintCoordinator on a virtual clock, much faster than real time, and
+compares the resulting totals with an exact integration of the same stream.
+No running Home Assistant instance is needed:
+
+    python -m scripts.replay states.csv \\
+        --intensity-entity sensor.carbon_intensity --scan-interval 60 300
+
+The source is either a CSV file with ``timestamp,entity_id,state`` columns
+(ISO 8601 or epoch timestamps) or a recorder SQLite database.
+"""
+
+import argparse
+import asyncio
+import bisect
+import csv
+import logging
+import sqlite3
+import tempfile
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import UTC
+from types import SimpleNamespace
+from typing import Any, NamedTuple
+
+from freezegun import freeze_time
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.const import (
+    CONF_CARBON_INTENSITY,
+    CONF_ENERGY_ENTITIES,
+    SCAN_INTERVAL,
+)
+
+
+class StateChange(NamedTuple):
+    """A recorded state change."""
+
+    timestamp: float  # seconds since epoch
+    entity_id: str
+    state: str
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of replaying a stream with one set of settings."""
+
+    scan_interval: int
+    total_carbon: float
+    exact_carbon: float
+    updates: int
+    store_writes: int
+
+    @property
+    def error(self) -> float:
+        """Return the difference with the exact integration, in kg."""
+        return self.total_carbon - self.exact_carbon
+
+    @property
+    def relative_error(self) -> float:
+        """Return the difference with the exact integration, relative to it."""
+        return self.error / self.exact_carbon if self.exact_carbon else 0.0
+
+
+class ReplayStore:
+    """In-memory stand-in for the coordinator store that counts writes.
+
+    Queued snapshots are written right away, as the snapshot store worker
+    would between two refreshes.
+    """
+
+    def __init__(self) -> None:
+        self.data: Any = None
+        self.writes = 0
+
+    async def async_load(self) -> Any:
+        return self.data
+
+    async def async_save(self, data: Any) -> None:
+        self._write(data)
+
+    def async_schedule_save(self, data: Any) -> None:
+        self._write(data)
+
+    async def async_flush(self) -> None:
+        """Nothing is pending, snapshots are written when queued."""
+
+    def _write(self, data: Any) -> None:
+        self.data = data
+        self.writes += 1
+
+
+def _parse_timestamp(value: str) -> float:
+    """Parse an epoch or ISO 8601 timestamp."""
+    try:
+        return float(value)
+    except ValueError:
+        parsed = dt_util.parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"Invalid timestamp: {value}") from None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=UTC)
+        return parsed.timestamp()
+
+
+def load_csv(path: str) -> list[StateChange]:
+    """Load state changes from a CSV file."""
+    with open(path, newline="", encoding="utf-8") as file:
+        changes = [
+            StateChange(
+                _parse_timestamp(row["timestamp"]), row["entity_id"], row["state"]
+            )
+            for row in csv.DictReader(file)
+        ]
+    changes.sort(key=lambda change: change.timestamp)
+    return changes
+
+
+def load_recorder(
+    path: str, entity_ids: Iterable[str] | None = None
+) -> list[StateChange]:
+    """Load state changes from a recorder SQLite database."""
+    query = (
+        "SELECT states.last_updated_ts, states_meta.entity_id, states.state "
+        "FROM states JOIN states_meta ON states.metadata_id = states_meta.metadata_id"
+    )
+    params: list[str] = []
+    if entity_ids:
+        params = list(entity_ids)
+        query += f" WHERE states_meta.entity_id IN ({','.join('?' * len(params))})"
+    query += " ORDER BY states.last_updated_ts"
+
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as connection:
+        rows = connection.execute(query, params).fetchall()
+    return [StateChange(float(ts), entity_id, state) for ts, entity_id, state in rows]
+
+
+def _to_float(state: str) -> float | None:
+    try:
+        return float(state)
+    except ValueError:
+        return None
+
+
+def exact_carbon(
+    changes: list[StateChange], intensity_entity: str, energy_entities: list[str]
+) -> float:
+    """Integrate the stream exactly, in kg of CO2.
+
+    Consumption between two meter readings is assumed linear and charged at
+    the intensity in effect over that time, not only when the reading arrives.
+    """
+    intensity_times: list[float] = []
+    intensity_values: list[float] = []
+    # Cumulative intensity integral (g/kWh x s) at each intensity change
+    intensity_integral: list[float] = []
+    for change in changes:
+        if change.entity_id != intensity_entity:
+            continue
+        value = _to_float(change.state)
+        if value is None:
+            continue
+        if intensity_times:
+            intensity_integral.append(
+                intensity_integral[-1]
+                + intensity_values[-1] * (change.timestamp - intensity_times[-1])
+            )
+        else:
+            intensity_integral.append(0.0)
+        intensity_times.append(change.timestamp)
+        intensity_values.append(value)
+
+    if not intensity_times:
+        return 0.0
+
+    def integral_at(timestamp: float) -> float:
+        index = bisect.bisect_right(intensity_times, timestamp) - 1
+        if index < 0:
+            return 0.0
+        return intensity_integral[index] + intensity_values[index] * (
+            timestamp - intensity_times[index]
+        )
+
+    def average_intensity(start: float, end: float) -> float:
+        # Consumption before the first intensity sample is charged at the
+        # intensity that follows it
+        start = max(start, intensity_times[0])
+        if end <= start:
+            index = bisect.bisect_right(intensity_times, end) - 1
+            return intensity_values[index] if index >= 0 else 0.0
+        return (integral_at(end) - integral_at(start)) / (end - start)
+
+    total = 0.0
+    energy = set(energy_entities)
+    previous: dict[str, tuple[float, float]] = {}
+    for change in changes:
+        if change.entity_id not in energy:
+            continue
+        value = _to_float(change.state)
+        if value is None:
+            continue
+        if change.entity_id in previous:
+            prev_timestamp, prev_value = previous[change.entity_id]
+            consumption = max(0.0, value - prev_value)
+            if consumption:
+                total += (
+                    consumption
+                    * average_intensity(prev_timestamp, change.timestamp)
+                    / 1000
+                )
+        previous[change.entity_id] = (change.timestamp, value)
+    return total
+
+
+async def async_replay(
+    hass: HomeAssistant,
+    changes: list[StateChange],
+    intensity_entity: str,
+    energy_entities: list[str],
+    scan_interval: int = SCAN_INTERVAL,
+) -> ReplayResult:
+    """Replay state changes through a coordinator refreshing every scan_interval."""
+    unload_callbacks: list[Callable[[], Any]] = []
+    entry = SimpleNamespace(
+        entry_id="replay",
+        data={
+            CONF_CARBON_INTENSITY: intensity_entity,
+            CONF_ENERGY_ENTITIES: energy_entities,
+        },
+        options={},
+        async_on_unload=unload_callbacks.append,
+    )
+    store = ReplayStore()
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)  # type: ignore[arg-type]
+
+    tracked = {intensity_entity, *energy_entities}
+    changes = [change for change in changes if change.entity_id in tracked]
+    if not changes:
+        return ReplayResult(scan_interval, 0.0, 0.0, 0, 0)
+
+    timestamp = changes[0].timestamp
+    end = changes[-1].timestamp + scan_interval
+    updates = 0
+    index = 0
+
+    with freeze_time(dt_util.utc_from_timestamp(timestamp)) as frozen:
+        await coordinator.async_setup()
+        while timestamp <= end:
+            while index < len(changes) and changes[index].timestamp <= timestamp:
+                change = changes[index]
+                hass.states.async_set(
+                    change.entity_id, change.state, timestamp=change.timestamp
+                )
+                index += 1
+            await coordinator.async_refresh()
+            updates += 1
+            timestamp += scan_interval
+            frozen.move_to(dt_util.utc_from_timestamp(timestamp))
+
+    for unload_callback in unload_callbacks:
+        unload_callback()
+
+    return ReplayResult(
+        scan_interval=scan_interval,
+        total_carbon=coordinator.total_carbon,
+        exact_carbon=exact_carbon(changes, intensity_entity, energy_entities),
+        updates=updates,
+        store_writes=store.writes,
+    )
+
+
+async def _async_main(args: argparse.Namespace) -> list[ReplayResult]:
+    if args.source.endswith((".db", ".sqlite", ".sqlite3")):
+        entity_ids = (
+            [args.intensity_entity, *args.energy_entity] if args.energy_entity else None
+        )
+        changes = load_recorder(args.source, entity_ids)
+    else:
+        changes = load_csv(args.source)
+
+    energy_entities = args.energy_entity or sorted(
+        {change.entity_id for change in changes} - {args.intensity_entity}
+    )
+
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        for scan_interval in args.scan_interval:
+            hass = HomeAssistant(config_dir)
+            try:
+                results.append(
+                    await async_replay(
+                        hass,
+                        changes,
+                        args.intensity_entity,
+                        energy_entities,
+                        scan_interval,
+                    )
+                )
+            finally:
+                await hass.async_stop(force=True)
+    return results
+
+
+def main() -> None:
+    """Replay a recorded stream and print how each setting performs."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="CSV file or recorder SQLite database")
+    parser.add_argument("--intensity-entity", required=True)
+    parser.add_argument(
+        "--energy-entity",
+        action="append",
+        help="energy entity to replay, defaults to every other entity of the source",
+    )
+    parser.add_argument("--scan-interval", type=int, nargs="+", default=[SCAN_INTERVAL])
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show coordinator logs"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig()
+    logging.getLogger("custom_components.my_carbon_footprint").setLevel(
+        logging.DEBUG if args.verbose else logging.CRITICAL
+    )
+    results = asyncio.run(_async_main(args))
+
+    print(
+        f"{'interval (s)':>12} {'updates':>8} {'writes':>8} "
+        f"{'total (kg)':>12} {'exact (kg)':>12} {'error (%)':>10}"
+    )
+    for result in results:
+        print(
+            f"{result.scan_interval:>12} {result.updates:>8} "
+            f"{result.store_writes:>8} {result.total_carbon:>12.4f} "
+            f"{result.exact_carbon:>12.4f} {result.relative_error * 100:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+from collections.abc import Callable
+
 import pytest
+from homeassistant.core import HomeAssistant
 from pytest_socket import enable_socket, socket_allow_hosts
 
+from .synthetic import SyntheticFleet
+
 
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
@@ -8,6 +13,16 @@ def auto_enable_custom_integrations(enable_custom_integrations):
     yield
 
 
+@pytest.fixture
+def synthetic_fleet(hass: HomeAssistant) -> Callable[..., SyntheticFleet]:
+    """Return a factory of synthetic meters, set in the test hass."""
+
+    def _synthetic_fleet(count: int, seed: int = 0) -> SyntheticFleet:
+        return SyntheticFleet(hass, count, seed)
+
+    return _synthetic_fleet
+
+
 @pytest.hookimpl(trylast=True)
 def pytest_runtest_setup():
     """Ensure the bluetooth integration we depend on can load.
@@ -0,0 +1,109 @@
+"""Synthetic energy meters and carbon intensity for scale tests.
+
+Meters are registered as real states of a test ``hass`` and driven by
+deterministic generators, the same seed always gives the same readings. A
+few meters report in Wh or MWh, reset to zero on their own, or are
+unavailable for a while, as real installs do.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+
+from homeassistant.const import (
+    ATTR_DEVICE_CLASS,
+    ATTR_UNIT_OF_MEASUREMENT,
+    STATE_UNAVAILABLE,
+)
+from homeassistant.core import HomeAssistant
+
+INTENSITY_ENTITY = "sensor.carbon_intensity"
+
+# Size in kWh of the units meters report in
+UNITS = {"kWh": 1.0, "Wh": 0.001, "MWh": 1000.0}
+
+
+@dataclass(frozen=True, slots=True)
+class SyntheticMeter:
+    """Energy meter using a constant power, its readings are a function of time."""
+
+    entity_id: str
+    unit: str
+    # kWh used per minute
+    rate: float
+    # Minutes between resets to zero, never reset if None
+    reset_every: int | None = None
+    # Minutes while the meter is unavailable
+    outage: range = range(0)
+
+    def energy(self, minute: int) -> float:
+        """Return the reading at minute, in kWh."""
+        elapsed = minute % self.reset_every if self.reset_every else minute
+        return elapsed * self.rate
+
+    def state(self, minute: int) -> str:
+        """Return the state at minute, in the unit of the meter."""
+        if minute in self.outage:
+            return STATE_UNAVAILABLE
+        return str(self.energy(minute) / UNITS[self.unit])
+
+
+def synthetic_meters(
+    count: int,
+    seed: int = 0,
+    *,
+    reset_ratio: float = 0.05,
+    outage_ratio: float = 0.05,
+    other_unit_ratio: float = 0.2,
+) -> list[SyntheticMeter]:
+    """Generate count meters, the ratios are the share of each kind of meter."""
+    rng = random.Random(seed)
+    meters = []
+    for index in range(count):
+        outage_start = rng.randrange(1, 30)
+        meters.append(
+            SyntheticMeter(
+                entity_id=f"sensor.synthetic_energy_{index}",
+                unit=rng.choice(("Wh", "MWh"))
+                if rng.random() < other_unit_ratio
+                else "kWh",
+                rate=rng.uniform(0.001, 0.05),
+                reset_every=rng.randrange(5, 30)
+                if rng.random() < reset_ratio
+                else None,
+                outage=range(outage_start, outage_start + rng.randrange(1, 10))
+                if rng.random() < outage_ratio
+                else range(0),
+            )
+        )
+    return meters
+
+
+def synthetic_intensity(minute: int) -> float:
+    """Return the carbon intensity at minute, in g/kWh, following a daily cycle."""
+    return 250 + 150 * math.sin(2 * math.pi * minute / 1440)
+
+
+class SyntheticFleet:
+    """Synthetic meters and the carbon intensity, set in a test hass."""
+
+    def __init__(self, hass: HomeAssistant, count: int, seed: int = 0) -> None:
+        """Generate the meters, states are set by set_minute."""
+        self.hass = hass
+        self.meters = synthetic_meters(count, seed)
+
+    @property
+    def energy_entities(self) -> list[str]:
+        """Return the entity ids of the meters."""
+        return [meter.entity_id for meter in self.meters]
+
+    def set_minute(self, minute: int) -> None:
+        """Set the states of the meters and of the intensity at minute."""
+        async_set = self.hass.states.async_set
+        async_set(INTENSITY_ENTITY, str(synthetic_intensity(minute)))
+        for meter in self.meters:
+            async_set(
+                meter.entity_id,
+                meter.state(minute),
+                {ATTR_DEVICE_CLASS: "energy", ATTR_UNIT_OF_MEASUREMENT: meter.unit},
+            )
@@ -0,0 +1,141 @@
+"""Test the carbon budgets."""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import voluptuous as vol
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_capture_events
+
+from custom_components.my_carbon_footprint.budgets import (
+    BUDGETS_SCHEMA,
+    EVENT_BUDGET_PROJECTED_OVERRUN,
+    EVENT_BUDGET_THRESHOLD,
+    BudgetEngine,
+    period_bounds,
+)
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+
+NOW = datetime(2025, 1, 15, 12, 0, tzinfo=dt_util.UTC)
+
+
+def test_budgets_schema():
+    budgets = BUDGETS_SCHEMA([{"name": "home", "limit": "10"}])
+    assert budgets == [
+        {"name": "home", "limit": 10.0, "period": "month", "thresholds": [0.8, 1.0]}
+    ]
+
+    with pytest.raises(vol.Invalid):
+        BUDGETS_SCHEMA([{"name": "home", "limit": 0}])
+    with pytest.raises(vol.Invalid):
+        BUDGETS_SCHEMA([{"name": "home", "limit": 1}, {"name": "home", "limit": 2}])
+
+
+def test_period_bounds():
+    start, end = period_bounds(NOW, "week")
+    assert start == dt_util.start_of_local_day(datetime(2025, 1, 13))
+    assert end == dt_util.start_of_local_day(datetime(2025, 1, 20))
+
+    start, end = period_bounds(datetime(2025, 12, 31, 12, tzinfo=dt_util.UTC), "month")
+    assert (start.month, end.year, end.month) == (12, 2026, 1)
+
+
+async def test_budget_thresholds_fire_once(hass: HomeAssistant):
+    events = async_capture_events(hass, EVENT_BUDGET_THRESHOLD)
+    engine = BudgetEngine(
+        hass,
+        "test_entry_id",
+        [{"name": "heating", "limit": 10, "entities": ["sensor.energy1"]}],
+    )
+
+    engine.async_update(NOW, {"sensor.energy1": 5, "sensor.energy2": 20})
+    engine.async_update(NOW, {"sensor.energy1": 3.5})
+    engine.async_update(NOW, {"sensor.energy1": 0.5})
+    await hass.async_block_till_done()
+
+    assert [event.data["threshold"] for event in events] == [0.8]
+    assert events[0].data["used"] == 8.5
+    assert events[0].data["budget"] == "heating"
+
+    # Both thresholds can be crossed by a single update
+    engine.async_update(NOW, {"sensor.energy1": 5})
+    await hass.async_block_till_done()
+    assert [event.data["threshold"] for event in events] == [0.8, 1.0]
+
+
+async def test_budget_resets_each_period(hass: HomeAssistant):
+    events = async_capture_events(hass, EVENT_BUDGET_THRESHOLD)
+    engine = BudgetEngine(hass, "test_entry_id", [{"name": "home", "limit": 1}])
+
+    engine.async_update(NOW, {"sensor.energy1": 0.9})
+    engine.async_update(NOW + timedelta(days=31), {"sensor.energy1": 0.5})
+    await hass.async_block_till_done()
+
+    assert len(events) == 1
+    assert engine.budgets[0].used == 0.5
+    assert engine.budgets[0].crossed == 0
+
+
+async def test_budget_projected_overrun(hass: HomeAssistant):
+    events = async_capture_events(hass, EVENT_BUDGET_PROJECTED_OVERRUN)
+    engine = BudgetEngine(
+        hass, "test_entry_id", [{"name": "daily", "limit": 10, "period": "day"}]
+    )
+    start, _end = period_bounds(NOW, "day")
+
+    # Too early in the period to project
+    engine.async_update(start + timedelta(minutes=10), {"sensor.energy1": 0.1})
+    # 0.1 kg per hour over the day stays under the limit
+    engine.async_update(start + timedelta(hours=2), {"sensor.energy1": 0.1})
+    # A one minute spike barely moves the average rate
+    engine.async_update(start + timedelta(hours=2, minutes=1), {"sensor.energy1": 0.5})
+    await hass.async_block_till_done()
+    assert not events
+
+    # 4.7 kg over 6 hours would use 18.8 kg by the end of the day
+    engine.async_update(start + timedelta(hours=6), {"sensor.energy1": 4.0})
+    engine.async_update(start + timedelta(hours=7), {"sensor.energy1": 0.1})
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data["projected"] == pytest.approx(18.8)
+
+    # The projection fires again once it went back under the limit
+    engine.async_update(start + timedelta(hours=20), {"sensor.energy1": 0.1})
+    assert not engine.budgets[0].projected_overrun
+    engine.async_update(start + timedelta(hours=21), {"sensor.energy1": 4.9})
+    await hass.async_block_till_done()
+    assert len(events) == 2
+
+
+async def test_coordinator_persists_budgets(hass: HomeAssistant):
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1"],
+            "budgets": [{"name": "home", "limit": 10}],
+        },
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(async_load=AsyncMock(return_value=None), async_flush=AsyncMock())
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+    await coordinator.async_setup()
+
+    coordinator._previous_energy_values = {"sensor.energy1": 10}
+    coordinator.data = 1  # Not the first update after load
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy1", "30")
+    await coordinator._async_update_data()
+
+    snapshot = store.async_schedule_save.call_args.args[0]
+    assert snapshot["budgets"]["home"]["used"] == 2.0
+
+    restored = BudgetEngine(hass, "test_entry_id", entry.data["budgets"])
+    restored.restore(snapshot["budgets"])
+    assert restored.budgets[0].used == 2.0
+    assert (
+        restored.budgets[0].period_start == coordinator._budgets.budgets[0].period_start
+    )
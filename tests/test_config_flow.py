@@ -12,9 +12,15 @@ from custom_components.my_carbon_footprint.config_flow import (
     CarbonFootprintConfigFlow,
 )
 from custom_components.my_carbon_footprint.const import (
+    CONF_BUDGETS,
     CONF_CARBON_INTENSITY,
     CONF_ENERGY_ENTITIES,
+    CONF_EXPORT_FORMAT,
+    CONF_INTENSITY_TABLE,
+    CONF_PRICE_ENTITY,
+    CONF_SOURCE_MODE,
     DOMAIN,
+    SOURCE_MODE_ENERGY_DASHBOARD,
 )
 
 
@@ -108,6 +114,73 @@ async def test_form_invalid_energy_entity(hass: HomeAssistant) -> None:
         assert result["errors"] == {CONF_ENERGY_ENTITIES: "entity_not_found"}
 
 
+async def test_form_without_intensity_source(hass: HomeAssistant) -> None:
+    with patch("homeassistant.core.StateMachine.get") as mock_get:
+        mock_get.return_value = True
+
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": SOURCE_USER},
+            data={CONF_ENERGY_ENTITIES: ["sensor.energy1", "sensor.energy2"]},
+        )
+
+        assert result["type"] == FlowResultType.FORM
+        assert result["errors"] == {"base": "no_intensity_source"}
+
+
+async def test_create_energy_dashboard_entry(hass: HomeAssistant, bypass_setup) -> None:
+    hass.states.async_set("sensor.carbon_intensity", "100")
+
+    # Energy entities come from the Energy dashboard, selected ones aren't checked
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": SOURCE_USER},
+        data={
+            CONF_CARBON_INTENSITY: "sensor.carbon_intensity",
+            CONF_ENERGY_ENTITIES: ["sensor.missing"],
+            CONF_SOURCE_MODE: SOURCE_MODE_ENERGY_DASHBOARD,
+        },
+    )
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+
+
+async def test_form_invalid_price_entity(hass: HomeAssistant) -> None:
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy1", "1")
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": SOURCE_USER},
+        data={
+            CONF_CARBON_INTENSITY: "sensor.carbon_intensity",
+            CONF_ENERGY_ENTITIES: ["sensor.energy1"],
+            CONF_PRICE_ENTITY: "sensor.missing_price",
+        },
+    )
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {CONF_PRICE_ENTITY: "entity_not_found"}
+
+
+async def test_form_invalid_budgets(hass: HomeAssistant) -> None:
+    with patch("homeassistant.core.StateMachine.get") as mock_get:
+        mock_get.return_value = True
+
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": SOURCE_USER},
+            data={
+                CONF_CARBON_INTENSITY: "sensor.carbon_intensity",
+                CONF_ENERGY_ENTITIES: ["sensor.energy1", "sensor.energy2"],
+                CONF_BUDGETS: [{"name": "home", "limit": -1}],
+            },
+        )
+
+        assert result["type"] == FlowResultType.FORM
+        assert result["errors"] == {CONF_BUDGETS: "invalid_budgets"}
+
+
 async def test_options_flow(hass: HomeAssistant, bypass_setup) -> None:
     with patch(
         "custom_components.my_carbon_footprint.config_flow.validate_input",
@@ -130,6 +203,9 @@ async def test_options_flow(hass: HomeAssistant, bypass_setup) -> None:
         result = await options_flow.async_step_init()
         assert result["type"] == FlowResultType.FORM
         assert result["step_id"] == "init"
+        # Settings only read at setup are not offered as options
+        assert CONF_EXPORT_FORMAT not in result["data_schema"].schema
+        assert CONF_BUDGETS not in result["data_schema"].schema
 
         result = await options_flow.async_step_init(
             user_input={
@@ -146,3 +222,31 @@ async def test_options_flow(hass: HomeAssistant, bypass_setup) -> None:
             CONF_CARBON_INTENSITY: "sensor.carbon_intensity_updated",
             CONF_ENERGY_ENTITIES: ["sensor.energy1_updated", "sensor.energy2_updated"],
         }
+
+
+async def test_options_flow_keeps_intensity_table(hass: HomeAssistant) -> None:
+    hass.states.async_set("sensor.energy1", "1")
+    mock_entry = MagicMock(
+        entry_id="test_entry_id",
+        data={
+            CONF_INTENSITY_TABLE: "intensity.csv",
+            CONF_ENERGY_ENTITIES: ["sensor.energy1"],
+        },
+    )
+    options_flow = CarbonFootprintConfigFlow.async_get_options_flow(mock_entry)
+    options_flow.hass = hass
+
+    result = await options_flow.async_step_init()
+    schema = result["data_schema"].schema
+    key = next(key for key in schema if key == CONF_INTENSITY_TABLE)
+    assert key.description == {"suggested_value": "intensity.csv"}
+
+    # A table is enough without an intensity sensor
+    result = await options_flow.async_step_init(
+        user_input={
+            CONF_INTENSITY_TABLE: "intensity.csv",
+            CONF_ENERGY_ENTITIES: ["sensor.energy1"],
+        }
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"][CONF_INTENSITY_TABLE] == "intensity.csv"
@@ -1,14 +1,25 @@
 """Test CarbonFootprintCoordinator functionality."""
 
-from unittest.mock import MagicMock, patch
+import asyncio
+import math
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from freezegun import freeze_time
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import UpdateFailed
 
 from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
     CarbonFootprintCoordinator,
 )
+from custom_components.my_carbon_footprint.models import Gap, IntensityStats
+from custom_components.my_carbon_footprint.statistics import VirtualSourceStatistics
+from custom_components.my_carbon_footprint.storage import (
+    decode_snapshot,
+    encode_snapshot,
+)
 
 
 @pytest.fixture
@@ -200,3 +211,522 @@ async def test_coordinator_update_failed(hass: HomeAssistant, mock_config_entry)
         pytest.raises(UpdateFailed),
     ):
         await coordinator._async_update_data()
+
+
+async def test_coordinator_reset_counter(hass: HomeAssistant, mock_config_entry):
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    coordinator._previous_energy_values = {"sensor.energy1": 10, "sensor.energy2": 20}
+    coordinator._entity_carbon = {"sensor.energy1": 1.0, "sensor.energy2": 2.0}
+    coordinator._total_carbon = 3.0
+    published_carbon = coordinator.entity_carbon
+
+    with patch.object(coordinator._store, "async_save") as save_mock:
+        await coordinator.async_reset_counter("sensor.energy1")
+
+    assert coordinator._previous_energy_values == {"sensor.energy2": 20}
+    assert coordinator.entity_carbon == {"sensor.energy1": 0, "sensor.energy2": 2.0}
+    assert coordinator.total_carbon == 3.0
+    save_mock.assert_called_once()
+    # Published state is replaced, not mutated
+    assert published_carbon == {"sensor.energy1": 1.0, "sensor.energy2": 2.0}
+    # The total still adds up with the carbon of the reset entity
+    assert coordinator._reset_carbon == 1.0
+    assert coordinator._check_consistency()
+
+    with patch.object(coordinator._store, "async_save") as save_mock:
+        await coordinator.async_reset_counter()
+
+    assert coordinator._previous_energy_values == {}
+    assert coordinator.entity_carbon == {}
+    assert coordinator.total_carbon == 0
+    save_mock.assert_called_once_with(
+        {
+            "total_carbon": 0,
+            "entity_carbon": {},
+            "previous_energy_values": {},
+            "total_carbon_error": 0,
+            "entity_carbon_error": {},
+            "reset_carbon": 0,
+            "intensity_stats": {},
+        }
+    )
+
+
+async def test_coordinator_reset_during_save(hass: HomeAssistant, mock_config_entry):
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    coordinator._previous_energy_values = {"sensor.energy1": 10, "sensor.energy2": 20}
+    coordinator.data = 1  # Not the first update after load
+
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy1", "20")
+    hass.states.async_set("sensor.energy2", "20")
+
+    saved = []
+    save_started = asyncio.Event()
+    release_save = threading.Event()
+
+    def slow_write(data):
+        saved.append(data)
+        if len(saved) == 1:
+            hass.loop.call_soon_threadsafe(save_started.set)
+            release_save.wait()
+
+    with patch.object(coordinator._store, "_write", slow_write):
+        data = await coordinator._async_update_data()
+        await save_started.wait()
+
+        # Reset while the worker is still writing the update snapshot
+        reset = asyncio.create_task(coordinator.async_reset_counter())
+        await asyncio.sleep(0)
+        assert not reset.done()
+        release_save.set()
+        await reset
+
+    assert data.total_carbon == 1.0
+    # The update snapshot is untouched by the reset, and the reset is not undone
+    assert saved[0]["total_carbon"] == 1.0
+    assert saved[0]["entity_carbon"] == {"sensor.energy1": 1.0, "sensor.energy2": 0}
+    assert saved[1]["total_carbon"] == 0
+    assert coordinator.total_carbon == 0
+    assert coordinator.entity_carbon == {}
+
+
+async def test_coordinator_save_does_not_encode_on_the_loop(
+    hass: HomeAssistant, mock_config_entry
+):
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    loop_thread = threading.get_ident()
+    encoded_in = []
+
+    def write(data):
+        encoded_in.append(threading.get_ident())
+
+    with patch.object(coordinator._store, "_write", write):
+        for entity_count in (10, 10_000):
+            coordinator._entity_carbon = {
+                f"sensor.energy{index}": index / 1000 for index in range(entity_count)
+            }
+            coordinator._previous_energy_values = dict.fromkeys(
+                coordinator._entity_carbon, 1.0
+            )
+            snapshot = coordinator._snapshot()
+
+            for _ in range(20):
+                coordinator._store.async_schedule_save(snapshot)
+                await coordinator._store.async_flush()
+
+    assert len(encoded_in) == 40
+    # Only a reference is queued, snapshots are encoded by the store worker
+    assert loop_thread not in encoded_in
+
+
+def test_intensity_stats_lifetime_sums_do_not_drift():
+    stats = IntensityStats()
+    for _ in range(100_000):
+        stats = stats.add(0, 0, 0.1, 0.0567)
+
+    assert stats.energy == math.fsum([0.1] * 100_000)
+    assert stats.carbon == math.fsum([0.0567] * 100_000)
+
+
+async def test_coordinator_totals_do_not_drift(hass: HomeAssistant, mock_config_entry):
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    coordinator.data = 1  # Not the first update after load
+    hass.states.async_set("sensor.carbon_intensity", "56.7")
+
+    additions = {"sensor.energy1": [], "sensor.energy2": []}
+    with patch.object(coordinator._store, "async_schedule_save"):
+        for minute in range(20_000):
+            for index, entity_id in enumerate(additions, start=1):
+                energy = minute * 0.00123 * index
+                hass.states.async_set(entity_id, str(energy))
+                if minute:
+                    consumption = energy - (minute - 1) * 0.00123 * index
+                    additions[entity_id].append(consumption * 56.7 / 1000)
+            coordinator._update_state()
+
+    for entity_id, carbon in additions.items():
+        assert coordinator.entity_carbon[entity_id] == math.fsum(carbon)
+    assert coordinator.total_carbon == math.fsum(
+        [*additions["sensor.energy1"], *additions["sensor.energy2"]]
+    )
+    assert coordinator._check_consistency()
+
+
+async def test_coordinator_loads_totals_without_reset_carbon(
+    hass: HomeAssistant, mock_config_entry
+):
+    store = MagicMock(
+        async_load=AsyncMock(
+            return_value={
+                "total_carbon": 5.0,
+                "entity_carbon": {"sensor.energy1": 1.0, "sensor.energy2": 2.5},
+                "previous_energy_values": {},
+            }
+        ),
+        async_flush=AsyncMock(),
+    )
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry, store=store)
+
+    await coordinator.async_setup()
+
+    # Carbon of entities reset before it was tracked is attributed to resets
+    assert coordinator._reset_carbon == 1.5
+    assert coordinator._total_carbon_error == 0
+    assert coordinator._check_consistency()
+
+
+async def test_coordinator_reports_inconsistent_totals(
+    hass: HomeAssistant, mock_config_entry, caplog: pytest.LogCaptureFixture
+):
+    store = MagicMock(
+        async_load=AsyncMock(
+            return_value={
+                "total_carbon": 5.0,
+                "entity_carbon": {"sensor.energy1": 1.0},
+                "previous_energy_values": {},
+                "reset_carbon": 1.0,
+            }
+        ),
+        async_flush=AsyncMock(),
+    )
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry, store=store)
+
+    await coordinator.async_setup()
+
+    assert "differs from the sum of its parts" in caplog.text
+
+
+async def test_coordinator_intensity_stats(hass: HomeAssistant, mock_config_entry):
+    await hass.config.async_set_time_zone("UTC")
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    coordinator._previous_energy_values = {"sensor.energy1": 0, "sensor.energy2": 0}
+    coordinator.data = 1  # Not the first update after load
+
+    def update(intensity, energy1):
+        hass.states.async_set("sensor.carbon_intensity", str(intensity))
+        hass.states.async_set("sensor.energy1", str(energy1))
+        hass.states.async_set("sensor.energy2", "0")
+        return coordinator._update_state()
+
+    # Wednesday, then Thursday and the next Monday
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        update(100, 1)
+        data = update(300, 4)
+        stats = data.energy_sensors["sensor.energy1"].stats
+        assert IntensityStats.average_intensity(
+            stats.day_energy, stats.day_carbon
+        ) == pytest.approx(250)
+        # Nothing consumed, nothing to average
+        assert data.energy_sensors["sensor.energy2"].stats.day_energy == 0
+
+        frozen.move_to("2025-01-16 12:00:00")
+        stats = update(200, 5).energy_sensors["sensor.energy1"].stats
+        assert (stats.day_energy, stats.week_energy, stats.energy) == (1, 5, 5)
+
+        frozen.move_to("2025-01-20 12:00:00")
+        stats = update(200, 5).energy_sensors["sensor.energy1"].stats
+        assert (stats.day_energy, stats.week_energy, stats.energy) == (0, 0, 5)
+        assert IntensityStats.average_intensity(
+            stats.energy, stats.carbon
+        ) == pytest.approx(1200 / 5)
+
+
+async def test_coordinator_emission_dimensions(hass: HomeAssistant):
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1", "sensor.energy2"],
+            "market_carbon_intensity": 50,
+            "co2e_factor": 1.1,
+        },
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(
+        async_load=AsyncMock(return_value=None),
+        async_save=AsyncMock(),
+        async_flush=AsyncMock(),
+    )
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+    await coordinator.async_setup()
+    assert coordinator.emission_dimensions == (
+        "location_co2e",
+        "market_co2",
+        "market_co2e",
+    )
+    coordinator._previous_energy_values = {"sensor.energy1": 0, "sensor.energy2": 0}
+    coordinator.data = 1  # Not the first update after load
+
+    hass.states.async_set("sensor.carbon_intensity", "200")
+    hass.states.async_set("sensor.energy1", "10")
+    hass.states.async_set("sensor.energy2", "5")
+    data = coordinator._update_state()
+
+    assert data.total_carbon == pytest.approx(3)
+    assert data.emissions == pytest.approx(
+        {"location_co2e": 3.3, "market_co2": 0.75, "market_co2e": 0.825}
+    )
+    assert data.energy_sensors["sensor.energy1"].emissions.values == pytest.approx(
+        (2.2, 0.5, 0.55)
+    )
+
+    # Emissions are persisted with the dimensions they were accounted for
+    store.async_load = AsyncMock(
+        return_value=decode_snapshot(encode_snapshot(coordinator._snapshot()))
+    )
+    restored = CarbonFootprintCoordinator(hass, entry, store=store)
+    await restored.async_setup()
+    assert restored.total_emissions == pytest.approx(data.emissions)
+
+    await coordinator.async_reset_counter("sensor.energy1")
+    assert "sensor.energy1" not in coordinator._entity_emissions
+    assert coordinator.total_emissions == pytest.approx(data.emissions)
+
+
+async def test_coordinator_without_emission_dimensions(
+    hass: HomeAssistant, mock_config_entry
+):
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    coordinator._previous_energy_values = {"sensor.energy1": 0, "sensor.energy2": 0}
+    coordinator.data = 1  # Not the first update after load
+
+    hass.states.async_set("sensor.carbon_intensity", "200")
+    hass.states.async_set("sensor.energy1", "10")
+    hass.states.async_set("sensor.energy2", "5")
+    data = coordinator._update_state()
+
+    assert coordinator.emission_dimensions == ()
+    assert data.emissions == {}
+    assert data.energy_sensors["sensor.energy1"].emissions is None
+    assert "total_emissions" not in coordinator._snapshot()
+
+
+async def test_coordinator_timeseries(hass: HomeAssistant, mock_config_entry):
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    coordinator._previous_energy_values = {"sensor.energy1": 0, "sensor.energy2": 0}
+    coordinator.data = 1  # Not the first update after load
+
+    with freeze_time("2025-01-15 12:00:00"):
+        hass.states.async_set("sensor.carbon_intensity", "200")
+        hass.states.async_set("sensor.energy1", "10")
+        hass.states.async_set("sensor.energy2", "5")
+        coordinator._update_state()
+        now = time.time()
+
+    timeseries = coordinator.timeseries
+    assert timeseries.query("sensor.energy1", now)["1m"]["carbon"][-1] == 2
+    assert timeseries.query(None, now)["1h"]["energy"][-1] == 15
+
+    mock_config_entry.data["timeseries_max_sources"] = 0
+    assert CarbonFootprintCoordinator(hass, mock_config_entry).timeseries is None
+
+
+async def test_coordinator_virtual_sources_keep_bounded_state(hass: HomeAssistant):
+    """Updates of virtual sources, which have no entity of their own."""
+    count = 2000
+    energy_entities = [f"sensor.energy_{index}" for index in range(count)]
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": energy_entities,
+            "virtual_sources": True,
+            "timeseries_max_sources": 0,
+        },
+        entry_id="test_entry_id",
+    )
+    hass.states.async_set("sensor.carbon_intensity", "200")
+    for entity_id in energy_entities:
+        hass.states.async_set(entity_id, "1")
+    coordinator = CarbonFootprintCoordinator(hass, entry)
+    coordinator._statistics = VirtualSourceStatistics(hass, entry.entry_id)
+
+    with (
+        freeze_time("2025-01-15 12:00:00") as frozen,
+        patch(
+            "custom_components.my_carbon_footprint.statistics."
+            "async_add_external_statistics"
+        ) as add_statistics,
+    ):
+        coordinator._update_state()
+        coordinator.data = 1  # Not the first update after load
+        for value in range(2, 8):
+            frozen.tick(600)
+            for entity_id in energy_entities:
+                hass.states.async_set(entity_id, str(value))
+            coordinator._update_state()
+
+    # One statistic per source when the hour ends, not one per update
+    assert add_statistics.call_count == count
+    assert not any(map(coordinator.has_sensor, energy_entities))
+    # One entry per source, however many updates there were
+    for state in (
+        coordinator._previous_energy_values,
+        coordinator._entity_carbon,
+        coordinator._entity_carbon_error,
+        coordinator._statistics._metadata,
+    ):
+        assert len(state) == count
+
+
+async def test_coordinator_spreads_sparse_meter_deltas(
+    hass: HomeAssistant, mock_config_entry
+):
+    coordinator = CarbonFootprintCoordinator(hass, mock_config_entry)
+    intensities = [100, 300, 200, 400] * 4
+
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        hass.states.async_set("sensor.carbon_intensity", "100")
+        hass.states.async_set("sensor.energy1", "0")
+        hass.states.async_set("sensor.energy2", "0")
+        coordinator._update_state()
+        coordinator.data = 1  # Not the first update after load
+
+        # energy1 reports every minute, energy2 every quarter hour
+        for minute in range(1, 16):
+            frozen.tick(60)
+            hass.states.async_set("sensor.carbon_intensity", str(intensities[minute]))
+            hass.states.async_set("sensor.energy1", str(minute))
+            if minute == 15:
+                hass.states.async_set("sensor.energy2", "15")
+            data = coordinator._update_state()
+
+    expected = sum(intensities[1:16]) / 1000
+    assert data.energy_sensors["sensor.energy1"].carbon == pytest.approx(expected)
+    # Not all charged at the intensity of the last minute
+    assert data.energy_sensors["sensor.energy2"].carbon == pytest.approx(expected)
+
+
+async def _setup_health_coordinator(
+    hass: HomeAssistant, **data: float
+) -> CarbonFootprintCoordinator:
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1", "sensor.energy2"],
+            **data,
+        },
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(async_load=AsyncMock(return_value=None), async_flush=AsyncMock())
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+    await coordinator.async_setup()
+    return coordinator
+
+
+async def test_coordinator_records_stale_meter_gaps(hass: HomeAssistant):
+    coordinator = await _setup_health_coordinator(hass, stale_after=5)
+
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        start = time.time()
+        hass.states.async_set("sensor.carbon_intensity", "100")
+        hass.states.async_set("sensor.energy1", "0")
+        hass.states.async_set("sensor.energy2", "0")
+        coordinator._update_state()
+        coordinator.data = 1  # Not the first update after load
+
+        for minute in range(1, 11):
+            frozen.tick(60)
+            hass.states.async_set("sensor.carbon_intensity", "100")
+            hass.states.async_set("sensor.energy2", str(minute))
+            if minute == 10:
+                hass.states.async_set("sensor.energy1", "4")
+            data = coordinator._update_state()
+            if minute == 6:
+                assert coordinator.health.degraded == {"sensor.energy1": start}
+
+    # What the stale meter used is left for a backfill, not charged
+    assert coordinator.health.status == "ok"
+    assert coordinator.health.gaps["sensor.energy1"] == (Gap(start, start + 600, 4),)
+    assert data.energy_sensors["sensor.energy1"].carbon == 0
+    assert data.energy_sensors["sensor.energy2"].carbon == pytest.approx(1)
+    snapshot = decode_snapshot(encode_snapshot(coordinator._snapshot()))
+    assert snapshot["gaps"] == {
+        "sensor.energy1": [{"start": start, "end": start + 600, "energy": 4}]
+    }
+
+
+async def test_coordinator_records_stale_intensity_gaps(hass: HomeAssistant):
+    coordinator = await _setup_health_coordinator(hass, intensity_stale_after=1)
+
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        start = time.time()
+        hass.states.async_set("sensor.carbon_intensity", "100")
+        hass.states.async_set("sensor.energy1", "0")
+        hass.states.async_set("sensor.energy2", "0")
+        coordinator._update_state()
+        coordinator.data = 1  # Not the first update after load
+
+        for minute in (1, 2):
+            frozen.tick(120)
+            hass.states.async_set("sensor.energy1", str(minute))
+            assert coordinator._update_state() is None
+            coordinator.data = None
+
+        frozen.tick(60)
+        hass.states.async_set("sensor.carbon_intensity", "300")
+        hass.states.async_set("sensor.energy1", "3")
+        data = coordinator._update_state()
+
+    assert coordinator.health.status == "ok"
+    # The energy used without an intensity is neither charged now nor later
+    assert coordinator.health.gaps == {"sensor.energy1": (Gap(start, start + 240, 2),)}
+    assert data.energy_sensors["sensor.energy1"].carbon == pytest.approx(0.3)
+
+
+@freeze_time("2025-01-15 12:30:00")
+async def test_coordinator_energy_cost(hass: HomeAssistant, tmp_path):
+    await hass.config.async_set_time_zone("UTC")
+    hass.config.config_dir = str(tmp_path)
+    (tmp_path / "tariff.json").write_text(
+        '[{"price": 0.2}, {"hour": 12, "price": 0.5}]'
+    )
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1", "sensor.energy2"],
+            "price_entity": "sensor.energy_price",
+            "tariff_table": "tariff.json",
+        },
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(
+        async_load=AsyncMock(return_value=None),
+        async_save=AsyncMock(),
+        async_flush=AsyncMock(),
+    )
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+    await coordinator.async_setup()
+    coordinator._previous_energy_values = {"sensor.energy1": 0, "sensor.energy2": 0}
+    coordinator.data = 1  # Not the first update after load
+
+    # Priced in the same pass as the carbon
+    hass.states.async_set("sensor.carbon_intensity", "200")
+    hass.states.async_set("sensor.energy_price", "0.3")
+    hass.states.async_set("sensor.energy1", "10")
+    hass.states.async_set("sensor.energy2", "5")
+    data = coordinator._update_state()
+    assert data.total_cost == pytest.approx(4.5)
+    assert data.energy_sensors["sensor.energy1"].cost == pytest.approx(3)
+
+    # Without a price, the time-of-use price of the tariff table applies
+    hass.states.async_set("sensor.energy_price", "unavailable")
+    hass.states.async_set("sensor.energy1", "12")
+    data = coordinator._update_state()
+    assert data.total_cost == pytest.approx(5.5)
+    assert data.energy_sensors["sensor.energy1"].cost == pytest.approx(4)
+
+    # Costs are persisted with the carbon
+    store.async_load = AsyncMock(
+        return_value=decode_snapshot(encode_snapshot(coordinator._snapshot()))
+    )
+    restored = CarbonFootprintCoordinator(hass, entry, store=store)
+    await restored.async_setup()
+    assert restored.total_cost == pytest.approx(5.5)
+    assert restored.entity_cost == pytest.approx(
+        {"sensor.energy1": 4, "sensor.energy2": 1.5}
+    )
+
+    # Like the carbon, the total keeps the cost of a reset entity
+    await coordinator.async_reset_counter("sensor.energy1")
+    assert coordinator.entity_cost["sensor.energy1"] == 0
+    assert coordinator.total_cost == pytest.approx(5.5)
@@ -0,0 +1,140 @@
+"""Test the Energy dashboard source."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+from homeassistant.components.energy.data import async_get_manager
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.const import DOMAIN
+from custom_components.my_carbon_footprint.energy_dashboard import (
+    grid_import_entities,
+)
+
+
+def _grid(*meters: str) -> dict:
+    return {
+        "type": "grid",
+        "flow_from": [
+            {
+                "stat_energy_from": meter,
+                "stat_cost": None,
+                "entity_energy_price": None,
+                "number_energy_price": None,
+            }
+            for meter in meters
+        ],
+        "flow_to": [
+            {
+                "stat_energy_to": "sensor.grid_export",
+                "stat_compensation": None,
+                "entity_energy_price": None,
+                "number_energy_price": None,
+            }
+        ],
+        "cost_adjustment_day": 0,
+    }
+
+
+PREFERENCES = {
+    "energy_sources": [
+        _grid("sensor.grid_peak", "sensor.grid_off_peak", "external:grid"),
+        {
+            "type": "solar",
+            "stat_energy_from": "sensor.solar",
+            "config_entry_solar_forecast": None,
+        },
+        {
+            "type": "battery",
+            "stat_energy_from": "sensor.battery_out",
+            "stat_energy_to": "sensor.battery_in",
+        },
+    ],
+    "device_consumption": [],
+}
+
+
+def test_grid_import_entities():
+    assert grid_import_entities(None) == []
+    # Solar, battery and exported energy are not charged
+    assert grid_import_entities(PREFERENCES) == [
+        "sensor.grid_peak",
+        "sensor.grid_off_peak",
+    ]
+
+
+async def test_coordinator_follows_energy_preferences(hass: HomeAssistant):
+    manager = await async_get_manager(hass)
+    await manager.async_update(PREFERENCES)
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "source_mode": "energy_dashboard",
+        },
+        entry_id="test_entry_id",
+    )
+    unload_callbacks = []
+    entry.async_on_unload = unload_callbacks.append
+    store = MagicMock(async_load=AsyncMock(return_value=None), async_flush=AsyncMock())
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+    await coordinator.async_setup()
+    assert coordinator.energy_entities == ["sensor.grid_peak", "sensor.grid_off_peak"]
+
+    added = []
+    async_dispatcher_connect(
+        hass, "my_carbon_footprint_energy_entities_added_test_entry_id", added.append
+    )
+    coordinator._previous_energy_values = {"sensor.grid_peak": 5}
+
+    # Changes in the Energy panel apply without a reload
+    await manager.async_update(
+        {"energy_sources": [_grid("sensor.grid_off_peak", "sensor.grid_new")]}
+    )
+    await hass.async_block_till_done()
+    assert coordinator.energy_entities == ["sensor.grid_off_peak", "sensor.grid_new"]
+    assert added == [["sensor.grid_new"]]
+    assert coordinator._previous_energy_values == {}
+
+    # Once unloaded, changes are ignored
+    for unload in unload_callbacks:
+        unload()
+    await manager.async_update(PREFERENCES)
+    assert coordinator.energy_entities == ["sensor.grid_off_peak", "sensor.grid_new"]
+
+
+async def test_reloaded_entry_notifies_only_the_new_coordinator(
+    hass: HomeAssistant, tmp_path
+):
+    hass.config.config_dir = str(tmp_path)
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    manager = await async_get_manager(hass)
+    await manager.async_update(PREFERENCES)
+    listeners = len(manager._update_listeners)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "source_mode": "energy_dashboard",
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    old = hass.data[DOMAIN][entry.entry_id]
+
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    new = hass.data[DOMAIN][entry.entry_id]
+    assert new is not old
+
+    await manager.async_update({"energy_sources": [_grid("sensor.grid_new")]})
+    await hass.async_block_till_done()
+
+    assert old.energy_entities == ["sensor.grid_peak", "sensor.grid_off_peak"]
+    assert new.energy_entities == ["sensor.grid_new"]
+    # A single listener, whatever the number of reloads
+    assert len(manager._update_listeners) == listeners + 1
@@ -0,0 +1,131 @@
+"""Test the carbon records export."""
+
+import csv
+import os
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.const import (
+    DOMAIN,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_PARQUET,
+)
+from custom_components.my_carbon_footprint.export import EXPORT_FIELDS, CarbonExporter
+
+DAY1 = datetime(2025, 1, 1, 23, 59, tzinfo=UTC)
+DAY2 = datetime(2025, 1, 2, 0, 0, tzinfo=UTC)
+
+
+async def test_export_csv_rotates_daily(hass: HomeAssistant, tmp_path):
+    exporter = CarbonExporter(hass, str(tmp_path), EXPORT_FORMAT_CSV, "carbon")
+    await exporter.async_setup()
+
+    exporter.add(DAY1, "sensor.energy1", 0.5, 100, 0.05)
+    exporter.add(DAY2, "sensor.energy1", 1.0, 200, 0.2)
+    await exporter.async_flush()
+    exporter.add(DAY2, "sensor.energy2", 2.0, 200, 0.4)
+    await exporter.async_close()
+
+    with open(tmp_path / "carbon_2025-01-01.csv", encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows == [
+        list(EXPORT_FIELDS),
+        [DAY1.isoformat(), "sensor.energy1", "0.5", "100", "0.05"],
+    ]
+
+    with open(tmp_path / "carbon_2025-01-02.csv", encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    # Header is written once, later batches are appended
+    assert [row[1] for row in rows] == ["entity_id", "sensor.energy1", "sensor.energy2"]
+
+
+async def test_export_schedules_flush_when_buffer_is_full(
+    hass: HomeAssistant, tmp_path
+):
+    exporter = CarbonExporter(hass, str(tmp_path), EXPORT_FORMAT_CSV, "carbon")
+
+    exporter.add(DAY1, "sensor.energy1", 0.5, 100, 0.05)
+    exporter.async_schedule_flush()
+    await hass.async_block_till_done()
+    assert not (tmp_path / "carbon_2025-01-01.csv").exists()
+
+    with patch("custom_components.my_carbon_footprint.export.EXPORT_BUFFER_SIZE", 2):
+        exporter.add(DAY1, "sensor.energy2", 1.0, 100, 0.1)
+        exporter.async_schedule_flush()
+        await hass.async_block_till_done()
+    assert (tmp_path / "carbon_2025-01-01.csv").exists()
+
+
+async def test_export_parquet(hass: HomeAssistant, tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    exporter = CarbonExporter(hass, str(tmp_path), EXPORT_FORMAT_PARQUET, "carbon")
+    await exporter.async_setup()
+
+    exporter.add(DAY2, "sensor.energy1", 1.0, 200, 0.2)
+    await exporter.async_flush()
+    exporter.add(DAY2, "sensor.energy2", 2.0, 200, 0.4)
+    await exporter.async_close()
+
+    table = parquet.read_table(tmp_path / "carbon_2025-01-02.parquet")
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert table.column("entity_id").to_pylist() == [
+        "sensor.energy1",
+        "sensor.energy2",
+    ]
+
+
+async def test_coordinator_exports_consumption(hass: HomeAssistant):
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1", "sensor.energy2"],
+            "export_format": EXPORT_FORMAT_CSV,
+        },
+        entry_id="test_entry_id",
+    )
+    coordinator = CarbonFootprintCoordinator(hass, entry)
+    await coordinator.async_setup()
+    coordinator._previous_energy_values = {"sensor.energy1": 10, "sensor.energy2": 20}
+    coordinator.data = 1  # Not the first update after load
+
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy1", "12")
+    hass.states.async_set("sensor.energy2", "20")
+
+    with patch.object(coordinator._exporter, "add") as add_mock:
+        await coordinator._async_update_data()
+
+    # Intervals without consumption are not exported
+    add_mock.assert_called_once()
+    assert add_mock.call_args.args[1:] == ("sensor.energy1", 2, 100, 0.2)
+
+
+async def test_coordinator_closes_export_at_final_write(hass: HomeAssistant):
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1"],
+            "export_format": EXPORT_FORMAT_CSV,
+        },
+        entry_id="test_entry_id",
+    )
+    coordinator = CarbonFootprintCoordinator(hass, entry)
+    await coordinator.async_setup()
+    # The listener is removed when the entry unloads
+    entry.async_on_unload.assert_called_once()
+
+    coordinator._exporter.add(DAY1, "sensor.energy1", 0.5, 100, 0.05)
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+
+    assert os.path.exists(
+        hass.config.path(DOMAIN, "export", "carbon_test_entry_id_2025-01-01.csv")
+    )
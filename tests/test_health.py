@@ -0,0 +1,50 @@
+"""Test the health of the sources."""
+
+from custom_components.my_carbon_footprint.health import (
+    MAX_GAPS_PER_SOURCE,
+    SourceHealth,
+)
+from custom_components.my_carbon_footprint.models import Gap
+
+
+def test_check():
+    health = SourceHealth(stale_after=300, intensity_stale_after=None)
+    assert health.status == "ok"
+
+    assert health.check("sensor.energy1", 300, 0, 300) is None
+    # Stale since its last report, until it reports again
+    assert health.check("sensor.energy1", 300, 0, 301) == 0
+    assert health.status == "degraded"
+    assert health.check("sensor.energy1", 300, 0, 600) == 0
+    assert health.check("sensor.energy1", 300, 650, 660) == 0
+    assert health.status == "ok"
+    assert health.check("sensor.energy1", 300, 650, 720) is None
+
+    # Without a threshold, sources are never stale
+    assert health.check("sensor.carbon_intensity", None, 0, 10**6) is None
+    assert health.status == "ok"
+
+
+def test_add_gaps():
+    health = SourceHealth(stale_after=300, intensity_stale_after=None)
+    health.add_gaps([("sensor.energy1", Gap(0, 60, 1))])
+    gaps = health.gaps
+    # Adjacent gaps of a source are merged
+    health.add_gaps(
+        [("sensor.energy1", Gap(60, 120, 2)), ("sensor.energy2", Gap(0, 60, 1))]
+    )
+    assert health.gaps["sensor.energy1"] == (Gap(0, 120, 3),)
+    assert health.gap_energy() == 4
+    # Replaced, not mutated, while a snapshot may reference them
+    assert gaps["sensor.energy1"] == (Gap(0, 60, 1),)
+
+    health.add_gaps(
+        ("sensor.energy1", Gap(start, start + 1, 1))
+        for start in range(200, 200 + 2 * MAX_GAPS_PER_SOURCE, 2)
+    )
+    assert len(health.gaps["sensor.energy1"]) == MAX_GAPS_PER_SOURCE
+    assert health.gaps["sensor.energy1"][0].start > 0
+
+    restored = SourceHealth(stale_after=300, intensity_stale_after=None)
+    restored.restore({"sensor.energy2": [{"start": 0, "end": 60, "energy": 1}]})
+    assert restored.gaps == {"sensor.energy2": (Gap(0, 60, 1),)}
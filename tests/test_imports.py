@@ -0,0 +1,65 @@
+"""Test the import footprint of the My Carbon Footprint integration."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+PACKAGE = "custom_components.my_carbon_footprint"
+
+# Modules loaded with the integration. Optional engines must be imported
+# lazily, where their feature is enabled, and never appear here.
+CORE_MODULES = {
+    PACKAGE,
+    f"{PACKAGE}.CarbonFootprintCoordinator",
+    f"{PACKAGE}.accumulation",
+    f"{PACKAGE}.const",
+    f"{PACKAGE}.intensity_history",
+    f"{PACKAGE}.models",
+    f"{PACKAGE}.organization",
+    f"{PACKAGE}.providers",
+    f"{PACKAGE}.storage",
+    f"{PACKAGE}.timeseries",
+    f"{PACKAGE}.websocket_api",
+}
+
+# Heavy modules that should never be paid for at integration load
+HEAVY_MODULES = {"numpy", "pyarrow", "sqlite3", "cProfile", "yappi"}
+
+# Self time of the integration's own modules, in microseconds
+IMPORT_TIME_BUDGET_US = 50_000
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """Return the self import time of each module loaded by importing module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(self_time)
+    return times
+
+
+def test_package_import_footprint():
+    times = _import_times(PACKAGE)
+
+    loaded = {name for name in times if name.startswith(PACKAGE)}
+    assert loaded == CORE_MODULES
+    assert not HEAVY_MODULES & times.keys()
+    assert sum(times[name] for name in loaded) < IMPORT_TIME_BUDGET_US
+
+
+def test_config_flow_import_footprint():
+    times = _import_times(f"{PACKAGE}.config_flow")
+
+    # Optional engines are only imported to validate their settings
+    loaded = {name for name in times if name.startswith(PACKAGE)}
+    assert loaded == CORE_MODULES | {f"{PACKAGE}.config_flow"}
@@ -3,7 +3,8 @@
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
+from homeassistant.core import CoreState, HomeAssistant
 
 from custom_components.my_carbon_footprint import (
     async_setup_entry,
@@ -12,6 +13,11 @@ from custom_components.my_carbon_footprint import (
 from custom_components.my_carbon_footprint.const import DOMAIN
 
 
+def _coordinator_mock() -> AsyncMock:
+    """Return a coordinator mock, its listener API is synchronous."""
+    return AsyncMock(async_add_listener=MagicMock(), total_carbon=0.0, total_cost=0.0)
+
+
 @pytest.fixture
 def mock_config_entry():
     return MagicMock(
@@ -25,7 +31,7 @@ def mock_config_entry():
 
 
 async def test_setup_entry(hass: HomeAssistant, mock_config_entry):
-    coordinator_mock = AsyncMock()
+    coordinator_mock = _coordinator_mock()
 
     with (
         patch(
@@ -47,6 +53,36 @@ async def test_setup_entry(hass: HomeAssistant, mock_config_entry):
         assert "reset_counter" in hass.services.async_services()[DOMAIN]
 
 
+async def test_setup_entry_defers_refresh_during_startup(
+    hass: HomeAssistant, mock_config_entry
+):
+    coordinator_mock = _coordinator_mock()
+    hass.set_state(CoreState.starting)
+
+    with (
+        patch(
+            "homeassistant.config_entries.ConfigEntries.async_forward_entry_setups",
+            return_value=True,
+        ) as forward_mock,
+        patch(
+            "custom_components.my_carbon_footprint.CarbonFootprintCoordinator",
+            return_value=coordinator_mock,
+        ),
+    ):
+        assert await async_setup_entry(hass, mock_config_entry) is True
+
+        # Stored data is loaded and platforms are set up without a refresh
+        coordinator_mock.async_setup.assert_called_once()
+        forward_mock.assert_called_once()
+        coordinator_mock.async_refresh.assert_not_called()
+
+        hass.set_state(CoreState.running)
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_STARTED)
+        await hass.async_block_till_done()
+
+        coordinator_mock.async_refresh.assert_called_once()
+
+
 async def test_unload_entry(hass: HomeAssistant, mock_config_entry):
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][mock_config_entry.entry_id] = MagicMock()
@@ -61,114 +97,55 @@ async def test_unload_entry(hass: HomeAssistant, mock_config_entry):
         assert mock_config_entry.entry_id not in hass.data[DOMAIN]
 
 
-async def test_service_reset_counter_specific_entity():
-    hass = MagicMock()
-    hass_data = {}
-    hass.data = {DOMAIN: hass_data}
+async def _async_setup_entries(hass: HomeAssistant, entry_ids: list[str]) -> list:
+    """Set up entries with mocked coordinators and return the coordinators."""
+    coordinators = [_coordinator_mock() for _ in entry_ids]
 
-    energy_values1 = {"sensor.energy1": 10, "sensor.energy2": 20}
-    energy_values2 = {"sensor.energy3": 30, "sensor.energy4": 40}
-
-    coordinator1 = MagicMock()
-    coordinator1._previous_energy_values = energy_values1
-    coordinator1.async_refresh = AsyncMock()
-
-    coordinator2 = MagicMock()
-    coordinator2._previous_energy_values = energy_values2
-    coordinator2.async_refresh = AsyncMock()
-
-    hass_data["entry1"] = coordinator1
-    hass_data["entry2"] = coordinator2
-
-    service_call = MagicMock()
-    service_call.data = {"energy_entity_id": "sensor.energy1"}
-
-    # Simple reset_counter handler function based on what's in the integration
-    async def handle_reset_counter(call):
-        """Handle the reset counter service call."""
-        energy_entity_id = call.data.get("energy_entity_id")
+    with (
+        patch(
+            "homeassistant.config_entries.ConfigEntries.async_forward_entry_setups",
+            return_value=True,
+        ),
+        patch(
+            "custom_components.my_carbon_footprint.CarbonFootprintCoordinator",
+            side_effect=coordinators,
+        ),
+    ):
+        for entry_id in entry_ids:
+            await async_setup_entry(hass, MagicMock(entry_id=entry_id, domain=DOMAIN))
 
-        for entry_id, coordinator in hass.data[DOMAIN].items():
-            if energy_entity_id:
-                # Reset only the specified entity
-                if energy_entity_id in coordinator._previous_energy_values:
-                    coordinator._previous_energy_values.pop(energy_entity_id)
-            else:
-                coordinator._previous_energy_values.clear()
+    for coordinator in coordinators:
+        coordinator.async_refresh.reset_mock()
+    return coordinators
 
-        # Force data update
-        for coordinator in hass.data[DOMAIN].values():
-            await coordinator.async_refresh()
 
-    # Call our handler with the service call
-    await handle_reset_counter(service_call)
+async def test_service_reset_counter_specific_entity(hass: HomeAssistant):
+    coordinator1, coordinator2 = await _async_setup_entries(hass, ["entry1", "entry2"])
 
-    # Verify that only sensor.energy1 was removed from coordinator1
-    assert "sensor.energy1" not in coordinator1._previous_energy_values
-    assert "sensor.energy2" in coordinator1._previous_energy_values
-    assert coordinator1._previous_energy_values["sensor.energy2"] == 20
+    await hass.services.async_call(
+        DOMAIN,
+        "reset_counter",
+        {"energy_entity_id": "sensor.energy1"},
+        blocking=True,
+    )
 
-    # Verify that coordinator2 was not affected
-    assert coordinator2._previous_energy_values == energy_values2
+    # Every coordinator resets the entity if it tracks it
+    coordinator1.async_reset_counter.assert_called_once_with("sensor.energy1")
+    coordinator2.async_reset_counter.assert_called_once_with("sensor.energy1")
 
     # Verify both coordinators' refresh methods were called
     coordinator1.async_refresh.assert_called_once()
     coordinator2.async_refresh.assert_called_once()
 
 
-async def test_service_reset_counter_all_entities():
+async def test_service_reset_counter_all_entities(hass: HomeAssistant):
     """Test reset_counter service for all entities."""
-    # Create a dummy HomeAssistant-like object
-    hass = MagicMock()
-    hass_data = {}
-    hass.data = {DOMAIN: hass_data}
-
-    # Create simple dicts to track previous energy values
-    energy_values1 = {"sensor.energy1": 10, "sensor.energy2": 20}
-    energy_values2 = {"sensor.energy3": 30, "sensor.energy4": 40}
-
-    # Create mock coordinators
-    coordinator1 = MagicMock()
-    coordinator1._previous_energy_values = energy_values1
-    coordinator1.async_refresh = AsyncMock()
-
-    coordinator2 = MagicMock()
-    coordinator2._previous_energy_values = energy_values2
-    coordinator2.async_refresh = AsyncMock()
-
-    # Add coordinators to hass.data
-    hass_data["entry1"] = coordinator1
-    hass_data["entry2"] = coordinator2
-
-    # Create a service call with no specific entity (reset all)
-    service_call = MagicMock()
-    service_call.data = {}
-
-    # Simple reset_counter handler function
-    _LOGGER = MagicMock()
-
-    async def handle_reset_counter(call):
-        """Handle the reset counter service call."""
-        energy_entity_id = call.data.get("energy_entity_id")
-
-        for entry_id, coordinator in hass.data[DOMAIN].items():
-            if energy_entity_id:
-                # Reset only the specified entity
-                if energy_entity_id in coordinator._previous_energy_values:
-                    coordinator._previous_energy_values.pop(energy_entity_id)
-            else:
-                coordinator._previous_energy_values.clear()
-
-        # Force data update
-        for coordinator in hass.data[DOMAIN].values():
-            await coordinator.async_refresh()
-
-    # Call our handler with the service call
-    await handle_reset_counter(service_call)
-
-    # Verify that all values were cleared
-    assert len(coordinator1._previous_energy_values) == 0
-    assert len(coordinator2._previous_energy_values) == 0
+    coordinator1, coordinator2 = await _async_setup_entries(hass, ["entry1", "entry2"])
+
+    await hass.services.async_call(DOMAIN, "reset_counter", {}, blocking=True)
+
+    coordinator1.async_reset_counter.assert_called_once_with(None)
+    coordinator2.async_reset_counter.assert_called_once_with(None)
 
     # Verify both coordinators' refresh methods were called
     coordinator1.async_refresh.assert_called_once()
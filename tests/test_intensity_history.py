@@ -0,0 +1,33 @@
+"""Test the recent carbon intensities."""
+
+import pytest
+
+from custom_components.my_carbon_footprint.intensity_history import IntensityHistory
+
+
+def test_average():
+    history = IntensityHistory(max_age=3600)
+    assert history.average(0, 60) is None
+
+    history.add(60, 100)
+    history.add(120, 200)
+    history.add(180, 300)
+    assert history.last_timestamp == 180
+
+    # An intensity applies to the time since the previous refresh
+    assert history.average(60, 120) == 200
+    assert history.average(90, 180) == pytest.approx((30 * 200 + 60 * 300) / 90)
+    # Before the oldest refresh, and after the latest one
+    assert history.average(0, 60) == 100
+    assert history.average(180, 240) == 300
+    assert history.average(120, 120) is None
+
+
+def test_max_age():
+    history = IntensityHistory(max_age=120)
+    for minute in range(10):
+        history.add(minute * 60, minute)
+
+    assert len(history._samples) == 3
+    # The oldest intensity kept applies to everything before it
+    assert history.average(0, 60) == 7
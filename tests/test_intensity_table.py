@@ -0,0 +1,143 @@
+"""Test the carbon intensity tables."""
+
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryError
+from homeassistant.util import dt as dt_util
+
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.intensity_table import (
+    TableIntensityProvider,
+    write_binary_table,
+)
+
+JAN_1 = datetime(2025, 1, 1, tzinfo=dt_util.UTC)
+
+
+def _at(hour: float) -> datetime:
+    return dt_util.utc_from_timestamp(JAN_1.timestamp() + hour * 3600)
+
+
+def test_csv_time_series(tmp_path):
+    path = tmp_path / "intensity.csv"
+    path.write_text(
+        "timestamp,intensity\n"
+        "2025-01-01T01:00:00+00:00,200\n"
+        f"{JAN_1.timestamp()},100\n"
+        "2025-01-01T02:00:00+00:00,300\n"
+    )
+    provider = TableIntensityProvider(str(path))
+    provider.load()
+
+    assert provider.intensity(_at(-1)) is None
+    assert provider.intensity(_at(0)) == 100
+    assert provider.intensity(_at(1.5)) == 200
+    # The last row holds for one more interval
+    assert provider.intensity(_at(2.5)) == 300
+    assert provider.intensity(_at(3.5)) is None
+
+
+async def test_json_recurring_factors(hass: HomeAssistant, tmp_path):
+    await hass.config.async_set_time_zone("UTC")
+    path = tmp_path / "intensity.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"intensity": 300},
+                {"month": 7, "intensity": 150},
+                {"hour": 12, "intensity": 80},
+                {"month": 7, "hour": 12, "intensity": 50},
+            ]
+        )
+    )
+    provider = TableIntensityProvider(str(path))
+    provider.load()
+
+    # The most specific factor applies
+    assert provider.intensity(datetime(2025, 7, 1, 12, tzinfo=dt_util.UTC)) == 50
+    assert provider.intensity(datetime(2025, 1, 1, 12, tzinfo=dt_util.UTC)) == 80
+    assert provider.intensity(datetime(2025, 7, 1, 8, tzinfo=dt_util.UTC)) == 150
+    assert provider.intensity(datetime(2025, 1, 1, 8, tzinfo=dt_util.UTC)) == 300
+
+
+async def test_tariff_table_prices(hass: HomeAssistant, tmp_path):
+    await hass.config.async_set_time_zone("UTC")
+    path = tmp_path / "tariff.csv"
+    path.write_text("hour,price\n,0.2\n12,0.5\n")
+    provider = TableIntensityProvider(str(path), "price")
+    provider.load()
+
+    assert provider.price(datetime(2025, 1, 1, 12, tzinfo=dt_util.UTC)) == 0.5
+    assert provider.price(datetime(2025, 1, 1, 8, tzinfo=dt_util.UTC)) == 0.2
+
+
+def test_binary_time_series_is_mapped(tmp_path):
+    path = tmp_path / "intensity.bin"
+    write_binary_table(
+        str(path),
+        ((JAN_1.timestamp() + hour * 3600, hour) for hour in range(24 * 365 * 3)),
+    )
+    provider = TableIntensityProvider(str(path))
+    provider.load()
+
+    assert isinstance(provider._timestamps, memoryview)
+    assert provider.intensity(_at(0.5)) == 0
+    assert provider.intensity(_at(24 * 400 + 0.5)) == 24 * 400
+
+    provider.close()
+    assert provider.intensity(_at(0.5)) is None
+
+
+def test_binary_table_errors(tmp_path):
+    path = tmp_path / "intensity.bin"
+    path.write_bytes(b"not a table at all")
+    with pytest.raises(ValueError, match="Not a carbon intensity table"):
+        TableIntensityProvider(str(path)).load()
+
+    write_binary_table(str(path), [(0, 100), (3600, 200)])
+    path.write_bytes(path.read_bytes()[:-8])
+    with pytest.raises(ValueError, match="Truncated"):
+        TableIntensityProvider(str(path)).load()
+
+
+async def test_coordinator_falls_back_to_the_table(hass: HomeAssistant, tmp_path):
+    (tmp_path / "intensity.csv").write_text(
+        f"timestamp,intensity\n{JAN_1.timestamp()},100\n"
+    )
+    hass.config.config_dir = str(tmp_path)
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1"],
+            "intensity_table": "intensity.csv",
+        },
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(async_load=AsyncMock(return_value=None), async_flush=AsyncMock())
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+    await coordinator.async_setup()
+
+    # Without the sensor, the intensity comes from the table
+    assert coordinator._get_carbon_intensity(JAN_1) == 100
+
+    hass.states.async_set("sensor.carbon_intensity", "250")
+    assert coordinator._get_carbon_intensity(JAN_1) == 250
+
+
+async def test_coordinator_missing_table(hass: HomeAssistant, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    entry = MagicMock(
+        data={"energy_entities": ["sensor.energy1"], "intensity_table": "none.csv"},
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(async_load=AsyncMock(return_value=None), async_flush=AsyncMock())
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+
+    with pytest.raises(ConfigEntryError):
+        await coordinator.async_setup()
@@ -0,0 +1,114 @@
+"""Test the organization totals of the My Carbon Footprint integration."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.my_carbon_footprint.const import DATA_ORGANIZATION, DOMAIN
+from custom_components.my_carbon_footprint.organization import async_get_organization
+from custom_components.my_carbon_footprint.websocket_api import ws_organization
+
+
+async def _setup_site(hass: HomeAssistant, title: str, energy_entity: str):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=title,
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": [energy_entity],
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry, hass.data[DOMAIN][entry.entry_id]
+
+
+async def test_organization_follows_sites(hass: HomeAssistant, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy1", "0")
+    hass.states.async_set("sensor.energy2", "0")
+    entry1, site1 = await _setup_site(hass, "Office", "sensor.energy1")
+    entry2, site2 = await _setup_site(hass, "Depot", "sensor.energy2")
+    organization = hass.data[DATA_ORGANIZATION]
+    assert set(organization.data.sites) == {entry1.entry_id, entry2.entry_id}
+
+    updates = []
+    organization.async_add_listener(lambda: updates.append(organization.data))
+    refreshes = []
+    site2.async_add_listener(lambda: refreshes.append(site2.data))
+
+    hass.states.async_set("sensor.energy1", "10")
+    await site1.async_refresh()
+
+    # Only the updated site changed the totals, the other one was not refreshed
+    assert len(updates) == 1
+    assert not refreshes
+    assert organization.data.total_carbon == pytest.approx(1.0)
+    assert organization.data.sites[entry1.entry_id].title == "Office"
+    assert organization.data.sites[entry1.entry_id].total_carbon == pytest.approx(1.0)
+    assert organization.data.sites[entry2.entry_id].total_carbon == 0
+
+    hass.states.async_set("sensor.energy2", "5")
+    await site2.async_refresh()
+    assert organization.data.total_carbon == pytest.approx(1.5)
+
+    # A refresh without new energy publishes nothing
+    await site1.async_refresh()
+    assert len(updates) == 2
+
+    # Unloaded sites keep their totals, removed ones leave the organization
+    assert await hass.config_entries.async_unload(entry2.entry_id)
+    assert organization.data.total_carbon == pytest.approx(1.5)
+    assert await hass.config_entries.async_remove(entry2.entry_id)
+    assert organization.data.total_carbon == pytest.approx(1.0)
+    assert list(organization.data.sites) == [entry1.entry_id]
+
+    connection = MagicMock()
+    ws_organization(hass, connection, {"id": 1, "type": f"{DOMAIN}/organization"})
+    connection.send_result.assert_called_once_with(
+        1,
+        {
+            "total_carbon": pytest.approx(1.0),
+            "total_cost": 0,
+            "sites": {
+                entry1.entry_id: {
+                    "title": "Office",
+                    "total_carbon": pytest.approx(1.0),
+                    "total_cost": 0,
+                }
+            },
+        },
+    )
+
+
+async def test_organization_without_sites(hass: HomeAssistant):
+    connection = MagicMock()
+    ws_organization(hass, connection, {"id": 1, "type": f"{DOMAIN}/organization"})
+    connection.send_result.assert_called_once_with(
+        1, {"total_carbon": 0, "total_cost": 0, "sites": {}}
+    )
+
+
+async def test_organization_totals_survive_a_restart(hass: HomeAssistant, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy1", "0")
+    entry, site = await _setup_site(hass, "Office", "sensor.energy1")
+    hass.states.async_set("sensor.energy1", "10")
+    await site.async_refresh()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+    # Saved when Home Assistant stops
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+
+    # Restarted, the site counts though it is not loaded
+    hass.data.pop(DATA_ORGANIZATION)
+    organization = await async_get_organization(hass)
+    assert organization.data.total_carbon == pytest.approx(1.0)
+    assert organization.data.sites[entry.entry_id].title == "Office"
@@ -0,0 +1,88 @@
+"""Test the power sources."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from freezegun import freeze_time
+from homeassistant.core import HomeAssistant
+
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.power import PowerIntegrator
+
+WATT = {"unit_of_measurement": "W"}
+
+
+@pytest.mark.parametrize(
+    ("method", "expected"),
+    [
+        ("trapezoidal", (1 + 2) / 2 / 60 + 2 / 60),
+        ("left", 1 / 60 + 2 / 60),
+    ],
+)
+async def test_integration_methods(hass: HomeAssistant, method, expected):
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        hass.states.async_set("sensor.power", "1000", WATT)
+        integrator = PowerIntegrator(hass, ["sensor.power"], method)
+        unsubscribe = integrator.async_setup()
+        start = frozen().timestamp()
+
+        frozen.tick(60)
+        hass.states.async_set("sensor.power", "2", {"unit_of_measurement": "kW"})
+        await hass.async_block_till_done()
+        # The power holds at its last value until it changes
+        assert integrator.energy("sensor.power", start + 120) == pytest.approx(expected)
+    unsubscribe()
+
+
+async def test_power_gaps(hass: HomeAssistant):
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        integrator = PowerIntegrator(hass, ["sensor.power"], "left")
+        integrator.async_setup()
+        start = frozen().timestamp()
+        assert integrator.energy("sensor.power", start) is None
+
+        hass.states.async_set("sensor.power", "600", WATT)
+        frozen.tick(60)
+        hass.states.async_set("sensor.power", "unavailable", WATT)
+        await hass.async_block_till_done()
+        assert integrator.energy("sensor.power", start + 60) is None
+
+        # Nothing is integrated while the power is unavailable
+        frozen.tick(3540)
+        hass.states.async_set("sensor.power", "600", WATT)
+        await hass.async_block_till_done()
+        assert integrator.energy("sensor.power", start + 3660) == pytest.approx(0.02)
+
+
+async def test_coordinator_power_and_energy_units(hass: HomeAssistant):
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy_wh"],
+            "power_entities": ["sensor.power"],
+        },
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(async_load=AsyncMock(return_value=None), async_flush=AsyncMock())
+
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        hass.states.async_set("sensor.carbon_intensity", "100")
+        hass.states.async_set("sensor.energy_wh", "1000", {"unit_of_measurement": "Wh"})
+        hass.states.async_set("sensor.power", "3000", WATT)
+        coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+        await coordinator.async_setup()
+        assert coordinator.energy_entities == ["sensor.energy_wh", "sensor.power"]
+
+        coordinator._update_state()
+        coordinator.data = 1  # Not the first update after load
+
+        frozen.tick(1200)
+        hass.states.async_set("sensor.energy_wh", "3000", {"unit_of_measurement": "Wh"})
+        data = coordinator._update_state()
+
+    assert data.energy_sensors["sensor.energy_wh"].value == pytest.approx(2)
+    # 3 kW over 20 minutes
+    assert data.energy_sensors["sensor.power"].value == pytest.approx(1)
+    assert data.total_carbon == pytest.approx(0.3)
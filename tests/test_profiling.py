@@ -0,0 +1,72 @@
+"""Test the profiling of coordinator refreshes."""
+
+import pstats
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.my_carbon_footprint.const import DOMAIN
+from custom_components.my_carbon_footprint.profiling import RefreshProfiler
+
+
+async def test_profile_service(hass: HomeAssistant, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy1", "1")
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1"],
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    with patch.dict(sys.modules, {"yappi": None}):
+        response = await hass.services.async_call(
+            DOMAIN,
+            "profile",
+            {"entry_id": entry.entry_id, "refreshes": 2},
+            blocking=True,
+            return_response=True,
+        )
+    path = response["path"]
+    assert path.startswith(str(tmp_path / DOMAIN))
+    assert coordinator.profiling
+
+    # One profile at a time, of an existing entry
+    for data in ({"entry_id": entry.entry_id}, {"entry_id": "missing"}):
+        with pytest.raises(ServiceValidationError):
+            await hass.services.async_call(DOMAIN, "profile", data, blocking=True)
+
+    for value in ("2", "3"):
+        hass.states.async_set("sensor.energy1", value)
+        await coordinator.async_refresh()
+
+    assert not coordinator.profiling
+    stats = pstats.Stats(path)
+    assert any(name == "_async_update_data" for _file, _line, name in stats.stats)
+
+
+def test_profiler_prefers_yappi(tmp_path):
+    yappi = MagicMock()
+    path = str(tmp_path / "profile.prof")
+    with patch.dict(sys.modules, {"yappi": yappi}):
+        profiler = RefreshProfiler(path, 1)
+
+    profiler.enable()
+    profiler.disable()
+    assert profiler.done
+    profiler.write()
+
+    yappi.set_clock_type.assert_called_once_with("wall")
+    yappi.start.assert_called_once()
+    yappi.stop.assert_called_once()
+    yappi.get_func_stats.return_value.save.assert_called_once_with(path, type="pstat")
@@ -0,0 +1,79 @@
+"""Test the offline replay harness."""
+
+import sqlite3
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from scripts.replay import (
+    StateChange,
+    async_replay,
+    exact_carbon,
+    load_csv,
+    load_recorder,
+)
+
+CHANGES = [
+    StateChange(0, "sensor.carbon_intensity", "100"),
+    StateChange(0, "sensor.energy1", "10"),
+    StateChange(60, "sensor.energy1", "11"),
+    StateChange(90, "sensor.carbon_intensity", "300"),
+    StateChange(120, "sensor.energy1", "12"),
+    StateChange(120, "sensor.energy1", "unavailable"),
+    StateChange(180, "sensor.energy1", "13"),
+]
+
+
+def test_exact_carbon_uses_intensity_over_the_interval():
+    # 1 kWh at 100, 1 kWh half at 100 and half at 300, 1 kWh at 300 g/kWh
+    assert exact_carbon(CHANGES, "sensor.carbon_intensity", ["sensor.energy1"]) == (
+        pytest.approx((100 + 200 + 300) / 1000)
+    )
+
+
+async def test_replay_reports_totals_and_counts(hass: HomeAssistant):
+    result = await async_replay(
+        hass, CHANGES, "sensor.carbon_intensity", ["sensor.energy1"], 60
+    )
+
+    assert result.updates == 5  # 0, 60, 120, 180 and 240 seconds
+    assert result.store_writes == 5
+    # Readings are charged at the intensity of the refresh that sees them
+    assert result.total_carbon == pytest.approx((100 + 300 + 300) / 1000)
+    assert result.exact_carbon == pytest.approx(0.6)
+    assert result.error == pytest.approx(0.1)
+
+
+async def test_load_csv(tmp_path):
+    path = tmp_path / "states.csv"
+    path.write_text(
+        "timestamp,entity_id,state\n"
+        "1970-01-01T00:01:00+00:00,sensor.energy1,11\n"
+        "0,sensor.energy1,10\n"
+    )
+
+    assert load_csv(str(path)) == [
+        StateChange(0, "sensor.energy1", "10"),
+        StateChange(60, "sensor.energy1", "11"),
+    ]
+
+
+async def test_load_recorder(tmp_path):
+    path = str(tmp_path / "home-assistant_v2.db")
+    with sqlite3.connect(path) as connection:
+        connection.executescript(
+            """
+            CREATE TABLE states_meta (metadata_id INTEGER, entity_id TEXT);
+            CREATE TABLE states (
+                metadata_id INTEGER, state TEXT, last_updated_ts FLOAT
+            );
+            INSERT INTO states_meta VALUES (1, 'sensor.energy1'), (2, 'sensor.other');
+            INSERT INTO states VALUES (1, '11', 60), (1, '10', 0), (2, 'on', 30);
+            """
+        )
+    connection.close()
+
+    assert load_recorder(path, ["sensor.energy1"]) == [
+        StateChange(0, "sensor.energy1", "10"),
+        StateChange(60, "sensor.energy1", "11"),
+    ]
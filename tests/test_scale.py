@@ -0,0 +1,192 @@
+"""Load tests on synthetic meters.
+
+Bounds are loose enough for slow CI runners, they catch a refresh or a
+reset going quadratic in the number of sources, not small regressions.
+"""
+
+import time
+from collections.abc import Mapping
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.const import EVENT_STATE_CHANGED, EVENT_STATE_REPORTED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.const import DOMAIN
+from custom_components.my_carbon_footprint.storage import SnapshotStore
+
+from .synthetic import (
+    INTENSITY_ENTITY,
+    UNITS,
+    synthetic_intensity,
+    synthetic_meters,
+)
+
+COORDINATOR_SOURCES = 2000
+PLATFORM_SOURCES = 500
+MINUTES = 40
+# Seconds per refresh of every source
+MAX_REFRESH_TIME = 1.0
+MAX_RESET_TIME = 1.0
+
+
+def test_synthetic_meters_are_deterministic():
+    meters = synthetic_meters(1000, seed=1)
+    assert meters == synthetic_meters(1000, seed=1)
+    assert meters != synthetic_meters(1000, seed=2)
+
+    # Every kind of meter is generated
+    assert {meter.unit for meter in meters} == set(UNITS)
+    assert any(meter.reset_every for meter in meters)
+    assert any(meter.outage for meter in meters)
+
+    meter = next(meter for meter in meters if meter.reset_every)
+    assert meter.energy(meter.reset_every) == 0
+    meter = next(meter for meter in meters if meter.outage)
+    assert meter.state(meter.outage.start) == "unavailable"
+
+
+async def test_coordinator_refresh_at_scale(hass: HomeAssistant, synthetic_fleet):
+    fleet = synthetic_fleet(COORDINATOR_SOURCES)
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": INTENSITY_ENTITY,
+            "energy_entities": fleet.energy_entities,
+        },
+        entry_id="test_entry_id",
+    )
+    store = MagicMock(async_load=AsyncMock(return_value=None), async_flush=AsyncMock())
+    coordinator = CarbonFootprintCoordinator(hass, entry, store=store)
+    await coordinator.async_setup()
+
+    durations = []
+    for minute in range(MINUTES):
+        fleet.set_minute(minute)
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        durations.append(time.perf_counter() - start)
+        assert coordinator.last_update_success
+
+        # Unavailable meters are skipped, not charged
+        available = [
+            meter.entity_id for meter in fleet.meters if minute not in meter.outage
+        ]
+        assert list(coordinator.data.energy_sensors) == available
+
+    assert max(durations) < MAX_REFRESH_TIME
+    # One queued snapshot per refresh, written by the store worker
+    assert store.async_schedule_save.call_count == MINUTES
+    assert coordinator._check_consistency()
+
+    # Meters reporting on each refresh are charged at the intensity of each
+    expected_intensity = sum(
+        synthetic_intensity(minute) for minute in range(1, MINUTES)
+    )
+    for meter in fleet.meters:
+        if not meter.reset_every and not meter.outage:
+            assert coordinator.entity_carbon[meter.entity_id] == pytest.approx(
+                meter.rate * expected_intensity / 1000
+            )
+
+
+async def _setup_entry(
+    hass: HomeAssistant, tmp_path, energy_entities: list[str]
+) -> MockConfigEntry:
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "carbon_intensity_entity": INTENSITY_ENTITY,
+            "energy_entities": energy_entities,
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_sensor_platform_at_scale(hass: HomeAssistant, tmp_path, synthetic_fleet):
+    fleet = synthetic_fleet(PLATFORM_SOURCES)
+    fleet.set_minute(0)
+    with patch.object(
+        SnapshotStore, "_write", autospec=True, side_effect=SnapshotStore._write
+    ) as write:
+        entry = await _setup_entry(hass, tmp_path, fleet.energy_entities)
+        coordinator: CarbonFootprintCoordinator = hass.data[DOMAIN][entry.entry_id]
+        sensors = {
+            entity.entity_id
+            for entity in er.async_entries_for_config_entry(
+                er.async_get(hass), entry.entry_id
+            )
+        }
+        assert len(sensors) == PLATFORM_SOURCES + 1
+
+        writes: list[str] = []
+
+        @callback
+        def _is_sensor(event_data: Mapping[str, Any]) -> bool:
+            return event_data["entity_id"] in sensors
+
+        @callback
+        def _async_state_written(event: Event) -> None:
+            writes.append(event.data["entity_id"])
+
+        for event_type in (EVENT_STATE_CHANGED, EVENT_STATE_REPORTED):
+            hass.bus.async_listen(event_type, _async_state_written, _is_sensor)
+
+        write.reset_mock()
+        durations = []
+        for minute in range(1, MINUTES):
+            fleet.set_minute(minute)
+            writes.clear()
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            durations.append(time.perf_counter() - start)
+            # Each sensor writes its state once per refresh
+            assert sorted(writes) == sorted(sensors)
+
+        assert max(durations) < MAX_REFRESH_TIME
+        # One snapshot per refresh, each written before the next refresh
+        assert write.call_count == MINUTES - 1
+
+
+async def test_reset_counter_at_scale(hass: HomeAssistant, tmp_path, synthetic_fleet):
+    fleet = synthetic_fleet(COORDINATOR_SOURCES)
+    fleet.set_minute(0)
+    entry = await _setup_entry(hass, tmp_path, fleet.energy_entities)
+    coordinator: CarbonFootprintCoordinator = hass.data[DOMAIN][entry.entry_id]
+    for minute in (1, 2):
+        fleet.set_minute(minute)
+        await coordinator.async_refresh()
+    assert coordinator.total_carbon > 0
+
+    with patch.object(
+        SnapshotStore, "_write", autospec=True, side_effect=SnapshotStore._write
+    ) as write:
+        meter = fleet.meters[0]
+        start = time.perf_counter()
+        await hass.services.async_call(
+            DOMAIN,
+            "reset_counter",
+            {"energy_entity_id": meter.entity_id},
+            blocking=True,
+        )
+        assert time.perf_counter() - start < MAX_RESET_TIME
+        assert coordinator.entity_carbon[meter.entity_id] == 0
+
+        start = time.perf_counter()
+        await hass.services.async_call(DOMAIN, "reset_counter", {}, blocking=True)
+        assert time.perf_counter() - start < MAX_RESET_TIME
+        await hass.async_block_till_done()
+
+    assert coordinator.total_carbon == 0
+    # The reset state and the refresh that follows, for each call
+    assert write.call_count == 4
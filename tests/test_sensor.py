@@ -1,18 +1,32 @@
 """Test sensor platform for My Carbon Footprint integration."""
 
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
+from freezegun import freeze_time
 from homeassistant.components.sensor import SensorStateClass
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from custom_components.my_carbon_footprint.const import DOMAIN, ICON_CARBON
-from custom_components.my_carbon_footprint.models import CoordinatorData, EnergySensor
+from custom_components.my_carbon_footprint.health import SourceHealth
+from custom_components.my_carbon_footprint.models import (
+    CoordinatorData,
+    EnergySensor,
+    Gap,
+    IntensityStats,
+)
 from custom_components.my_carbon_footprint.sensor import (
+    CarbonFootprintBaseSensor,
+    CarbonFootprintHealthSensor,
     CarbonFootprintSensor,
+    EmissionsSensor,
     EnergyCarbonFootprintSensor,
+    EnergyCostSensor,
     async_setup_entry,
 )
+from custom_components.my_carbon_footprint.timeseries import TimeSeries
 
 
 @pytest.fixture
@@ -45,7 +59,7 @@ async def test_sensor_setup():
     # Create a mock HomeAssistant data structure
     hass = MagicMock()
     mock_config_entry = MagicMock(entry_id="test_entry_id")
-    mock_coordinator = MagicMock()
+    mock_coordinator = MagicMock(health=None, pricing=False)
 
     hass.data = {DOMAIN: {mock_config_entry.entry_id: mock_coordinator}}
     mock_coordinator.energy_entities = ["sensor.energy1", "sensor.energy2"]
@@ -71,6 +85,51 @@ async def test_sensor_setup():
         assert len(entities) == 3
 
 
+async def test_sensor_setup_adds_new_energy_entities(hass: HomeAssistant):
+    entry = MagicMock(entry_id="test_entry_id")
+    coordinator = MagicMock(
+        energy_entities=["sensor.energy1"],
+        emission_dimensions=(),
+        health=None,
+        pricing=False,
+    )
+    hass.data[DOMAIN] = {entry.entry_id: coordinator}
+    entities = []
+
+    await async_setup_entry(hass, entry, entities.extend)
+    assert len(entities) == 2
+
+    async_dispatcher_send(
+        hass,
+        "my_carbon_footprint_energy_entities_added_test_entry_id",
+        ["sensor.energy1", "sensor.energy2"],
+    )
+    # Only entities without a sensor get one
+    assert len(entities) == 3
+    assert entities[-1].unique_id == "test_entry_id_energy2_carbon"
+
+
+async def test_sensor_setup_with_virtual_sources(hass: HomeAssistant):
+    entry = MagicMock(entry_id="test_entry_id")
+    coordinator = MagicMock(
+        energy_entities=["sensor.energy1", "sensor.energy2"],
+        emission_dimensions=(),
+        health=None,
+        pricing=False,
+    )
+    coordinator.has_sensor = lambda entity_id: entity_id == "sensor.energy2"
+    hass.data[DOMAIN] = {entry.entry_id: coordinator}
+    entities = []
+
+    await async_setup_entry(hass, entry, entities.extend)
+
+    # Only the total and the selected energy entity get a sensor
+    assert [entity.unique_id for entity in entities] == [
+        "test_entry_id_total_carbon",
+        "test_entry_id_energy2_carbon",
+    ]
+
+
 async def test_total_carbon_footprint_sensor(
     hass: HomeAssistant, mock_coordinator: MagicMock, mock_config_entry: MagicMock
 ):
@@ -160,3 +219,148 @@ async def test_energy_carbon_footprint_sensor(
     assert attrs["energy_consumption"] == 0
     assert attrs["carbon_intensity"] == 100
     assert attrs["source_entity"] == "sensor.energy1"
+
+
+async def test_sensor_static_metadata_is_reused(
+    hass: HomeAssistant, mock_coordinator, mock_config_entry
+):
+    total_sensor = CarbonFootprintSensor(mock_coordinator, mock_config_entry)
+    energy_sensor = EnergyCarbonFootprintSensor(
+        mock_coordinator, mock_config_entry, "sensor.energy1"
+    )
+
+    for sensor in (total_sensor, energy_sensor):
+        # Device info and attributes are built once, not on every state write
+        assert sensor.device_info is sensor.device_info
+        assert sensor.extra_state_attributes is sensor.extra_state_attributes
+
+    mock_coordinator.data.carbon_intensity = 250
+    assert total_sensor.extra_state_attributes["carbon_intensity"] == 250
+    assert energy_sensor.extra_state_attributes["carbon_intensity"] == 250
+
+
+async def test_energy_sensor_average_intensities(mock_coordinator, mock_config_entry):
+    sensor = EnergyCarbonFootprintSensor(
+        mock_coordinator, mock_config_entry, "sensor.energy1"
+    )
+    mock_coordinator.data.energy_sensors["sensor.energy1"].stats = IntensityStats(
+        day_energy=2, day_carbon=0.1, week_energy=0, week_carbon=0, energy=10, carbon=2
+    )
+
+    attrs = sensor.extra_state_attributes
+    assert attrs["average_carbon_intensity_day"] == 50
+    assert attrs["average_carbon_intensity_week"] is None
+    assert attrs["average_carbon_intensity"] == 200
+
+    # Stats of a previous update are not kept once the entity has none
+    mock_coordinator.data.energy_sensors["sensor.energy1"].stats = None
+    assert sensor.extra_state_attributes["average_carbon_intensity"] is None
+
+
+async def test_sensors_restore_from_store(mock_coordinator, mock_config_entry):
+    mock_coordinator.total_carbon = 12.5
+    mock_coordinator.entity_carbon = {"sensor.energy1": 4.5}
+
+    total_sensor = CarbonFootprintSensor(mock_coordinator, mock_config_entry)
+    energy1_sensor = EnergyCarbonFootprintSensor(
+        mock_coordinator, mock_config_entry, "sensor.energy1"
+    )
+    energy2_sensor = EnergyCarbonFootprintSensor(
+        mock_coordinator, mock_config_entry, "sensor.energy2"
+    )
+    for sensor in (total_sensor, energy1_sensor, energy2_sensor):
+        sensor.restore_from_store()
+
+    # Without coordinator data, sensors report the totals loaded from the store
+    mock_coordinator.data = None
+    assert total_sensor.native_value == 12.5
+    assert energy1_sensor.native_value == 4.5
+    assert energy2_sensor.native_value is None
+
+
+async def test_emissions_sensor(mock_coordinator, mock_config_entry):
+    mock_coordinator.total_emissions = {"market_co2": 2.0}
+    sensor = EmissionsSensor(mock_coordinator, mock_config_entry, "market_co2")
+    sensor.restore_from_store()
+
+    assert sensor.unique_id == "test_entry_id_total_market_co2"
+    assert sensor.native_unit_of_measurement == "kg CO2"
+    assert (
+        EmissionsSensor(
+            mock_coordinator, mock_config_entry, "market_co2e"
+        ).native_unit_of_measurement
+        == "kg CO2e"
+    )
+
+    # Updates without emissions keep the stored value
+    assert sensor.native_value == 2.0
+    mock_coordinator.data.emissions = {"market_co2": 2.5}
+    assert sensor.native_value == 2.5
+
+
+@freeze_time("2025-01-15 12:30:00")
+async def test_sensor_sparklines(mock_coordinator, mock_config_entry):
+    mock_coordinator.timeseries = TimeSeries(max_sources=10)
+    # During the last hour, the current one is not in the sparkline
+    mock_coordinator.timeseries.add("sensor.energy1", time.time() - 3600, 1, 0.25)
+    mock_coordinator.timeseries.add_total(time.time() - 3600, 1, 0.25)
+
+    total_sensor = CarbonFootprintSensor(mock_coordinator, mock_config_entry)
+    energy_sensor = EnergyCarbonFootprintSensor(
+        mock_coordinator, mock_config_entry, "sensor.energy1"
+    )
+    for sensor in (total_sensor, energy_sensor):
+        sparkline = sensor.extra_state_attributes["carbon_sparkline"]
+        assert len(sparkline) == 24
+        assert sparkline[-1] == 0.25
+        assert "carbon_sparkline" in sensor._unrecorded_attributes
+
+
+async def test_energy_cost_sensor(mock_coordinator, mock_config_entry):
+    mock_coordinator.hass.config.currency = "EUR"
+    mock_coordinator.total_cost = 4.0
+    sensor = EnergyCostSensor(mock_coordinator, mock_config_entry)
+    sensor.restore_from_store()
+
+    assert sensor.unique_id == "test_entry_id_total_cost"
+    assert sensor.native_unit_of_measurement == "EUR"
+    assert sensor.state_class == SensorStateClass.TOTAL
+    # Updates without a price keep the last cost
+    mock_coordinator.data.total_cost = None
+    assert sensor.native_value == 4.0
+    mock_coordinator.data.total_cost = 4.5
+    assert sensor.native_value == 4.5
+
+    mock_coordinator.pricing = True
+    mock_coordinator.data.energy_sensors["sensor.energy1"].cost = 1.25
+    energy_sensor = EnergyCarbonFootprintSensor(
+        mock_coordinator, mock_config_entry, "sensor.energy1"
+    )
+    assert energy_sensor.extra_state_attributes["cost"] == 1.25
+
+
+async def test_health_sensor(mock_coordinator, mock_config_entry):
+    mock_coordinator.health = SourceHealth(stale_after=300, intensity_stale_after=None)
+    mock_coordinator.last_update_success = False
+    sensor = CarbonFootprintHealthSensor(mock_coordinator, mock_config_entry)
+
+    assert sensor.unique_id == "test_entry_id_health"
+    assert sensor.available
+    assert sensor.native_value == "ok"
+
+    mock_coordinator.health.check("sensor.energy1", 300, 0, 600)
+    mock_coordinator.health.add_gaps([("sensor.energy2", Gap(0, 60, 1.5))])
+    assert sensor.native_value == "degraded"
+    assert sensor.extra_state_attributes == {
+        "stale_sources": ["sensor.energy1"],
+        "gaps": 1,
+        "gap_energy": 1.5,
+    }
+
+
+def test_base_sensor_requires_stored_value(mock_coordinator, mock_config_entry):
+    class IncompleteSensor(CarbonFootprintBaseSensor):
+        """Sensor that doesn't say where its persisted value comes from."""
+
+    with pytest.raises(TypeError):
+        IncompleteSensor(mock_coordinator, mock_config_entry, "unique_id", "Name")
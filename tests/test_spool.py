@@ -0,0 +1,214 @@
+"""Test the spool shared between Home Assistant instances."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+import pytest
+from freezegun import freeze_time
+from homeassistant.core import HomeAssistant
+
+from custom_components.my_carbon_footprint import spool, websocket_api
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.const import DOMAIN
+from custom_components.my_carbon_footprint.spool import SpoolReader, SpoolWriter
+from custom_components.my_carbon_footprint.storage import SnapshotStore
+
+
+def _record(site: str, seq: int, carbon: float) -> bytes:
+    return orjson.dumps(
+        {
+            "site": site,
+            "name": site.title(),
+            "seq": seq,
+            "time": seq * 300,
+            "carbon": carbon,
+            "cost": 0,
+            "total_carbon": seq * carbon,
+            "total_cost": 0,
+        }
+    )
+
+
+def _read(reader: SpoolReader) -> list[tuple[str, int]]:
+    records, offsets, sequences = reader.read()
+    reader.commit(offsets, sequences)
+    return [(record["site"], record["seq"]) for record in records]
+
+
+def test_reader_tails_segments(tmp_path):
+    reader = SpoolReader(str(tmp_path / "spool"), ignore_site="central")
+    assert _read(reader) == []
+
+    tmp_path.joinpath("spool").mkdir()
+    segment = tmp_path / "spool" / "edge.0000000001.jsonl"
+    segment.write_bytes(_record("edge", 1, 1.0) + b"\n" + _record("edge", 2, 1.0)[:10])
+    (tmp_path / "spool" / "central.0000000001.jsonl").write_bytes(
+        _record("central", 1, 1.0) + b"\n"
+    )
+
+    # A line being written is read once it ends
+    assert _read(reader) == [("edge", 1)]
+    with segment.open("ab") as file:
+        file.write(_record("edge", 2, 1.0)[10:] + b"\n")
+    assert _read(reader) == [("edge", 2)]
+    assert _read(reader) == []
+
+    # Copies and rewrites of a segment are not ingested twice
+    segment.with_name("edge.copy.jsonl").write_bytes(segment.read_bytes())
+    segment.write_bytes(_record("edge", 2, 1.0) + b"\n")
+    assert _read(reader) == []
+
+    with segment.open("ab") as file:
+        file.write(b"not json\n" + _record("edge", 3, 1.0) + b"\n")
+    assert _read(reader) == [("edge", 3)]
+
+    # Records read but not committed are read again
+    with segment.open("ab") as file:
+        file.write(_record("edge", 4, 1.0) + b"\n")
+    reader.read()
+    assert _read(reader) == [("edge", 4)]
+
+
+async def test_writer_resumes_and_rolls_segments(hass: HomeAssistant, tmp_path):
+    directory = str(tmp_path / "spool")
+    writer = SpoolWriter(hass, directory, "edge", "Edge", interval=300)
+    await writer.async_setup()
+
+    writer.async_update(0, 1.0, 0.5)
+    # Within the interval, or without change, nothing is written
+    writer.async_update(100, 2.0, 0.5)
+    writer.async_update(300, 1.0, 0.5)
+    await writer.async_flush()
+    assert writer.sequence == 1
+
+    with (
+        patch.object(spool, "SPOOL_SEGMENT_SIZE", 1),
+        patch.object(spool, "SPOOL_MAX_SEGMENTS", 2),
+    ):
+        for step in range(2, 5):
+            writer.async_update(step * 300, step, 0.5)
+            await writer.async_flush()
+
+    assert sorted(path.name for path in (tmp_path / "spool").iterdir()) == [
+        "edge.0000000003.jsonl",
+        "edge.0000000004.jsonl",
+    ]
+    records = [
+        orjson.loads(line)
+        for path in sorted((tmp_path / "spool").iterdir())
+        for line in path.read_bytes().splitlines()
+    ]
+    assert [(record["seq"], record["carbon"]) for record in records] == [
+        (3, 1.0),
+        (4, 1.0),
+    ]
+
+    # Restarted writers continue the sequence, from the totals last written
+    writer = SpoolWriter(hass, directory, "edge", "Edge")
+    await writer.async_setup()
+    assert (writer.sequence, writer.total_carbon) == (4, 4)
+    writer.async_update(0, 4.5, 0.5)
+    await writer.async_flush()
+    last = orjson.loads(
+        (tmp_path / "spool" / "edge.0000000004.jsonl").read_bytes().splitlines()[-1]
+    )
+    assert (last["seq"], last["carbon"]) == (5, 0.5)
+
+
+def _entry(entry_id: str, **data) -> MagicMock:
+    return MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            **data,
+        },
+        entry_id=entry_id,
+    )
+
+
+async def _central(hass: HomeAssistant, tmp_path) -> CarbonFootprintCoordinator:
+    coordinator = CarbonFootprintCoordinator(
+        hass,
+        _entry("central", energy_entities=[], ingest_dir="spool"),
+        store=SnapshotStore(hass, str(tmp_path / "central.bin")),
+    )
+    await coordinator.async_setup()
+    return coordinator
+
+
+async def test_central_ingests_edge_spool(hass: HomeAssistant, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    hass.config.location_name = "Edge"
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    hass.states.async_set("sensor.energy", "0")
+    edge = CarbonFootprintCoordinator(
+        hass,
+        _entry("edge", energy_entities=["sensor.energy"], spool_dir="spool"),
+        store=MagicMock(
+            async_load=AsyncMock(return_value=None), async_flush=AsyncMock()
+        ),
+    )
+    await edge.async_setup()
+    central = await _central(hass, tmp_path)
+
+    with freeze_time("2025-01-15 12:00:00") as frozen:
+        await edge.async_refresh()
+        for value in ("10", "30"):
+            frozen.tick(300)
+            hass.states.async_set("sensor.energy", value)
+            await edge.async_refresh()
+        await edge.async_shutdown()
+        await central.async_refresh()
+
+    assert central.total_carbon == pytest.approx(3.0)
+    assert central.remote_sites["edge"].name == "Edge"
+    assert central.remote_sites["edge"].carbon == pytest.approx(3.0)
+    assert central.data.sites == central.remote_sites
+    assert central._check_consistency()
+    assert websocket_api._summary(central.data, None, [], 0)["sites"] == {
+        "edge": ["Edge", pytest.approx(3.0), 0]
+    }
+    await central.async_shutdown()
+
+    # Restarted, the central instance goes on from where it stopped
+    central = await _central(hass, tmp_path)
+    await central.async_refresh()
+    assert central.total_carbon == pytest.approx(3.0)
+
+    await central.async_reset_counter()
+    await central.async_refresh()
+    assert central.total_carbon == 0
+    assert central.remote_sites == {}
+
+
+async def test_subscription_sends_ingested_sites(hass: HomeAssistant, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    hass.states.async_set("sensor.carbon_intensity", "100")
+    central = await _central(hass, tmp_path)
+    await central.async_refresh()
+    hass.data[DOMAIN] = {"central": central}
+    connection = MagicMock(subscriptions={})
+    websocket_api.ws_subscribe_summary(
+        hass, connection, {"id": 1, "entry_id": "central", "periods": []}
+    )
+    assert "sites" not in connection.send_message.call_args.args[0]["event"]
+
+    tmp_path.joinpath("spool").mkdir()
+    (tmp_path / "spool" / "edge.0000000001.jsonl").write_bytes(
+        _record("edge", 1, 1.0) + b"\n"
+    )
+    await central.async_refresh()
+    changes = connection.send_message.call_args.args[0]["event"]
+    assert changes["sites"] == {"edge": ["Edge", 1.0, 0]}
+
+    # Sites that didn't change are not sent again
+    (tmp_path / "spool" / "other.0000000001.jsonl").write_bytes(
+        _record("other", 1, 0.5) + b"\n"
+    )
+    await central.async_refresh()
+    changes = connection.send_message.call_args.args[0]["event"]
+    assert changes["sites"] == {"other": ["Other", 0.5, 0]}
+
+    connection.subscriptions[1]()
+    await central.async_shutdown()
@@ -0,0 +1,36 @@
+"""Test the long-term statistics of virtual sources."""
+
+from datetime import datetime
+from unittest.mock import patch
+
+from homeassistant.components.recorder.statistics import valid_statistic_id
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.my_carbon_footprint.statistics import VirtualSourceStatistics
+
+
+def _at(hour: int, minute: int) -> datetime:
+    return datetime(2025, 1, 15, hour, minute, tzinfo=dt_util.UTC)
+
+
+async def test_hourly_statistics(hass: HomeAssistant):
+    statistics = VirtualSourceStatistics(hass, "01JABCDEF")
+    entity_carbon = {"sensor.energy1": 1.5, "sensor.energy2": 2.5}
+
+    with patch(
+        "custom_components.my_carbon_footprint.statistics.async_add_external_statistics"
+    ) as add_statistics:
+        statistics.async_update(_at(12, 10), entity_carbon, ["sensor.energy1"])
+        statistics.async_update(_at(12, 59), entity_carbon, ["sensor.energy1"])
+        add_statistics.assert_not_called()
+
+        # The totals when an hour ends are added on the first update after it
+        statistics.async_update(_at(13, 1), entity_carbon, ["sensor.energy1"])
+
+    add_statistics.assert_called_once()
+    _hass, metadata, rows = add_statistics.call_args.args
+    assert metadata["statistic_id"] == "my_carbon_footprint:01jabcdef_energy1_carbon"
+    assert valid_statistic_id(metadata["statistic_id"])
+    assert metadata["has_sum"]
+    assert rows == [{"start": _at(12, 0), "state": 1.5, "sum": 1.5}]
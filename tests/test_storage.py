@@ -0,0 +1,95 @@
+"""Test the coordinator snapshot store."""
+
+import asyncio
+import struct
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.my_carbon_footprint.storage import (
+    SNAPSHOT_FORMAT_VERSION,
+    SNAPSHOT_MAGIC,
+    SnapshotStore,
+    decode_snapshot,
+    encode_snapshot,
+)
+
+SNAPSHOT = {
+    "total_carbon": 1.5,
+    "entity_carbon": {"sensor.energy1": 1.0, "sensor.energy2": 0.5},
+    "previous_energy_values": {"sensor.energy1": 10.0, "sensor.energy2": 20.0},
+}
+
+
+def test_snapshot_round_trip():
+    payload = encode_snapshot(SNAPSHOT)
+
+    assert payload.startswith(SNAPSHOT_MAGIC)
+    assert decode_snapshot(payload) == SNAPSHOT
+
+
+def test_snapshot_rejects_unknown_payloads():
+    payload = encode_snapshot(SNAPSHOT)
+    newer = (
+        struct.pack("<4sH", SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION + 1) + payload[6:]
+    )
+
+    with pytest.raises(ValueError, match="version"):
+        decode_snapshot(newer)
+    with pytest.raises(ValueError, match="Not a carbon footprint snapshot"):
+        decode_snapshot(b"{}" + payload)
+    with pytest.raises(ValueError, match="Truncated"):
+        decode_snapshot(SNAPSHOT_MAGIC)
+
+
+async def test_store_save_and_load(hass: HomeAssistant, tmp_path):
+    path = str(tmp_path / "storage" / "snapshot.bin")
+    store = SnapshotStore(hass, path)
+    assert await store.async_load() is None
+
+    await store.async_save(SNAPSHOT)
+
+    assert await SnapshotStore(hass, path).async_load() == SNAPSHOT
+
+
+async def test_store_migrates_legacy_store(hass: HomeAssistant, tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    legacy_store = MagicMock(
+        async_load=AsyncMock(return_value=SNAPSHOT), async_remove=AsyncMock()
+    )
+
+    assert await SnapshotStore(hass, path, legacy_store).async_load() == SNAPSHOT
+    legacy_store.async_remove.assert_awaited_once()
+
+    # The binary snapshot is read from now on
+    legacy_store.async_load.reset_mock()
+    assert await SnapshotStore(hass, path, legacy_store).async_load() == SNAPSHOT
+    legacy_store.async_load.assert_not_awaited()
+
+
+async def test_store_queue_keeps_the_latest_snapshot(hass: HomeAssistant, tmp_path):
+    store = SnapshotStore(hass, str(tmp_path / "snapshot.bin"))
+    written = []
+    write_started = asyncio.Event()
+    release_write = threading.Event()
+
+    def slow_write(data):
+        written.append(data)
+        hass.loop.call_soon_threadsafe(write_started.set)
+        release_write.wait()
+
+    with patch.object(store, "_write", slow_write):
+        store.async_schedule_save({"total_carbon": 1})
+        await write_started.wait()
+
+        # Snapshots queued while writing supersede each other
+        save = asyncio.create_task(store.async_save({"total_carbon": 2}))
+        await asyncio.sleep(0)
+        store.async_schedule_save({"total_carbon": 3})
+        release_write.set()
+        await save
+        await store.async_flush()
+
+    assert written == [{"total_carbon": 1}, {"total_carbon": 3}]
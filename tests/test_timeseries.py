@@ -0,0 +1,49 @@
+"""Test the in-memory time series."""
+
+from custom_components.my_carbon_footprint.timeseries import RingSeries, TimeSeries
+
+
+def test_ring_series_window():
+    ring = RingSeries(60, 4)
+    ring.add(0, 1, 0.1)
+    ring.add(30, 1, 0.1)
+    ring.add(120, 3, 0.3)
+
+    assert ring.window(150) == (-60, [0, 2, 0, 3], [0, 0.2, 0, 0.3])
+    # Intervals without data since the last addition count as zero
+    assert ring.window(250) == (60, [0, 3, 0, 0], [0, 0.3, 0, 0])
+    assert ring.window(150, 2) == (60, [0, 3], [0, 0.3])
+
+    # Slots are reused once the window moved past their interval
+    ring.add(300, 5, 0.5)
+    assert ring.window(300) == (120, [3, 0, 0, 5], [0.3, 0, 0, 0.5])
+    ring.add(10_000, 1, 0.1)
+    assert ring.window(10_000) == (9780, [0, 0, 0, 1], [0, 0, 0, 0.1])
+
+    # Late additions go to the latest interval
+    ring.add(0, 1, 0.1)
+    assert ring.window(10_000)[1] == [0, 0, 0, 2]
+
+
+def test_time_series_caps_sources():
+    timeseries = TimeSeries(max_sources=1)
+    timeseries.add("sensor.energy1", 3600, 1, 0.1)
+    timeseries.add("sensor.energy2", 3600, 2, 0.2)
+    timeseries.add_total(3600, 3, 0.3)
+
+    assert timeseries.query("sensor.energy2", 3600) is None
+    result = timeseries.query("sensor.energy1", 3600, ["1h"])
+    assert list(result) == ["1h"]
+    assert result["1h"]["interval"] == 3600
+    assert result["1h"]["energy"][-1] == 1
+    assert timeseries.query(None, 3600)["15m"]["carbon"][-1] == 0.3
+
+    sparkline = timeseries.sparkline(None, 7200)
+    assert len(sparkline) == 24
+    assert sparkline[-2:] == [0, 0.3]
+    assert timeseries.sparkline("sensor.energy2", 7200) == []
+
+    # The current interval is left out, the sparkline is rebuilt once it closes
+    timeseries.add_total(7200, 1, 0.1)
+    assert timeseries.sparkline(None, 7300) is sparkline
+    assert timeseries.sparkline(None, 10_800)[-2:] == [0.3, 0.1]
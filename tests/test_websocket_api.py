@@ -0,0 +1,159 @@
+"""Test the websocket API."""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from freezegun import freeze_time
+from homeassistant.core import HomeAssistant
+
+from custom_components.my_carbon_footprint import websocket_api
+from custom_components.my_carbon_footprint.CarbonFootprintCoordinator import (
+    CarbonFootprintCoordinator,
+)
+from custom_components.my_carbon_footprint.const import DOMAIN
+from custom_components.my_carbon_footprint.health import SourceHealth
+from custom_components.my_carbon_footprint.models import (
+    CoordinatorData,
+    EnergySensor,
+    Gap,
+)
+from custom_components.my_carbon_footprint.timeseries import TimeSeries
+
+
+@pytest.fixture
+def connection():
+    return MagicMock()
+
+
+@freeze_time("2025-01-15 12:30:00")
+async def test_timeseries(hass: HomeAssistant, connection):
+    timeseries = TimeSeries(max_sources=10)
+    timeseries.add("sensor.energy1", 1736944200, 2, 0.5)
+    hass.data[DOMAIN] = {
+        "test_entry_id": MagicMock(timeseries=timeseries),
+        "disabled_entry_id": MagicMock(timeseries=None),
+    }
+
+    websocket_api.ws_timeseries(
+        hass,
+        connection,
+        {
+            "id": 1,
+            "type": "my_carbon_footprint/timeseries",
+            "entry_id": "test_entry_id",
+            "entity_id": "sensor.energy1",
+            "resolutions": ["1h"],
+        },
+    )
+    msg_id, result = connection.send_result.call_args.args
+    assert msg_id == 1
+    series = result["1h"]
+    assert series["start"] == (1736944200 // 3600 - 167) * 3600
+    assert series["energy"][-1] == 2
+    assert series["carbon"][-1] == 0.5
+
+    for msg, code in (
+        ({"entry_id": "missing"}, "not_found"),
+        ({"entry_id": "disabled_entry_id"}, "not_supported"),
+        ({"entry_id": "test_entry_id", "entity_id": "sensor.other"}, "not_found"),
+    ):
+        websocket_api.ws_timeseries(hass, connection, {"id": 2, **msg})
+        assert connection.send_error.call_args.args[1] == code
+
+
+def _data(carbon1: float, carbon2: float, cost2: float = 0.5) -> CoordinatorData:
+    return CoordinatorData(
+        carbon_intensity=100,
+        energy_sensors={
+            "sensor.energy1": EnergySensor(value=1, carbon=carbon1, cost=0.25),
+            "sensor.energy2": EnergySensor(value=1, carbon=carbon2, cost=cost2),
+        },
+        total_carbon=carbon1 + carbon2,
+        total_cost=0.25 + cost2,
+    )
+
+
+@pytest.fixture
+def coordinator(hass: HomeAssistant):
+    entry = MagicMock(
+        data={
+            "carbon_intensity_entity": "sensor.carbon_intensity",
+            "energy_entities": ["sensor.energy1", "sensor.energy2"],
+        },
+        entry_id="test_entry_id",
+    )
+    coordinator = CarbonFootprintCoordinator(hass, entry)
+    hass.data[DOMAIN] = {"test_entry_id": coordinator}
+    return coordinator
+
+
+async def test_summary(hass: HomeAssistant, connection, coordinator):
+    coordinator.data = _data(0.5, 1.5)
+    coordinator.timeseries.add_total(time.time(), 2, 2.0)
+
+    websocket_api.ws_summary(
+        hass, connection, {"id": 1, "entry_id": "test_entry_id", "periods": ["15m"]}
+    )
+    _msg_id, result = connection.send_result.call_args.args
+    assert result["total_carbon"] == 2.0
+    assert result["total_cost"] == 0.75
+    assert result["sources"] == {
+        "sensor.energy1": [1, 0.5, 0.25],
+        "sensor.energy2": [1, 1.5, 0.5],
+    }
+    assert result["periods"]["15m"]["carbon"][-1] == 2.0
+
+
+async def test_subscribe_summary(hass: HomeAssistant, connection, coordinator):
+    coordinator.data = _data(0.5, 1.5)
+    connection.subscriptions = {}
+
+    websocket_api.ws_subscribe_summary(
+        hass, connection, {"id": 1, "entry_id": "test_entry_id", "periods": ["1h"]}
+    )
+    connection.send_result.assert_called_once_with(1)
+    assert connection.send_message.call_args.args[0]["event"]["total_carbon"] == 2.0
+
+    # Only what changed is sent after a refresh
+    coordinator.async_set_updated_data(_data(0.5, 2.0))
+    changes = connection.send_message.call_args.args[0]["event"]
+    assert changes["total_carbon"] == 2.5
+    assert changes["sources"] == {"sensor.energy2": [1, 2.0, 0.5]}
+    assert "carbon_intensity" not in changes
+    assert "total_cost" not in changes
+    assert set(changes["periods"]["1h"]) == {"start", "energy", "carbon"}
+
+    # A change of cost alone is sent too
+    coordinator.async_set_updated_data(_data(0.5, 2.0, 1.0))
+    changes = connection.send_message.call_args.args[0]["event"]
+    assert changes["total_cost"] == 1.25
+    assert changes["sources"] == {"sensor.energy2": [1, 2.0, 1.0]}
+    assert "total_carbon" not in changes
+
+    connection.subscriptions[1]()
+    connection.send_message.reset_mock()
+    coordinator.async_set_updated_data(_data(1, 2.0))
+    connection.send_message.assert_not_called()
+
+
+async def test_gaps(hass: HomeAssistant, connection):
+    health = SourceHealth(stale_after=300, intensity_stale_after=None)
+    health.add_gaps([("sensor.energy1", Gap(0, 60, 1.5))])
+    hass.data[DOMAIN] = {
+        "test_entry_id": MagicMock(health=health),
+        "disabled_entry_id": MagicMock(health=None),
+    }
+
+    websocket_api.ws_gaps(
+        hass,
+        connection,
+        {"id": 1, "type": "my_carbon_footprint/gaps", "entry_id": "test_entry_id"},
+    )
+    assert connection.send_result.call_args.args == (
+        1,
+        {"sensor.energy1": [[0, 60, 1.5]]},
+    )
+
+    websocket_api.ws_gaps(hass, connection, {"id": 2, "entry_id": "disabled_entry_id"})
+    assert connection.send_error.call_args.args[1] == "not_supported"